@@ -0,0 +1,290 @@
+"""
+Incremental per-user wellness state and alert detection.
+
+Each user has one `user_wellness_state` row with running statistics (count,
+mean, exponentially weighted moving average, consecutive low scores). Every
+new score updates it in O(1) and is checked against it:
+
+- consecutive_low: ALERT_CONSECUTIVE_LOW scores in a row below ALERT_LOW_SCORE
+- sharp_decline: a score ALERT_SHARP_DECLINE or more below the moving average
+
+Scores older than the latest one (backfills) only update count and mean.
+The state is rebuilt from history when a score is deleted, or on the first
+insert for a user whose scores predate this table.
+
+When ALERT_WEBHOOK_URL is set, committed alerts are POSTed as JSON from a
+background thread so a slow receiver never delays the request.
+"""
+
+import logging
+import queue
+import threading
+from collections import defaultdict
+from collections.abc import Collection, Iterable
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import UserWellnessState, WellnessAlert, WellnessMetrics
+from app.resilience import retry_with_backoff
+
+logger = logging.getLogger(__name__)
+
+
+def apply_score(
+    state: UserWellnessState, score: float, time: datetime
+) -> list[tuple[str, str]]:
+    """
+    Fold one score into `state`.
+
+    Returns:
+        list: (kind, message) for each alert the score triggers
+    """
+    state.count = (state.count or 0) + 1
+    state.mean = (state.mean or 0.0) + (score - (state.mean or 0.0)) / state.count
+
+    if state.last_time is not None and time < state.last_time:
+        return []  # backfill: order-dependent statistics are unaffected
+
+    alerts = []
+    previous_ewma = state.ewma
+    if (
+        previous_ewma is not None
+        and previous_ewma - score >= settings.alert_sharp_decline
+    ):
+        alerts.append(
+            (
+                "sharp_decline",
+                f"Score {score:.1f} is {previous_ewma - score:.1f} below the recent average of {previous_ewma:.1f}",
+            )
+        )
+
+    alpha = settings.alert_ewma_alpha
+    state.ewma = (
+        score if previous_ewma is None else alpha * score + (1 - alpha) * previous_ewma
+    )
+
+    state.consecutive_low = (
+        (state.consecutive_low or 0) + 1 if score < settings.alert_low_score else 0
+    )
+    if state.consecutive_low == settings.alert_consecutive_low:
+        alerts.append(
+            (
+                "consecutive_low",
+                f"{state.consecutive_low} consecutive scores below {settings.alert_low_score:g}",
+            )
+        )
+
+    state.last_score = score
+    state.last_time = time
+    return alerts
+
+
+def lock_state(db: Session, userid: int) -> tuple[UserWellnessState, bool]:
+    """
+    Lock the user's state row (SELECT ... FOR UPDATE), creating it if missing.
+
+    Returns:
+        tuple: (state, created); a created state is empty and must be rebuilt
+    """
+    state = db.get(UserWellnessState, userid, with_for_update=True)
+    if state is not None:
+        return state, False
+
+    state = UserWellnessState(userid=userid, count=0, mean=0.0, consecutive_low=0)
+    try:
+        # In a savepoint, so losing a race with a concurrent first write for
+        # this user only undoes this insert
+        with db.begin_nested():
+            db.add(state)
+    except IntegrityError:
+        return db.get(UserWellnessState, userid, with_for_update=True), False
+    return state, True
+
+
+def _recompute(
+    db: Session, state: UserWellnessState, exclude_ids: Collection[int] = ()
+) -> None:
+    state.count, state.mean, state.ewma = 0, 0.0, None
+    state.consecutive_low, state.last_score, state.last_time = 0, None, None
+
+    query = db.query(WellnessMetrics.wellness_score, WellnessMetrics.time).filter(
+        WellnessMetrics.userid == state.userid
+    )
+    if exclude_ids:
+        query = query.filter(WellnessMetrics.id.not_in(exclude_ids))
+    for score, time in query.order_by(
+        WellnessMetrics.time, WellnessMetrics.id
+    ).yield_per(1000):
+        apply_score(state, score, time)
+
+
+def rebuild_state(
+    db: Session, userid: int, exclude_ids: Collection[int] = ()
+) -> UserWellnessState:
+    """Recompute a user's state from their full history (no alerts are raised)."""
+    state, _ = lock_state(db, userid)
+    _recompute(db, state, exclude_ids)
+    return state
+
+
+def record_bulk_scores(
+    db: Session,
+    rows: list[tuple[int, datetime, float]],
+    metric_ids: list[int] | None = None,
+) -> list[WellnessAlert]:
+    """
+    Update states for (userid, time, score) rows just inserted (flushed, uncommitted).
+
+    Each user's state is locked once and their scores are applied in time
+    order. With `metric_ids` (parallel to `rows`) alerts are raised and added
+    to the session; without them (bulk imports, which are backfills) only
+    the states are updated.
+
+    Returns:
+        list: The alerts added to the session
+    """
+    by_user = defaultdict(list)
+    for i, (userid, time, score) in enumerate(rows):
+        by_user[userid].append((time, metric_ids[i] if metric_ids else 0, score))
+
+    # Lock existing states in one query, in userid order to avoid deadlocks
+    states = {
+        state.userid: state
+        for state in db.query(UserWellnessState)
+        .filter(UserWellnessState.userid.in_(by_user))
+        .order_by(UserWellnessState.userid)
+        .with_for_update()
+        .populate_existing()
+    }
+    alerts = []
+    for userid in sorted(by_user):
+        scores = sorted(by_user[userid])
+        state = states.get(userid)
+        if state is None:
+            state, created = lock_state(db, userid)
+            if created:
+                if metric_ids is None:
+                    _recompute(db, state)  # history already includes the new rows
+                    continue
+                _recompute(
+                    db, state, exclude_ids=[metric_id for _, metric_id, _ in scores]
+                )
+
+        for time, metric_id, score in scores:
+            for kind, message in apply_score(state, score, time):
+                if metric_ids is not None:
+                    alerts.append(
+                        WellnessAlert(
+                            userid=userid,
+                            metric_id=metric_id,
+                            kind=kind,
+                            score=score,
+                            message=message,
+                        )
+                    )
+    db.add_all(alerts)
+    return alerts
+
+
+def alert_payload(alert: WellnessAlert) -> dict:
+    return {
+        "id": alert.id,
+        "userid": alert.userid,
+        "metric_id": alert.metric_id,
+        "kind": alert.kind,
+        "score": alert.score,
+        "message": alert.message,
+        "created_at": alert.created_at.isoformat(),
+    }
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    import httpx
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _post_webhook(url: str, payload: dict) -> None:
+    import httpx
+
+    response = httpx.post(url, json=payload, timeout=settings.alert_webhook_timeout)
+    response.raise_for_status()
+
+
+class AlertDispatcher:
+    """Delivers alert payloads to a webhook from a worker thread."""
+
+    def __init__(self, url: str, send=_post_webhook):
+        self.url = url
+        self._send = send
+        self._queue: queue.Queue = queue.Queue(maxsize=10_000)
+        self._worker = threading.Thread(
+            target=self._run, name="alert-webhook", daemon=True
+        )
+        self._worker.start()
+
+    def enqueue(self, payloads: Iterable[dict]) -> None:
+        for payload in payloads:
+            try:
+                self._queue.put_nowait(payload)
+            except queue.Full:
+                logger.warning(
+                    "Alert webhook queue is full; dropping alert %s", payload.get("id")
+                )
+
+    def close(self) -> None:
+        """Deliver what is queued, then stop the worker."""
+        self._queue.put(None)
+        self._worker.join(timeout=settings.alert_webhook_timeout * 2)
+
+    def _run(self) -> None:
+        while True:
+            payload = self._queue.get()
+            if payload is None:
+                return
+            try:
+                retry_with_backoff(
+                    lambda: self._send(self.url, payload), retry_if=_is_retryable
+                )
+            except Exception:
+                logger.exception(
+                    "Failed to deliver alert %s to webhook", payload.get("id")
+                )
+
+
+_dispatcher: AlertDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_alert_dispatcher() -> AlertDispatcher | None:
+    """Return the shared dispatcher, starting it on first use; None if no webhook is set."""
+    global _dispatcher
+
+    if not settings.alert_webhook_url:
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher(settings.alert_webhook_url)
+        return _dispatcher
+
+
+def dispatch_alerts(payloads: list[dict]) -> None:
+    """Queue committed alerts (see `alert_payload`) for webhook delivery; no-op without a webhook."""
+    dispatcher = get_alert_dispatcher()
+    if dispatcher and payloads:
+        dispatcher.enqueue(payloads)
+
+
+def close_alert_dispatcher() -> None:
+    """Flush and stop the webhook worker (called on shutdown)."""
+    global _dispatcher
+
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.close()
+            _dispatcher = None
@@ -0,0 +1,243 @@
+"""
+Incremental Parquet export of wellness metrics for analytics.
+
+Rows are read with a server-side cursor (`yield_per`), converted to Arrow
+record batches and streamed into a Hive-partitioned Parquet dataset
+(`wellness_metrics/dt=YYYY-MM-DD/`). The highest exported id is kept in
+`_watermark.json` so each run only exports rows added since the last one.
+
+Ids are allocated when a row is inserted, not when it commits, so a slow
+transaction can commit an id below the watermark after a run has passed it.
+Ids missing below the watermark are therefore kept in the watermark file and
+re-checked on every run for ANALYTICS_EXPORT_GAP_SECONDS before they are
+written off (as rolled back or deleted). A full run clears the dataset first.
+
+With rollups enabled, per-user daily aggregates are written alongside
+(`daily_rollups/dt=.../`); every day touched by the run is recomputed and its
+partition replaced.
+
+Requires `pyarrow`, which is imported only when an export runs.
+"""
+
+import json
+import shutil
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import WellnessMetrics
+
+WATERMARK_FILE = "_watermark.json"
+METRICS_DATASET = "wellness_metrics"
+ROLLUPS_DATASET = "daily_rollups"
+MAX_PENDING_IDS = (
+    1000  # newest missing ids re-checked; in-flight writes are always recent
+)
+
+
+@dataclass
+class AnalyticsExportResult:
+    """Outcome of one export run."""
+
+    rows_exported: int
+    watermark: int
+    first_day: str | None = None  # earliest dt partition written this run
+    rollup_rows: int = 0
+
+
+def read_watermark(output_dir: Path) -> int:
+    """Return the last exported metric id, or 0 if nothing has been exported."""
+    return _read_watermark(output_dir)[0]
+
+
+def _read_watermark(output_dir: Path) -> tuple[int, dict[int, str]]:
+    """Return the last exported id and the missing ids below it ({id: first seen})."""
+    path = output_dir / WATERMARK_FILE
+    if not path.exists():
+        return 0, {}
+    watermark = json.loads(path.read_text())
+    return watermark["last_id"], {
+        int(i): seen for i, seen in watermark.get("pending", {}).items()
+    }
+
+
+def _write_watermark(output_dir: Path, last_id: int, pending: dict[int, str]) -> None:
+    path = output_dir / WATERMARK_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps(
+            {
+                "last_id": last_id,
+                "pending": pending,
+                "exported_at": datetime.utcnow().isoformat(),
+            }
+        )
+    )
+    tmp.replace(path)  # atomic, so a crash never leaves a half-written watermark
+
+
+def _metric_batches(pa, schema, rows, batch_size: int, state: dict) -> Iterator:
+    columns = {name: [] for name in schema.names}
+    for metric_id, userid, time, score in rows:
+        if metric_id > state["last_id"]:
+            # Ids skipped since the previous row may still be uncommitted
+            start = max(state["last_id"] + 1, metric_id - MAX_PENDING_IDS)
+            state["missing"].extend(range(start, metric_id))
+        else:
+            state["found"].add(metric_id)  # a previously missing id has committed since
+        columns["id"].append(metric_id)
+        columns["userid"].append(userid)
+        columns["time"].append(time)
+        columns["wellness_score"].append(score)
+        columns["dt"].append(time.date().isoformat())
+        state["rows"] += 1
+        state["last_id"] = max(state["last_id"], metric_id)
+        day = columns["dt"][-1]
+        if state["first_day"] is None or day < state["first_day"]:
+            state["first_day"] = day
+        if len(columns["id"]) >= batch_size:
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+            columns = {name: [] for name in schema.names}
+    if columns["id"]:
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def _write_rollups(pa, ds, db: Session, output_dir: Path, first_day: str) -> int:
+    """Recompute per-user daily aggregates from `first_day` on; returns row count."""
+    day = func.date(WellnessMetrics.time)
+    rows = (
+        db.query(
+            WellnessMetrics.userid,
+            day.label("day"),
+            func.count(WellnessMetrics.id),
+            func.avg(WellnessMetrics.wellness_score),
+            func.min(WellnessMetrics.wellness_score),
+            func.max(WellnessMetrics.wellness_score),
+        )
+        .filter(WellnessMetrics.time >= datetime.fromisoformat(first_day))
+        .group_by(WellnessMetrics.userid, day)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    table = pa.table(
+        {
+            "userid": [r[0] for r in rows],
+            "entries": [r[2] for r in rows],
+            "average_score": [float(r[3]) for r in rows],
+            "min_score": [r[4] for r in rows],
+            "max_score": [r[5] for r in rows],
+            "dt": [str(r[1]) for r in rows],  # date on PostgreSQL, string on SQLite
+        }
+    )
+    ds.write_dataset(
+        table,
+        output_dir / ROLLUPS_DATASET,
+        format="parquet",
+        partitioning=["dt"],
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+    )
+    return len(rows)
+
+
+def export_wellness_metrics_parquet(
+    db: Session,
+    output_dir: Path,
+    full: bool = False,
+    include_rollups: bool = False,
+) -> AnalyticsExportResult:
+    """
+    Export metrics added since the last watermark to partitioned Parquet.
+
+    Args:
+        db: Database session
+        output_dir: Dataset root; created if missing
+        full: Clear the dataset and export everything
+        include_rollups: Also write per-user daily aggregates
+
+    Returns:
+        AnalyticsExportResult: Rows written and the new watermark
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if full:
+        # Part files have unique names, so old ones would otherwise duplicate rows
+        for dataset in (METRICS_DATASET, ROLLUPS_DATASET):
+            shutil.rmtree(output_dir / dataset, ignore_errors=True)
+        since_id, pending = 0, {}
+    else:
+        since_id, pending = _read_watermark(output_dir)
+
+    rows = (
+        db.query(
+            WellnessMetrics.id,
+            WellnessMetrics.userid,
+            WellnessMetrics.time,
+            WellnessMetrics.wellness_score,
+        )
+        .filter(or_(WellnessMetrics.id > since_id, WellnessMetrics.id.in_(pending)))
+        .order_by(WellnessMetrics.id)
+        .yield_per(settings.export_batch_size)
+    )
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("userid", pa.int64()),
+            ("time", pa.timestamp("us")),
+            ("wellness_score", pa.float64()),
+            ("dt", pa.string()),
+        ]
+    )
+    state = {
+        "rows": 0,
+        "last_id": since_id,
+        "first_day": None,
+        "missing": [],
+        "found": set(),
+    }
+    batches = _metric_batches(pa, schema, rows, settings.export_batch_size, state)
+
+    # Each run writes new files with a unique name, so earlier exports are kept
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(schema, batches),
+        output_dir / METRICS_DATASET,
+        format="parquet",
+        partitioning=["dt"],
+        partitioning_flavor="hive",
+        basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+    result = AnalyticsExportResult(
+        rows_exported=state["rows"],
+        watermark=state["last_id"],
+        first_day=state["first_day"],
+    )
+    if include_rollups and result.first_day:
+        result.rollup_rows = _write_rollups(pa, ds, db, output_dir, result.first_day)
+
+    now = datetime.utcnow()
+    cutoff = (
+        now - timedelta(seconds=settings.analytics_export_gap_seconds)
+    ).isoformat()
+    still_pending = {
+        metric_id: seen
+        for metric_id, seen in pending.items()
+        if metric_id not in state["found"] and seen >= cutoff
+    }
+    still_pending.update((metric_id, now.isoformat()) for metric_id in state["missing"])
+    still_pending = dict(sorted(still_pending.items())[-MAX_PENDING_IDS:])
+    if result.rows_exported or still_pending != pending:
+        _write_watermark(output_dir, result.watermark, still_pending)
+    return result
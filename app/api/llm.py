@@ -4,30 +4,75 @@ LLM API endpoints using Groq.
 Provides AI-powered wellness insights and chat functionality.
 """
 
-from datetime import datetime, timedelta
-from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
-from groq import Groq
 
-from app.database import get_db
-from app.models import UserTable, WellnessMetrics
 from app.config import settings
+from app.conversation import append_turn, build_context_messages, compact_session
+from app.database import get_db
+from app.insights import (
+    generate_insight,
+    get_stored_insight,
+    insight_response,
+    window_fingerprint,
+    window_start,
+)
+from app.llm_client import create_chat_completion, get_groq_sdk_client, get_model_name
+from app.message_analysis import analyze_message_with_llm
+from app.models import ChatSession, UserTable
+from app.ratelimit import enforce_llm_rate_limit
+from app.replicas import get_read_db, wrote_recently
+from app.resilience import is_transient_error
 from app.schemas import (
     ChatRequest,
     ChatResponse,
+    ChatSessionCreate,
+    ChatSessionResponse,
+    MessageAnalysisResponse,
     WellnessInsightRequest,
-    WellnessInsightResponse
+    WellnessInsightResponse,
 )
+from app.semantic_cache import get_chat_cache
+from app.sentiment import get_local_scorer
+from app.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+logger = logging.getLogger(__name__)
 
+# Only routes that call the LLM are rate limited
 router = APIRouter()
 
-# Initialize Groq client
-groq_client = Groq(api_key=settings.groq_api_key) if settings.groq_api_key else None
+# Coalesces concurrent identical insight requests
+_insight_flights = SingleFlight()
 
+CHAT_SYSTEM_PROMPT = """You are a compassionate wellness companion AI.
+Your role is to:
+- Listen empathetically to users' concerns
+- Provide supportive, non-judgmental responses
+- Suggest healthy coping strategies
+- Encourage professional help when needed
+- Keep responses concise (2-3 paragraphs max)
 
-def get_groq_client():
+Never diagnose or provide medical advice. Always prioritize user safety."""
+
+
+def get_groq_client() -> "Groq":
     """Get Groq client or raise error if not configured."""
+    return require_groq_client(get_groq_sdk_client())
+
+
+def get_optional_groq_client() -> Optional["Groq"]:
+    """Get Groq client, or None if not configured (for routes that may not need it)."""
+    return get_groq_sdk_client()
+
+
+def require_groq_client(groq_client: Optional["Groq"]) -> "Groq":
+    """Return the client, raising 503 if Groq is not configured."""
     if not groq_client:
         raise HTTPException(
             status_code=503,
@@ -36,227 +81,279 @@ def get_groq_client():
     return groq_client
 
 
-@router.post("/chat", response_model=ChatResponse)
+def _llm_error(exc: Exception, detail: str) -> HTTPException:
+    """
+    Map an error from an LLM route to a response, logging the details.
+
+    Transient provider errors that outlasted the retries are a 503 and
+    other provider errors a 502; the provider's message is never sent to
+    the client.
+    """
+    logger.error("%s", detail, exc_info=exc)
+    if is_transient_error(exc):
+        return HTTPException(
+            status_code=503,
+            detail="The AI service is temporarily unavailable. Please try again shortly.",
+        )
+    if getattr(exc, "status_code", None) is not None:
+        return HTTPException(status_code=502, detail="The AI service returned an error.")
+    return HTTPException(status_code=500, detail=detail)
+
+
+@router.post(
+    "/chat",
+    response_model=ChatResponse,
+    dependencies=[Depends(enforce_llm_rate_limit)],
+)
 def chat_with_llm(
     request: ChatRequest,
     db: Session = Depends(get_db),
-    client: Groq = Depends(get_groq_client)
+    client: "Groq" = Depends(get_groq_client),
+    x_user_id: str | None = Header(None, max_length=255),
 ):
     """
     Chat with AI for wellness support.
 
-    The AI acts as a supportive wellness companion.
+    The AI acts as a supportive wellness companion. Pass a `session_id`
+    (see POST /chat/sessions) to continue a conversation; the server keeps a
+    rolling summary so prompts stay a bounded size. Updating the summary
+    is a second LLM call made before responding, so the occasional turn that
+    triggers it is slower. Without a session, and when the semantic cache is
+    enabled, near-identical messages from the same X-User-Id are answered
+    from the cache. Answers are never shared between users, and requests
+    without X-User-Id are not cached.
     """
+    session = None
+    lookup = None
+    cache = None
+
+    if request.session_id:
+        session = db.query(ChatSession).filter(ChatSession.id == request.session_id).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        messages = build_context_messages(session, CHAT_SYSTEM_PROMPT, request.message)
+    else:
+        cache = get_chat_cache() if x_user_id else None
+        lookup = cache.lookup(x_user_id, request.message) if cache else None
+        if lookup and lookup.response is not None:
+            return ChatResponse(
+                message=lookup.response,
+                model_used=get_model_name(),
+                cached=True
+            )
+        messages = [
+            {
+                "role": "system",
+                "content": CHAT_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": request.message
+            }
+        ]
+
     try:
         # Create chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a compassionate wellness companion AI.
-Your role is to:
-- Listen empathetically to users' concerns
-- Provide supportive, non-judgmental responses
-- Suggest healthy coping strategies
-- Encourage professional help when needed
-- Keep responses concise (2-3 paragraphs max)
-
-Never diagnose or provide medical advice. Always prioritize user safety."""
-                },
-                {
-                    "role": "user",
-                    "content": request.message
-                }
-            ],
-            model=settings.groq_model or "llama-3.1-70b-versatile",
+        chat_completion = create_chat_completion(
+            client,
+            messages=messages,
             temperature=0.7,
             max_tokens=500,
         )
 
         response_message = chat_completion.choices[0].message.content
 
-        return ChatResponse(
-            message=response_message,
-            model_used=settings.groq_model or "llama-3.1-70b-versatile"
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error communicating with Groq API: {str(e)}"
-        )
-
-
-@router.post("/wellness-insight", response_model=WellnessInsightResponse)
+        raise _llm_error(e, "Error communicating with the AI service")
+
+    if lookup:
+        cache.store(x_user_id, lookup.vector, response_message)
+
+    if session:
+        append_turn(session, request.message, response_message)
+        db.commit()
+        if compact_session(session, client):
+            db.commit()
+
+    return ChatResponse(
+        message=response_message,
+        model_used=get_model_name(),
+        session_id=session.id if session else None
+    )
+
+
+@router.get("/chat/cache-stats")
+def get_chat_cache_stats():
+    """Semantic cache size and hit-rate metrics for /chat."""
+    cache = get_chat_cache()
+    if not cache:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def _session_response(session: ChatSession) -> ChatSessionResponse:
+    return ChatSessionResponse(
+        session_id=session.id,
+        userid=session.userid,
+        summary=session.summary,
+        message_count=len(session.messages)
+    )
+
+
+@router.post("/chat/sessions", response_model=ChatSessionResponse, status_code=201)
+def create_chat_session(request: ChatSessionCreate, db: Session = Depends(get_db)):
+    """Start a server-side chat session, optionally linked to a user."""
+    if request.userid is not None:
+        user = db.query(UserTable).filter(UserTable.userid == request.userid).first()
+        if not user:
+            raise HTTPException(status_code=404, detail=f"User {request.userid} not found")
+
+    session = ChatSession(userid=request.userid)
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return _session_response(session)
+
+
+@router.get("/chat/sessions/{session_id}", response_model=ChatSessionResponse)
+def get_chat_session(session_id: str, db: Session = Depends(get_db)):
+    """Get a chat session's summary and stored message count."""
+    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return _session_response(session)
+
+
+@router.delete("/chat/sessions/{session_id}", status_code=204)
+def delete_chat_session(session_id: str, db: Session = Depends(get_db)):
+    """Delete a chat session and its stored messages."""
+    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+
+    db.delete(session)
+    db.commit()
+    return None
+
+
+@router.post(
+    "/wellness-insight",
+    response_model=WellnessInsightResponse,
+    dependencies=[Depends(enforce_llm_rate_limit)],
+)
 def get_wellness_insight(
     request: WellnessInsightRequest,
     db: Session = Depends(get_db),
-    client: Groq = Depends(get_groq_client)
+    read_db: Session = Depends(get_read_db),
+    client: "Groq" = Depends(get_groq_client)
 ):
     """
     Get AI-powered insights about user's wellness trend.
 
     Analyzes recent wellness scores and provides personalized recommendations.
+    A stored insight (e.g. precomputed off-peak) is returned instantly while
+    the user's scores in the window are unchanged. Concurrent identical
+    requests share a single computation. Scores are read from a replica
+    when one is configured; stored insights live on the primary.
     """
-    # Get user's recent wellness data
     days = request.days or 7
-    start_date = datetime.utcnow() - timedelta(days=days)
-
-    metrics = db.query(WellnessMetrics).filter(
-        WellnessMetrics.userid == request.userid,
-        WellnessMetrics.time >= start_date
-    ).order_by(WellnessMetrics.time.asc()).all()
-
-    if not metrics:
+    if wrote_recently(request.userid):
+        read_db = db
+    # Keyed on the read engine too (see get_user_wellness_trend)
+    return _insight_flights.do(
+        (request.userid, days, read_db.get_bind()),
+        lambda: _get_or_generate_insight(db, read_db, client, request.userid, days)
+    )
+
+
+def _get_or_generate_insight(
+    db: Session, read_db: Session, client, userid: int, days: int
+) -> WellnessInsightResponse:
+    """Return the stored insight for the window if current, else generate one."""
+    start_date = window_start(days)
+
+    fingerprint = window_fingerprint(read_db, userid, start_date)
+    if fingerprint is None:
         raise HTTPException(
             status_code=404,
-            detail=f"No wellness data found for user {request.userid} in the last {days} days"
+            detail=f"No wellness data found for user {userid} in the last {days} days"
         )
 
-    # Calculate statistics
-    scores = [m.wellness_score for m in metrics]
-    avg_score = sum(scores) / len(scores)
-    min_score = min(scores)
-    max_score = max(scores)
-
-    # Determine trend
-    if len(scores) >= 2:
-        mid = len(scores) // 2
-        first_half_avg = sum(scores[:mid]) / mid
-        second_half_avg = sum(scores[mid:]) / (len(scores) - mid)
-
-        if second_half_avg > first_half_avg + 0.5:
-            trend = "improving"
-        elif second_half_avg < first_half_avg - 0.5:
-            trend = "declining"
-        else:
-            trend = "stable"
-    else:
-        trend = "insufficient data"
-
-    # Create prompt for LLM
-    scores_str = ", ".join([f"{s:.1f}" for s in scores])
-
-    prompt = f"""Analyze this user's wellness journey:
-
-Recent wellness scores (0-10 scale, last {days} days): {scores_str}
-
-Statistics:
-- Average: {avg_score:.1f}
-- Trend: {trend}
-- Range: {min_score:.1f} to {max_score:.1f}
-- Number of recordings: {len(scores)}
-
-Provide:
-1. A brief, compassionate summary of their wellness pattern (2-3 sentences)
-2. 2-3 specific, actionable recommendations to support their wellbeing
-3. One encouraging message
-
-Keep it personal, warm, and under 200 words."""
+    stored = get_stored_insight(db, userid, days, fingerprint)
+    if stored:
+        return insight_response(stored, cached=True)
 
     try:
-        # Get AI insight
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a compassionate wellness coach providing personalized insights."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model=settings.groq_model or "llama-3.1-70b-versatile",
-            temperature=0.7,
-            max_tokens=400,
-        )
-
-        insight = chat_completion.choices[0].message.content
-
-        return WellnessInsightResponse(
-            userid=request.userid,
-            period_days=days,
-            average_score=round(avg_score, 2),
-            trend=trend,
-            total_entries=len(scores),
-            insight=insight,
-            model_used=settings.groq_model or "llama-3.1-70b-versatile"
-        )
+        insight = generate_insight(db, client, userid, days, start_date, fingerprint, read_db)
+        return insight_response(insight)
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error generating wellness insight: {str(e)}"
-        )
+        raise _llm_error(e, "Error generating wellness insight")
 
 
-@router.post("/analyze-message", response_model=dict)
+@router.post(
+    "/analyze-message",
+    response_model=MessageAnalysisResponse,
+    dependencies=[Depends(enforce_llm_rate_limit)],
+)
 def analyze_message_sentiment(
     request: ChatRequest,
-    client: Groq = Depends(get_groq_client)
+    client: Optional["Groq"] = Depends(get_optional_groq_client)
 ):
     """
     Analyze the sentiment and wellness score of a user's message.
 
-    Returns a wellness score (0-10) and sentiment analysis.
+    Returns a wellness score (0-10), a one-sentence sentiment and a list of
+    concerning indicators. When the local sentiment model is enabled and
+    confident, it answers directly; low-confidence messages and messages with
+    crisis language go to the LLM, as do all messages if the local model
+    fails. Groq is only required when the LLM is used. The LLM is asked for
+    JSON; a fallback parser also accepts the older line-based format.
     """
-    prompt = f"""Analyze this message and provide:
-1. A wellness score from 0-10 (0 = severe distress, 10 = excellent wellbeing)
-2. Brief sentiment analysis (1 sentence)
-3. Any concerning indicators (if present)
-
-Message: "{request.message}"
-
-Respond in this exact format:
-Score: [number]
-Sentiment: [one sentence]
-Concerns: [none or brief list]"""
-
+    scorer = get_local_scorer()
+    if scorer:
+        try:
+            local = scorer.score(request.message)
+        except Exception:
+            logger.exception("Local sentiment scoring failed; using the LLM")
+            local = None
+        if local and not local.flagged and local.confidence >= settings.local_sentiment_min_confidence:
+            return MessageAnalysisResponse(
+                message=request.message,
+                estimated_wellness_score=local.score,
+                sentiment=local.label,
+                analysis=f"Scored locally by {scorer.model.name} (confidence {local.confidence:.2f})",
+                source="local",
+                confidence=local.confidence
+            )
+
+    client = require_groq_client(client)
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a mental health assessment AI. Provide objective, clinical analysis."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model=settings.groq_model or "llama-3.1-70b-versatile",
-            temperature=0.3,
-            max_tokens=200,
+        analysis, raw = analyze_message_with_llm(client, request.message)
+
+        return MessageAnalysisResponse(
+            message=request.message,
+            estimated_wellness_score=analysis.score,
+            sentiment=analysis.sentiment,
+            concerns=analysis.concerns,
+            analysis=raw
         )
 
-        analysis = chat_completion.choices[0].message.content
-
-        # Parse the response to extract score
-        score = None
-        if "Score:" in analysis:
-            try:
-                score_line = [line for line in analysis.split('\n') if 'Score:' in line][0]
-                score = float(score_line.split(':')[1].strip())
-                score = max(0.0, min(10.0, score))  # Clamp to 0-10
-            except:
-                pass
-
-        return {
-            "analysis": analysis,
-            "estimated_wellness_score": score,
-            "message": request.message
-        }
-
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error analyzing message: {str(e)}"
-        )
+        raise _llm_error(e, "Error analyzing message")
 
 
-@router.get("/test-connection")
-def test_groq_connection(client: Groq = Depends(get_groq_client)):
+@router.get(
+    "/test-connection",
+    dependencies=[Depends(enforce_llm_rate_limit)],
+)
+def test_groq_connection(client: "Groq" = Depends(get_groq_client)):
     """
     Test Groq API connection.
 
@@ -264,26 +361,25 @@ def test_groq_connection(client: Groq = Depends(get_groq_client)):
     """
     try:
         # Simple test request
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             messages=[
                 {
                     "role": "user",
                     "content": "Hello! Respond with 'Connection successful'"
                 }
             ],
-            model=settings.groq_model or "llama-3.1-70b-versatile",
             max_tokens=20,
         )
 
         return {
             "status": "connected",
             "message": response.choices[0].message.content,
-            "model": settings.groq_model or "llama-3.1-70b-versatile",
+            "model": get_model_name(),
             "provider": "Groq"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Groq API connection failed: {str(e)}"
-        )
+        raise _llm_error(e, "AI service connection failed")
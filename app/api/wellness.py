@@ -4,24 +4,82 @@ Wellness metrics API endpoints.
 Handles CRUD operations for wellness metrics.
 """
 
+import asyncio
+import io
+import json
+from collections import defaultdict
+from dataclasses import asdict
 from datetime import datetime, timedelta
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    WebSocket,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import case, func, insert, select
 from sqlalchemy.orm import Session
 
+from app.alerts import alert_payload, dispatch_alerts, rebuild_state, record_bulk_scores
+from app.bulk_import import import_wellness_metrics
+from app.config import settings
 from app.database import get_db
-from app.models import UserTable, WellnessMetrics
+from app.export import EXPORT_FORMATS, stream_wellness_metrics
+from app.idempotency import IdempotentRequest, idempotent_request
+from app.ingest import (
+    MSGPACK_CONTENT_TYPES,
+    PACKED_CONTENT_TYPE,
+    IngestError,
+    UnsupportedContentTypeError,
+    decode_metrics,
+    max_body_size,
+    validate_metrics,
+)
+from app.live import (
+    get_broker,
+    publish_alert_events,
+    publish_batch_event,
+    publish_metric_event,
+    state_summary,
+    user_topic,
+)
+from app.models import UserTable, UserWellnessState, WellnessAlert, WellnessMetrics
+from app.replicas import get_read_db, note_write
 from app.schemas import (
+    BatchCreateResponse,
+    BulkImportResponse,
+    UserResponse,
+    UserSummariesRequest,
+    UserWellnessSummary,
+    WellnessAlertResponse,
+    WellnessBucket,
+    WellnessHistoryResponse,
+    WellnessMetricBatchCreate,
     WellnessMetricCreate,
     WellnessMetricResponse,
-    WellnessHistoryResponse,
+    WellnessSeriesResponse,
     WellnessTrendResponse,
-    UserResponse
 )
+from app.singleflight import SingleFlight
+from app.timeseries import BUCKETS, bucket_wellness_scores, lttb
 
 router = APIRouter()
 
+# Coalesces concurrent identical trend requests
+_trend_flights = SingleFlight()
+
+# Up to 1000 JSON metrics, with room for whitespace
+JSON_BATCH_MAX_BYTES = 1000 * 1024
+
 
 @router.post("/users", response_model=UserResponse, status_code=201)
 def create_user(db: Session = Depends(get_db)):
@@ -34,11 +92,12 @@ def create_user(db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    note_write(new_user.userid)
     return new_user
 
 
 @router.get("/users/{userid}", response_model=UserResponse)
-def get_user(userid: int, db: Session = Depends(get_db)):
+def get_user(userid: int, db: Session = Depends(get_read_db)):
     """Get a user by userid."""
     user = db.query(UserTable).filter(UserTable.userid == userid).first()
     if not user:
@@ -46,11 +105,11 @@ def get_user(userid: int, db: Session = Depends(get_db)):
     return user
 
 
-@router.get("/users", response_model=List[UserResponse])
+@router.get("/users", response_model=list[UserResponse])
 def list_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List all users with pagination."""
     users = db.query(UserTable).offset(skip).limit(limit).all()
@@ -60,33 +119,226 @@ def list_users(
 @router.post("/wellness-metrics", response_model=WellnessMetricResponse, status_code=201)
 def create_wellness_metric(
     metric: WellnessMetricCreate,
+    idempotency_key: str | None = Header(None, max_length=255),
     db: Session = Depends(get_db)
 ):
     """
     Create a new wellness metric entry for a user.
 
     If time is not provided, current time will be used.
+
+    Send an `Idempotency-Key` header to make retries safe: a repeat with the
+    same key returns the original response instead of adding a duplicate.
     """
-    # Check if user exists
-    user = db.query(UserTable).filter(UserTable.userid == metric.userid).first()
-    if not user:
-        raise HTTPException(status_code=404, detail=f"User {metric.userid} not found")
+    idempotent = idempotent_request(db, "wellness-metric", idempotency_key, metric)
+    if idempotent and (replay := idempotent.replay()):
+        return replay
+    return _record_metrics(db, _metric_rows([metric]), idempotent, batch=False)
+
+
+@router.post(
+    "/wellness-metrics/batch",
+    response_model=BatchCreateResponse,
+    status_code=201,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        # WellnessMetricCreate is already in components (create_wellness_metric's body)
+        "application/json": {"schema": {
+            key: value for key, value in WellnessMetricBatchCreate.model_json_schema(
+                ref_template="#/components/schemas/{model}"
+            ).items() if key != "$defs"
+        }},
+        PACKED_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        MSGPACK_CONTENT_TYPES[0]: {"schema": {"type": "string", "format": "binary"}},
+    }}},
+)
+async def create_wellness_metrics_batch(
+    request: Request,
+    idempotency_key: str | None = Header(None, max_length=255),
+    db: Session = Depends(get_db)
+):
+    """
+    Create several wellness metric entries in one transaction.
 
-    # Create wellness metric
-    new_metric = WellnessMetrics(
-        userid=metric.userid,
-        wellness_score=metric.wellness_score,
-        time=metric.time if metric.time else datetime.utcnow()
-    )
+    Either all metrics are stored or none are. Returns the number created and
+    their ids (ascending). An `Idempotency-Key` header covers the whole
+    batch. Live subscribers get one `metrics_created` event per user.
+
+    Besides JSON (`{"metrics": [...]}`, up to 1000 metrics), high-volume
+    clients can send up to BATCH_MAX_RECORDS metrics as:
+
+    - `application/x-wellness-packed`: little-endian `(userid: int32,
+      epoch seconds: int64, score: float32)` records, 16 bytes each
+    - `application/msgpack`: an array of `[userid, epoch seconds, score]`
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type == "application/json":
+        limit = JSON_BATCH_MAX_BYTES
+    else:
+        try:
+            limit = max_body_size(content_type, settings.batch_max_records)
+        except UnsupportedContentTypeError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+    body = await _read_body(request, limit)
+    return await run_in_threadpool(_create_batch, db, content_type, body, idempotency_key)
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    """Read the request body, rejecting it with 413 as soon as it exceeds `limit` bytes."""
+    too_large = HTTPException(status_code=413, detail=f"Request body is larger than {limit} bytes")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _create_batch(db: Session, content_type: str, body: bytes, idempotency_key: str | None):
+    if content_type == "application/json":
+        try:
+            batch = WellnessMetricBatchCreate.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+        payload = batch
+    else:
+        payload = content_type.encode() + b"\n" + body
+
+    idempotent = idempotent_request(db, "wellness-metric-batch", idempotency_key, payload)
+    if idempotent and (replay := idempotent.replay()):
+        return replay
+
+    if content_type == "application/json":
+        return _record_metrics(db, _metric_rows(batch.metrics), idempotent)
+
+    try:
+        columns = decode_metrics(content_type, body)
+    except UnsupportedContentTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except IngestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not 0 < len(columns) <= settings.batch_max_records:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A batch must have between 1 and {settings.batch_max_records} records",
+        )
+    errors = validate_metrics(columns)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return _record_metrics(db, columns.to_rows(), idempotent)
 
-    db.add(new_metric)
-    db.commit()
-    db.refresh(new_metric)
-    return new_metric
+
+def _metric_rows(items: list[WellnessMetricCreate]) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {"userid": item.userid, "time": item.time or now, "wellness_score": item.wellness_score}
+        for item in items
+    ]
+
+
+def _record_metrics(
+    db: Session,
+    rows: list[dict],
+    idempotent: IdempotentRequest | None = None,
+    batch: bool = True,
+):
+    """
+    Insert metric rows, update running state and alerts, commit, then notify.
+
+    Returns:
+        BatchCreateResponse, or WellnessMetricResponse when `batch` is False
+    """
+    userids = {row["userid"] for row in rows}
+    found = {
+        userid for (userid,) in
+        db.query(UserTable.userid).filter(UserTable.userid.in_(userids))
+    }
+    missing = sorted(userids - found)
+    if len(missing) == 1:
+        raise HTTPException(status_code=404, detail=f"User {missing[0]} not found")
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+
+    # Batched executemany INSERT ... RETURNING, with no ORM object per row. The
+    # returned rows carry every column, so they need not come back in request
+    # order (ordered RETURNING is row-at-a-time on SQLite).
+    created = db.execute(
+        insert(WellnessMetrics).returning(
+            WellnessMetrics.id, WellnessMetrics.userid, WellnessMetrics.time, WellnessMetrics.wellness_score
+        ),
+        rows,
+    ).all()
+    created.sort()
+    ids = [metric_id for metric_id, _, _, _ in created]
+
+    # Each user's running state is locked once and updated in O(1) per score; may raise alerts
+    alerts = record_bulk_scores(db, [(userid, time, score) for _, userid, time, score in created], ids)
+    db.flush()
+    summaries = {userid: state_summary(db.get(UserWellnessState, userid)) for userid in userids}
+    alert_payloads = [alert_payload(alert) for alert in alerts]
+
+    if batch:
+        response = BatchCreateResponse(created=len(ids), ids=ids)
+    else:
+        response = WellnessMetricResponse(**created[0]._mapping)
+    if idempotent:
+        idempotent.record(201, response)
+        idempotent.commit()
+    else:
+        db.commit()
+    for userid in userids:
+        note_write(userid)
+
+    dispatch_alerts(alert_payloads)
+    if batch:
+        # One event per user: their count in this batch and the newest score
+        counts, latest = defaultdict(int), {}
+        for row in created:
+            counts[row.userid] += 1
+            if row.userid not in latest or (row.time, row.id) > (latest[row.userid].time, latest[row.userid].id):
+                latest[row.userid] = row
+        for userid, count in counts.items():
+            publish_batch_event(userid, count, _metric_payload(latest[userid]), summaries[userid])
+    else:
+        publish_metric_event("metric_created", response.userid, _metric_payload(response), summaries[response.userid])
+    publish_alert_events(alert_payloads)
+    return response
+
+
+@router.post("/wellness-metrics/import", response_model=BulkImportResponse)
+def import_wellness_metrics_file(
+    file: UploadFile = File(...),
+    format: str | None = Query(None, pattern="^(ndjson|csv)$"),
+    skip_rows: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import wellness metrics from an uploaded CSV or NDJSON file.
+
+    The file is streamed into the database in chunks (COPY on PostgreSQL),
+    each committed separately. Invalid rows and unknown userids are rejected
+    and reported without stopping the import.
+
+    - **file**: CSV with a `userid,time,wellness_score` header, or NDJSON
+    - **format**: `csv` or `ndjson`; inferred from the file name if omitted
+    - **skip_rows**: Data rows to skip, i.e. `next_row` of an incomplete import
+    """
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    result = import_wellness_metrics(db, lines, format, skip_rows=skip_rows)
+    return BulkImportResponse(**asdict(result))
 
 
 @router.get("/wellness-metrics/{metric_id}", response_model=WellnessMetricResponse)
-def get_wellness_metric(metric_id: int, db: Session = Depends(get_db)):
+def get_wellness_metric(metric_id: int, db: Session = Depends(get_read_db)):
     """Get a specific wellness metric by ID."""
     metric = db.query(WellnessMetrics).filter(WellnessMetrics.id == metric_id).first()
     if not metric:
@@ -99,9 +351,9 @@ def get_user_wellness_history(
     userid: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    db: Session = Depends(get_read_db)
 ):
     """
     Get wellness history for a specific user.
@@ -111,6 +363,9 @@ def get_user_wellness_history(
     - **limit**: Maximum number of records to return
     - **start_date**: Filter metrics from this date onwards
     - **end_date**: Filter metrics up to this date
+
+    `total_count`, `average_score`, `min_score` and `max_score` describe the
+    whole filtered range, not just the returned page.
     """
     # Check if user exists
     user = db.query(UserTable).filter(UserTable.userid == userid).first()
@@ -125,30 +380,79 @@ def get_user_wellness_history(
     if end_date:
         query = query.filter(WellnessMetrics.time <= end_date)
 
-    # Get total count
-    total_count = query.count()
-
-    # Get metrics ordered by time (most recent first)
-    metrics = query.order_by(WellnessMetrics.time.desc()).offset(skip).limit(limit).all()
-
-    # Calculate average score
-    avg_score = None
-    if metrics:
-        avg_score = sum(m.wellness_score for m in metrics) / len(metrics)
+    # Get the page (most recent first) with stats for the whole filtered
+    # range computed by window functions in the same query
+    score = WellnessMetrics.wellness_score
+    rows = query.add_columns(
+        func.count().over(),
+        func.avg(score).over(),
+        func.min(score).over(),
+        func.max(score).over(),
+    ).order_by(WellnessMetrics.time.desc()).offset(skip).limit(limit).all()
+
+    metrics = [row[0] for row in rows]
+    if rows:
+        total_count, avg_score, min_score, max_score = rows[0][1:]
+    elif skip:
+        # Page is past the end; the range may still have rows
+        total_count, avg_score, min_score, max_score = query.with_entities(
+            func.count(), func.avg(score), func.min(score), func.max(score)
+        ).one()
+    else:
+        total_count, avg_score, min_score, max_score = 0, None, None, None
 
     return WellnessHistoryResponse(
         userid=userid,
         metrics=metrics,
         total_count=total_count,
-        average_score=avg_score
+        average_score=avg_score,
+        min_score=min_score,
+        max_score=max_score
     )
 
 
+@router.get("/users/{userid}/wellness-series", response_model=WellnessSeriesResponse)
+def get_user_wellness_series(
+    userid: int,
+    bucket: str = Query("day", pattern=f"^({'|'.join(BUCKETS)})$"),
+    days: int = Query(30, ge=1, le=365, description="Number of days to cover"),
+    end_date: datetime | None = None,
+    points: int | None = Query(None, ge=3, le=5000, description="Downsample to at most this many buckets"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a user's scores aggregated into time buckets, for charts.
+
+    - **bucket**: `hour`, `day` (default) or `week` (weeks start on Monday)
+    - **days**: Period to cover, ending at `end_date` (default: now)
+    - **points**: Reduce the series to this many buckets with LTTB, which
+      keeps the peaks and dips of the line
+
+    Each bucket has the count, mean, min and max of its scores; buckets
+    without scores are omitted.
+    """
+    user = db.query(UserTable).filter(UserTable.userid == userid).first()
+    if not user:
+        raise HTTPException(status_code=404, detail=f"User {userid} not found")
+
+    start_date = (end_date or datetime.utcnow()) - timedelta(days=days)
+    buckets = [
+        WellnessBucket(start=start, count=count, mean=round(mean, 2), min=low, max=high)
+        for start, count, mean, low, high in bucket_wellness_scores(db, userid, bucket, start_date, end_date)
+    ]
+    total_buckets = len(buckets)
+    if points:
+        kept = lttb([(b.start.timestamp(), b.mean) for b in buckets], points)
+        buckets = [buckets[i] for i in kept]
+
+    return WellnessSeriesResponse(userid=userid, bucket=bucket, buckets=buckets, total_buckets=total_buckets)
+
+
 @router.get("/users/{userid}/wellness-trend", response_model=WellnessTrendResponse)
 def get_user_wellness_trend(
     userid: int,
     days: int = Query(30, ge=1, le=365, description="Number of days to analyze"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get wellness trend analysis for a user.
@@ -158,7 +462,19 @@ def get_user_wellness_trend(
 
     - **userid**: The user ID
     - **days**: Number of days to analyze (default: 30)
+
+    Concurrent identical requests share a single computation.
     """
+    # Keyed on the engine too, so a read-your-writes read from the primary
+    # never joins a flight running on a lagging replica
+    return _trend_flights.do(
+        (userid, days, db.get_bind()),
+        lambda: _compute_wellness_trend(db, userid, days)
+    )
+
+
+def _compute_wellness_trend(db: Session, userid: int, days: int) -> WellnessTrendResponse:
+    """Load a user's metrics for the period and analyze the trend."""
     # Check if user exists
     user = db.query(UserTable).filter(UserTable.userid == userid).first()
     if not user:
@@ -181,17 +497,12 @@ def get_user_wellness_trend(
     avg_score = sum(m.wellness_score for m in metrics) / len(metrics)
 
     # Determine trend (simple analysis based on first half vs second half)
-    trend = "stable"
-    if len(metrics) >= 4:
-        mid_point = len(metrics) // 2
-        first_half_avg = sum(m.wellness_score for m in metrics[:mid_point]) / mid_point
-        second_half_avg = sum(m.wellness_score for m in metrics[mid_point:]) / (len(metrics) - mid_point)
-
-        diff = second_half_avg - first_half_avg
-        if diff > 0.5:
-            trend = "improving"
-        elif diff < -0.5:
-            trend = "declining"
+    mid_point = len(metrics) // 2
+    trend = _classify_trend(
+        len(metrics),
+        sum(m.wellness_score for m in metrics[:mid_point]),
+        sum(m.wellness_score for m in metrics[mid_point:]),
+    )
 
     return WellnessTrendResponse(
         userid=userid,
@@ -202,6 +513,273 @@ def get_user_wellness_trend(
     )
 
 
+def _classify_trend(count: int, first_half_sum: float, second_half_sum: float) -> str:
+    """Compare the averages of the first count // 2 scores and the rest (needs 4+ scores)."""
+    if count < 4:
+        return "stable"
+    mid_point = count // 2
+    diff = second_half_sum / (count - mid_point) - first_half_sum / mid_point
+    if diff > 0.5:
+        return "improving"
+    if diff < -0.5:
+        return "declining"
+    return "stable"
+
+
+@router.post("/users/summaries", response_model=list[UserWellnessSummary])
+def get_user_summaries(request: UserSummariesRequest, db: Session = Depends(get_read_db)):
+    """
+    Summarize wellness for many users in one request.
+
+    Returns each user's data point count, average, latest score and trend
+    over the last `days` days, in the order requested. The trend follows the
+    same rules as `/users/{userid}/wellness-trend`. All users are summarized
+    by a single grouped query.
+    """
+    userids = list(dict.fromkeys(request.userids))
+    found = {
+        userid for (userid,) in
+        db.query(UserTable.userid).filter(UserTable.userid.in_(userids))
+    }
+    missing = [userid for userid in userids if userid not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+
+    start_date = datetime.utcnow() - timedelta(days=request.days)
+    window = WellnessMetrics.userid
+    ranked = select(
+        WellnessMetrics.userid,
+        WellnessMetrics.time,
+        WellnessMetrics.wellness_score.label("score"),
+        func.row_number().over(
+            partition_by=window, order_by=(WellnessMetrics.time, WellnessMetrics.id)
+        ).label("rn"),
+        func.row_number().over(
+            partition_by=window, order_by=(WellnessMetrics.time.desc(), WellnessMetrics.id.desc())
+        ).label("rn_desc"),
+        func.count().over(partition_by=window).label("cnt"),
+    ).where(
+        WellnessMetrics.userid.in_(userids),
+        WellnessMetrics.time >= start_date
+    ).subquery()
+
+    # Same split as the trend endpoint: the first cnt // 2 scores vs the rest
+    first_half = ranked.c.rn <= ranked.c.cnt // 2
+    rows = db.execute(
+        select(
+            ranked.c.userid,
+            func.count(),
+            func.avg(ranked.c.score),
+            func.max(case((ranked.c.rn_desc == 1, ranked.c.score))),
+            func.max(case((ranked.c.rn_desc == 1, ranked.c.time))),
+            func.coalesce(func.sum(case((first_half, ranked.c.score))), 0),
+            func.coalesce(func.sum(case((~first_half, ranked.c.score))), 0),
+        ).group_by(ranked.c.userid)
+    )
+    summaries = {
+        userid: UserWellnessSummary(
+            userid=userid,
+            data_points=count,
+            average_score=round(avg, 2),
+            latest_score=latest_score,
+            latest_time=latest_time,
+            trend=_classify_trend(count, first_half_sum, second_half_sum),
+        )
+        for userid, count, avg, latest_score, latest_time, first_half_sum, second_half_sum in rows
+    }
+    return [
+        summaries.get(userid) or UserWellnessSummary(userid=userid, data_points=0, trend="stable")
+        for userid in userids
+    ]
+
+
+@router.get("/users/{userid}/alerts", response_model=list[WellnessAlertResponse])
+def get_user_alerts(
+    userid: int,
+    since: datetime | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get wellness alerts raised for a user, most recent first.
+
+    Alerts are detected as scores are recorded: several consecutive low
+    scores, or a score far below the user's moving average.
+
+    - **since**: Only alerts created at or after this time
+    - **limit**: Maximum number of alerts to return
+    """
+    user = db.query(UserTable).filter(UserTable.userid == userid).first()
+    if not user:
+        raise HTTPException(status_code=404, detail=f"User {userid} not found")
+
+    query = db.query(WellnessAlert).filter(WellnessAlert.userid == userid)
+    if since:
+        query = query.filter(WellnessAlert.created_at >= since)
+    return query.order_by(WellnessAlert.created_at.desc(), WellnessAlert.id.desc()).limit(limit).all()
+
+
+@router.get("/export/wellness-metrics")
+def export_wellness_metrics(
+    userids: list[int] = Query(..., min_length=1, max_length=1000),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream all wellness metrics for one or more users as NDJSON or CSV.
+
+    Rows are read with a server-side cursor, so memory use does not grow
+    with history length.
+
+    - **userids**: Users to export (repeat the parameter for several users)
+    - **format**: `ndjson` (default) or `csv`
+    - **start_date** / **end_date**: Optional time range filter
+    """
+    found = {
+        userid for (userid,) in
+        db.query(UserTable.userid).filter(UserTable.userid.in_(userids))
+    }
+    missing = sorted(set(userids) - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+
+    return StreamingResponse(
+        stream_wellness_metrics(db, userids, format, start_date, end_date),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="wellness_metrics.{format}"'
+        }
+    )
+
+
+def _metric_payload(metric) -> dict:
+    """Event payload for anything with id, time and wellness_score attributes."""
+    return {
+        "id": metric.id,
+        "time": metric.time.isoformat(),
+        "wellness_score": metric.wellness_score,
+    }
+
+
+def _live_topics(db: Session, userids: list[int]) -> list[str]:
+    """Check the watched users exist and return their topics."""
+    try:
+        userids = sorted(set(userids))
+        if len(userids) > settings.live_max_cohort_size:
+            raise HTTPException(
+                status_code=422,
+                detail=f"At most {settings.live_max_cohort_size} users can be watched at once",
+            )
+        found = {
+            userid for (userid,) in
+            db.query(UserTable.userid).filter(UserTable.userid.in_(userids))
+        }
+        missing = [userid for userid in userids if userid not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+    finally:
+        # Live streams outlive the request; don't hold a pooled connection for them
+        db.close()
+    return [user_topic(userid) for userid in userids]
+
+
+async def _stream_websocket(websocket: WebSocket, db: Session, userids: list[int]) -> None:
+    try:
+        topics = await run_in_threadpool(_live_topics, db, userids)
+    except HTTPException as exc:
+        await websocket.close(code=1008, reason=str(exc.detail))
+        return
+
+    # Subscribe before accepting so no event published after the handshake is missed
+    broker = get_broker()
+    subscription = broker.subscribe(topics)
+    getter = receiver = None
+    try:
+        await websocket.accept()
+        await websocket.send_json({"type": "subscribed", "userids": sorted(set(userids))})
+        receiver = asyncio.ensure_future(websocket.receive())
+        while True:
+            getter = getter or asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                # Messages from the client are ignored
+                receiver = asyncio.ensure_future(websocket.receive())
+            if getter in done:
+                await websocket.send_json(getter.result())
+                getter = None
+    finally:
+        for task in (getter, receiver):
+            if task is not None:
+                task.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def _sse_events(topics: list[str]):
+    broker = get_broker()
+    subscription = broker.subscribe(topics)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.live_keepalive_seconds)
+            except TimeoutError:
+                # Keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _sse_response(topics: list[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_events(topics),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/users/{userid}/live")
+async def watch_user_websocket(websocket: WebSocket, userid: int, db: Session = Depends(get_db)):
+    """
+    Push a user's new and deleted metrics, updated running summary and alerts.
+
+    Each message is a JSON event whose `type` is `metric_created`,
+    `metrics_created` (a batch), `metric_deleted` or `alert`; the first
+    message is `subscribed`.
+    """
+    await _stream_websocket(websocket, db, [userid])
+
+
+@router.websocket("/live")
+async def watch_cohort_websocket(
+    websocket: WebSocket,
+    userids: list[int] = Query(..., min_length=1),
+    db: Session = Depends(get_db)
+):
+    """Push live events for a cohort of users (repeat `userids` for each user)."""
+    await _stream_websocket(websocket, db, userids)
+
+
+@router.get("/users/{userid}/events")
+async def watch_user_events(userid: int, db: Session = Depends(get_db)):
+    """Server-Sent Events version of the `/users/{userid}/live` WebSocket."""
+    return _sse_response(await run_in_threadpool(_live_topics, db, [userid]))
+
+
+@router.get("/events")
+async def watch_cohort_events(
+    userids: list[int] = Query(..., min_length=1),
+    db: Session = Depends(get_db)
+):
+    """Server-Sent Events version of the `/live` WebSocket."""
+    return _sse_response(await run_in_threadpool(_live_topics, db, userids))
+
+
 @router.delete("/wellness-metrics/{metric_id}", status_code=204)
 def delete_wellness_metric(metric_id: int, db: Session = Depends(get_db)):
     """Delete a wellness metric by ID."""
@@ -209,8 +787,14 @@ def delete_wellness_metric(metric_id: int, db: Session = Depends(get_db)):
     if not metric:
         raise HTTPException(status_code=404, detail="Wellness metric not found")
 
+    userid, payload = metric.userid, _metric_payload(metric)
+    note_write(userid)
     db.delete(metric)
+    db.flush()
+    summary = state_summary(rebuild_state(db, userid))
     db.commit()
+
+    publish_metric_event("metric_deleted", userid, payload, summary)
     return None
 
 
@@ -227,4 +811,5 @@ def delete_user(userid: int, db: Session = Depends(get_db)):
 
     db.delete(user)
     db.commit()
+    note_write(userid)
     return None
@@ -0,0 +1,225 @@
+"""
+Bulk import of wellness metrics from CSV or NDJSON.
+
+The input is read as a stream and written in chunks: on PostgreSQL each chunk
+is loaded with `COPY wellness_metrics FROM STDIN`, elsewhere (SQLite) with a
+single executemany insert. Rows are validated in-stream (0-10 score range,
+parseable time, existing userid) and invalid rows are rejected without
+stopping the import. Imported scores update each user's running wellness
+state but do not raise alerts.
+
+Every chunk is committed on its own. `ImportResult.next_row` is the first
+data row not yet committed, so a failed import (a database error, or input
+that is not UTF-8 or not valid CSV) can be resumed by passing it back as
+`skip_rows`.
+"""
+
+import csv
+import io
+import json
+import math
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.alerts import record_bulk_scores
+from app.config import settings
+from app.models import UserTable, WellnessMetrics
+
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass
+class ImportResult:
+    """Progress and outcome of a bulk import."""
+
+    rows_imported: int = 0
+    rows_rejected: int = 0
+    chunks_committed: int = 0
+    next_row: int = 0
+    completed: bool = False
+    errors: list[str] = field(default_factory=list)
+
+    def reject(self, row_number: int, reason: str) -> None:
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"row {row_number}: {reason}")
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, object]]:
+    """Yield (data row number, raw record) pairs; row numbers start at 0."""
+    if fmt == "csv":
+        yield from enumerate(csv.DictReader(lines))
+        return
+
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError:
+            yield row_number, None
+        row_number += 1
+
+
+def parse_record(record) -> tuple[int, datetime, float]:
+    """
+    Validate one raw record.
+
+    Returns:
+        tuple: (userid, time, wellness_score)
+
+    Raises:
+        ValueError: If the record is malformed or out of range
+    """
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+
+    try:
+        userid = int(record["userid"])
+        score = float(record["wellness_score"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("userid and wellness_score are required numbers")
+
+    if math.isnan(score) or not 0 <= score <= 10:
+        raise ValueError(f"wellness_score {score} out of range 0-10")
+
+    raw_time = record.get("time")
+    if raw_time:
+        try:
+            time = datetime.fromisoformat(str(raw_time))
+        except ValueError:
+            raise ValueError(f"invalid time {raw_time!r}")
+        if time.tzinfo is not None:
+            # Stored times are naive UTC
+            time = time.astimezone(UTC).replace(tzinfo=None)
+    else:
+        time = datetime.utcnow()
+
+    return userid, time, score
+
+
+def _copy_rows(db: Session, rows: list[tuple[int, datetime, float]]) -> None:
+    """Load rows with PostgreSQL COPY inside the session's transaction."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for userid, time, score in rows:
+        writer.writerow([userid, time.isoformat(), score])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY wellness_metrics (userid, time, wellness_score) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _write_chunk(
+    db: Session, chunk: list[tuple[int, tuple]], result: ImportResult
+) -> None:
+    userids = {userid for _, (userid, _, _) in chunk}
+    existing = {
+        userid
+        for (userid,) in db.query(UserTable.userid).filter(
+            UserTable.userid.in_(userids)
+        )
+    }
+
+    rows = []
+    for row_number, row in chunk:
+        if row[0] in existing:
+            rows.append(row)
+        else:
+            result.reject(row_number, f"user {row[0]} not found")
+
+    if rows:
+        if db.get_bind().dialect.name == "postgresql":
+            _copy_rows(db, rows)
+        else:
+            db.execute(
+                insert(WellnessMetrics),
+                [
+                    {"userid": userid, "time": time, "wellness_score": score}
+                    for userid, time, score in rows
+                ],
+            )
+        record_bulk_scores(db, rows)
+    db.commit()
+
+    result.rows_imported += len(rows)
+    result.chunks_committed += 1
+
+
+def import_wellness_metrics(
+    db: Session,
+    lines: Iterable[str],
+    fmt: str,
+    chunk_size: int | None = None,
+    skip_rows: int = 0,
+    progress: Callable[[ImportResult], None] | None = None,
+) -> ImportResult:
+    """
+    Stream records from `lines` into wellness_metrics.
+
+    Args:
+        db: Database session
+        lines: Input lines (an open text file works)
+        fmt: "csv" (with a header row) or "ndjson"
+        chunk_size: Rows per COPY/insert and commit (default IMPORT_CHUNK_SIZE)
+        skip_rows: Data rows to skip, to resume an earlier import
+        progress: Called with the running result after each committed chunk
+
+    Returns:
+        ImportResult: Counts, the resume point and the first few errors
+    """
+    chunk_size = chunk_size or settings.import_chunk_size
+    result = ImportResult(next_row=skip_rows)
+    chunk: list[tuple[int, tuple]] = []
+    pending_rejects = 0
+
+    def flush(next_row: int) -> None:
+        nonlocal chunk, pending_rejects
+        _write_chunk(db, chunk, result)
+        result.next_row = next_row
+        chunk = []
+        pending_rejects = 0
+        if progress:
+            progress(result)
+
+    try:
+        row_number = skip_rows - 1
+        for row_number, record in iter_records(lines, fmt):
+            if row_number < skip_rows:
+                continue
+            try:
+                chunk.append((row_number, parse_record(record)))
+            except ValueError as e:
+                result.reject(row_number, str(e))
+                pending_rejects += 1
+            if len(chunk) + pending_rejects >= chunk_size:
+                flush(row_number + 1)
+
+        if chunk or pending_rejects:
+            flush(row_number + 1)
+        result.completed = True
+    except SQLAlchemyError as e:
+        db.rollback()
+        result.errors.append(
+            f"aborted at row {result.next_row}: {e.__class__.__name__}"
+        )
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The input itself is unreadable past this point; earlier chunks stay committed
+        db.rollback()
+        result.errors.append(
+            f"aborted at row {result.next_row}: unreadable input ({e})"
+        )
+
+    return result
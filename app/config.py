@@ -14,9 +14,42 @@ class Settings(BaseSettings):
     # Render provides DATABASE_URL with proper connection string
     database_url: str = "postgresql://localhost:5432/umatter"
 
-    # For Render compatibility: override connection args if needed
-    database_pool_size: int = 5
-    database_max_overflow: int = 10
+    # Connection pool, per worker process. Leave DATABASE_POOL_SIZE unset to
+    # size it automatically from DATABASE_MAX_CONNECTIONS and WEB_CONCURRENCY
+    # (see build_engine_kwargs in app/database.py)
+    database_pool_size: int | None = None
+    database_max_overflow: int = 10  # only used with an explicit pool size
+    database_pool_timeout: float = 10  # seconds to wait for a free connection
+    database_pool_recycle: int = 1800  # seconds; -1 never recycles
+    database_pool_use_lifo: bool = (
+        True  # reuse warm connections so idle ones can be recycled
+    )
+    # "pessimistic" pings on every checkout (one extra round trip); "optimistic"
+    # relies on pool_recycle and invalidates the pool when a disconnect is seen
+    database_pre_ping: str = "optimistic"
+    database_max_connections: int = 100  # server-side max_connections
+    database_reserved_connections: int = 10  # left for cron jobs, migrations and psql
+    web_concurrency: int = 1  # worker processes sharing the database
+    # Transaction-pooling PgBouncer in front of Postgres: no client-side pool
+    database_pgbouncer: bool = False
+
+    # Read replicas (comma-separated URLs) for read-only routes; see app/replicas.py
+    database_replica_urls: str = ""
+    replica_eject_seconds: float = (
+        30  # take a failing replica out of rotation this long
+    )
+    read_your_writes_seconds: float = (
+        5  # users read from the primary this long after writing
+    )
+
+    # Rows fetched per server-side cursor batch when streaming exports
+    export_batch_size: int = 1000
+    # Rows per COPY/insert and commit in bulk imports
+    import_chunk_size: int = 5000
+    # Parquet dataset root for the analytics export (see export_parquet.py)
+    analytics_export_dir: str = "exports"
+    # How long ids missing below the export watermark are re-checked (late commits)
+    analytics_export_gap_seconds: float = 600
 
     # OAuth Providers
     google_client_id: str | None = None
@@ -55,6 +88,92 @@ class Settings(BaseSettings):
     anthropic_api_key: str | None = None
     anthropic_model: str = "claude-3-5-sonnet-20241022"
 
+    # LLM load shaping (0 requests/minute disables a limit)
+    llm_rate_limit_per_minute: float = 10
+    llm_rate_limit_burst: int = 5
+    # Shared by every X-User-Id from one client address
+    llm_rate_limit_per_ip_per_minute: float = 20
+    llm_rate_limit_per_ip_burst: int = 10
+    llm_global_rate_limit_per_minute: float = 30  # Groq free tier: 30 req/min
+    llm_global_rate_limit_burst: int = 10
+    llm_max_concurrency: int = 4  # concurrent completions per provider
+    llm_concurrency_wait_seconds: float = 2.0
+    rate_limit_redis_url: str | None = None  # share buckets across workers
+
+    # Ask the provider for JSON output where supported (used by /llm/analyze-message)
+    llm_json_mode: bool = True
+
+    # Local CPU sentiment fast path for /llm/analyze-message (off by default)
+    local_sentiment_enabled: bool = False
+    local_sentiment_model: str | None = (
+        None  # HF model name; None uses the built-in lexicon
+    )
+    local_sentiment_min_confidence: float = 0.75  # below this, escalate to the LLM
+    local_sentiment_batch_size: int = 16
+    local_sentiment_max_wait_ms: float = 5
+
+    # LLM resilience
+    llm_request_timeout: float = 30.0  # seconds per attempt
+    llm_retry_attempts: int = 3
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_hedge_enabled: bool = False  # duplicate calls slower than the p95 latency
+    llm_hedge_min_delay_seconds: float = 1.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+
+    # Semantic cache for /llm/chat (off by default)
+    semantic_cache_enabled: bool = False
+    semantic_cache_model: str | None = "sentence-transformers/all-MiniLM-L6-v2"
+    semantic_cache_threshold: float = 0.92  # cosine similarity needed for a hit
+    semantic_cache_max_entries: int = 1000
+    semantic_cache_ttl_seconds: float = 3600
+
+    # Chat sessions: token budget for summary + recent history in each prompt
+    chat_context_token_budget: int = 1200
+    chat_summary_max_tokens: int = 250
+
+    # Wellness insight prompt size limit (long score series are bucketed)
+    insight_prompt_token_budget: int = 700
+
+    # Precomputed wellness insights (see precompute_insights.py)
+    insight_max_age_hours: float = 24  # stored insights older than this are regenerated
+    insight_active_days: int = 7  # precompute for users who logged scores this recently
+    insight_precompute_concurrency: int = 2
+
+    # Wellness alerts, detected incrementally as scores are recorded
+    alert_low_score: float = 3.0  # scores below this count as low
+    alert_consecutive_low: int = 3  # alert after this many low scores in a row
+    alert_ewma_alpha: float = 0.3  # weight of the newest score in the moving average
+    alert_sharp_decline: float = 3.0  # alert when a score is this far below the average
+    alert_webhook_url: str | None = (
+        None  # POST each alert here (from a background thread)
+    )
+    alert_webhook_timeout: float = 5.0  # seconds
+
+    # Live updates (WebSocket / SSE)
+    live_redis_url: str | None = None  # fan out events across workers via Redis pub/sub
+    live_queue_size: int = (
+        100  # events buffered per subscriber; oldest dropped when full
+    )
+    live_keepalive_seconds: float = 15  # SSE comment sent when idle
+    live_max_cohort_size: int = 1000
+
+    # Records per binary (packed / MessagePack) POST /wellness-metrics/batch
+    batch_max_records: int = 10000
+
+    # Idempotency-Key support for wellness metric writes (see app/idempotency.py)
+    idempotency_ttl_hours: float = (
+        24  # a retry with the same key after this is a new request
+    )
+    idempotency_cache_size: int = 10000  # recent keys kept in memory per worker
+
+    # Observability (OpenTelemetry tracing, off by default)
+    otel_enabled: bool = False
+    otel_service_name: str = "umatter-backend"
+    otel_exporter: str = "otlp"  # "otlp" or "file"
+    otel_exporter_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    otel_file_path: str = "traces.jsonl"
+
     # Application
     frontend_url: str = "http://localhost:3000"
     environment: str = "development"
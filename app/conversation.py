@@ -0,0 +1,125 @@
+"""
+Server-side chat memory with bounded context windows.
+
+Each session stores a rolling summary plus the messages that have not been
+summarized yet. The prompt is assembled newest-first under a token budget,
+and once the stored history exceeds that budget the oldest messages are
+folded into the summary, so prompt size stays flat however long the
+conversation gets.
+"""
+
+import logging
+
+from app.config import settings
+from app.llm_client import create_chat_completion
+from app.models import ChatMessage, ChatSession
+from app.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a supportive wellness conversation.
+Merge the new messages into the current summary. Keep the user's key feelings,
+concerns, circumstances and any coping strategies already suggested.
+Write in third person, plain prose, under 150 words."""
+
+
+def build_context_messages(
+    session: ChatSession, system_prompt: str, new_message: str
+) -> list[dict]:
+    """
+    Assemble the prompt for the next turn.
+
+    Includes the system prompt, the session summary and as many of the most
+    recent messages as fit in CHAT_CONTEXT_TOKEN_BUDGET, then `new_message`.
+    The summary and `new_message` count against the budget.
+    """
+    budget = settings.chat_context_token_budget - estimate_tokens(new_message)
+    messages = [{"role": "system", "content": system_prompt}]
+
+    if session.summary:
+        messages.append(
+            {
+                "role": "system",
+                "content": f"Summary of the conversation so far:\n{session.summary}",
+            }
+        )
+        budget -= estimate_tokens(session.summary)
+
+    recent = []
+    for message in reversed(session.messages):
+        if message.token_count > budget:
+            break
+        budget -= message.token_count
+        recent.append({"role": message.role, "content": message.content})
+
+    messages.extend(reversed(recent))
+    messages.append({"role": "user", "content": new_message})
+    return messages
+
+
+def append_turn(
+    session: ChatSession, user_message: str, assistant_message: str
+) -> None:
+    """Store one user/assistant exchange on the session."""
+    for role, content in (("user", user_message), ("assistant", assistant_message)):
+        session.messages.append(
+            ChatMessage(
+                role=role, content=content, token_count=estimate_tokens(content)
+            )
+        )
+
+
+def compact_session(session: ChatSession, client) -> bool:
+    """
+    Fold the oldest messages into the summary once stored history exceeds the budget.
+
+    Keeps the newest messages that fit in half of CHAT_CONTEXT_TOKEN_BUDGET.
+    If the summary call fails the history is left as is; context assembly
+    still stays within budget by dropping the oldest messages.
+
+    This makes a second, blocking LLM call (up to CHAT_SUMMARY_MAX_TOKENS of
+    output), so a turn that triggers compaction takes roughly twice as long.
+    It happens about once every CHAT_CONTEXT_TOKEN_BUDGET / 2 tokens of chat.
+
+    Returns:
+        bool: True if the session was compacted (caller should commit)
+    """
+    budget = settings.chat_context_token_budget
+    messages = list(session.messages)
+    if sum(m.token_count for m in messages) <= budget:
+        return False
+
+    kept_tokens = 0
+    split = len(messages)
+    while split > 0 and kept_tokens + messages[split - 1].token_count <= budget // 2:
+        split -= 1
+        kept_tokens += messages[split].token_count
+    to_fold = messages[:split]
+
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in to_fold)
+    prompt = f"""Current summary:
+{session.summary or "(none yet)"}
+
+New messages:
+{transcript}
+
+Write the updated summary."""
+
+    try:
+        completion = create_chat_completion(
+            client,
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3,
+            max_tokens=settings.chat_summary_max_tokens,
+        )
+    except Exception:
+        logger.warning("Could not summarize chat session %s", session.id, exc_info=True)
+        return False
+
+    session.summary = completion.choices[0].message.content.strip()
+    for message in to_fold:
+        session.messages.remove(message)
+    return True
@@ -2,34 +2,119 @@
 Database configuration and session management.
 
 Sets up SQLAlchemy engine, session factory, and base model class.
+
+The engine is created by `init_engine()` (called from the app lifespan and
+by the CLI scripts) rather than at import time, to keep imports cheap.
 """
 
+import threading
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.config import Settings, settings
+
+# Sync route handlers run in AnyIO's threadpool (40 threads by default), so a
+# worker process never holds more connections than this at once
+MAX_CONCURRENT_HANDLERS = 40
+
+
+def pool_sizing(cfg: Settings) -> tuple[int, int]:
+    """
+    Return (pool_size, max_overflow) for one worker process.
+
+    An explicit DATABASE_POOL_SIZE wins. Otherwise the server's connections,
+    minus the reserved ones, are split evenly between WEB_CONCURRENCY workers
+    (capped at the handler threadpool size), half kept open and half as
+    overflow. E.g. 100 max connections, 10 reserved, 4 workers: 22 per
+    worker, as pool_size=11 + max_overflow=11.
+    """
+    if cfg.database_pool_size is not None:
+        return cfg.database_pool_size, cfg.database_max_overflow
+
+    available = cfg.database_max_connections - cfg.database_reserved_connections
+    per_worker = available // max(1, cfg.web_concurrency)
+    budget = max(1, min(per_worker, MAX_CONCURRENT_HANDLERS))
+    pool_size = max(1, budget // 2)
+    return pool_size, budget - pool_size
+
+
+def build_engine_kwargs(cfg: Settings) -> dict:
+    """Build create_engine() keyword arguments from settings."""
+    # Prepare connection args for Render compatibility
+    connect_args = {}
+    if (
+        cfg.database_url.startswith("postgresql://")
+        and "localhost" not in cfg.database_url
+    ):
+        # Production/Render: Use SSL
+        connect_args = {"sslmode": "require"}
+
+    kwargs = {
+        "connect_args": connect_args,
+        "echo": cfg.environment == "development",  # Log SQL in dev mode
+    }
+
+    if cfg.database_pgbouncer:
+        # PgBouncer does the pooling; connections are only valid for one
+        # transaction, so don't keep any. psycopg2 never uses server-side
+        # prepared statements, so nothing else needs disabling.
+        kwargs["poolclass"] = NullPool
+        return kwargs
+
+    pool_size, max_overflow = pool_sizing(cfg)
+    kwargs.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=cfg.database_pool_timeout,
+        pool_recycle=cfg.database_pool_recycle,
+        pool_use_lifo=cfg.database_pool_use_lifo,
+        pool_pre_ping=cfg.database_pre_ping == "pessimistic",
+    )
+    return kwargs
+
+
+# Create session factory (bound to the engine by init_engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+
+def init_engine() -> Engine:
+    """Create the SQLAlchemy engine and bind SessionLocal to it (idempotent)."""
+    global _engine
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                settings.database_url, **build_engine_kwargs(settings)
+            )
+            SessionLocal.configure(bind=_engine)
+        return _engine
+
+
+def get_engine() -> Engine:
+    """Return the engine, creating it if needed."""
+    return _engine or init_engine()
+
+
+def dispose_engine(close: bool = True) -> None:
+    """
+    Drop the engine and its pool (called on shutdown and after fork).
+
+    Args:
+        close: Close pooled connections. Pass False in a forked child so it
+            does not close sockets that still belong to the parent.
+    """
+    global _engine
 
-from app.config import settings
-
-# Prepare connection args for Render compatibility
-connect_args = {}
-if (
-    settings.database_url.startswith("postgresql://")
-    and "localhost" not in settings.database_url
-):
-    # Production/Render: Use SSL
-    connect_args = {"sslmode": "require"}
-
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.database_url,
-    connect_args=connect_args,
-    pool_pre_ping=True,  # Verify connections before using them
-    pool_size=settings.database_pool_size,
-    max_overflow=settings.database_max_overflow,
-    echo=settings.environment == "development",  # Log SQL in dev mode
-)
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=close)
+            _engine = None
 
 
 # Base class for all models
@@ -0,0 +1,99 @@
+"""
+Streaming export of wellness metrics.
+
+Rows are read with a server-side cursor (`yield_per`, which also turns on
+`stream_results`) and written out batch by batch as NDJSON or CSV, so memory
+use stays constant however long a user's history is.
+"""
+
+import csv
+import io
+import json
+from collections.abc import Iterator
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import WellnessMetrics
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_COLUMNS = ["id", "userid", "time", "wellness_score"]
+
+
+def stream_wellness_metrics(
+    db: Session,
+    userids: list[int],
+    fmt: str,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+) -> Iterator[str]:
+    """
+    Yield the users' metrics as NDJSON lines or CSV, ordered by user and time.
+
+    Closes `db` when the stream is exhausted or abandoned, since streaming
+    outlives the request handler.
+    """
+    query = db.query(
+        WellnessMetrics.id,
+        WellnessMetrics.userid,
+        WellnessMetrics.time,
+        WellnessMetrics.wellness_score,
+    ).filter(WellnessMetrics.userid.in_(userids))
+
+    if start_date:
+        query = query.filter(WellnessMetrics.time >= start_date)
+    if end_date:
+        query = query.filter(WellnessMetrics.time <= end_date)
+
+    rows = query.order_by(WellnessMetrics.userid, WellnessMetrics.time).yield_per(
+        settings.export_batch_size
+    )
+
+    try:
+        if fmt == "csv":
+            yield from _csv_chunks(rows)
+        else:
+            yield from _ndjson_chunks(rows)
+    finally:
+        db.close()
+
+
+def _ndjson_chunks(rows) -> Iterator[str]:
+    lines = []
+    for metric_id, userid, time, score in rows:
+        lines.append(
+            json.dumps(
+                {
+                    "id": metric_id,
+                    "userid": userid,
+                    "time": time.isoformat(),
+                    "wellness_score": score,
+                }
+            )
+        )
+        if len(lines) >= settings.export_batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _csv_chunks(rows) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    pending = 0
+    for metric_id, userid, time, score in rows:
+        writer.writerow([metric_id, userid, time.isoformat(), score])
+        pending += 1
+        if pending >= settings.export_batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
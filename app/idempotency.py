@@ -0,0 +1,204 @@
+"""
+Idempotency keys for write endpoints.
+
+Clients on flaky networks retry POSTs whose responses they never received.
+A request sent with an `Idempotency-Key` header has its key, a hash of its
+payload and its response stored in the idempotency_keys table, in the same
+transaction as the write itself. A retry with the same key gets the stored
+response back (marked `Idempotent-Replayed: true`) without writing again;
+reusing a key for a different payload is rejected with 422. The primary key
+on the key means a concurrent duplicate fails to commit instead of inserting
+twice, and gets a 409 it can retry.
+
+Keys expire after IDEMPOTENCY_TTL_HOURS and expired rows are purged
+periodically. Recent responses are also kept in a small in-process TTL
+cache, so most replays skip the database.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+PURGE_INTERVAL_SECONDS = 600
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    body: str
+    created_at: datetime
+
+
+class TTLCache:
+    """Size-bounded LRU mapping whose entries expire after `ttl_seconds`."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = TTLCache(
+    settings.idempotency_cache_size, settings.idempotency_ttl_hours * 3600
+)
+_last_purge = 0.0
+
+
+def request_hash(payload: Any) -> str:
+    """Stable hash of a raw request body or a JSON-compatible payload."""
+    if not isinstance(payload, bytes):
+        payload = json.dumps(
+            jsonable_encoder(payload), sort_keys=True, separators=(",", ":")
+        ).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+class IdempotentRequest:
+    """A write made under an idempotency key, scoped to one endpoint."""
+
+    def __init__(self, db: Session, scope: str, key: str, payload: Any):
+        self.db = db
+        self.key = f"{scope}:{key}"
+        self.request_hash = request_hash(payload)
+        self._response: StoredResponse | None = None
+
+    def _stored(self) -> StoredResponse | None:
+        stored = _cache.get(self.key)
+        if stored is None:
+            row = self.db.get(IdempotencyKey, self.key)
+            if row is not None:
+                stored = StoredResponse(
+                    row.request_hash, row.status_code, row.response_body, row.created_at
+                )
+        if stored is None or stored.created_at < _expiry_cutoff():
+            return None
+        return stored
+
+    def replay(self) -> Response | None:
+        """Return the stored response for this key, or None if the key is new (or expired)."""
+        stored = self._stored()
+        if stored is None:
+            return None
+        if stored.request_hash != self.request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key has already been used for a different request",
+            )
+        _cache.put(self.key, stored)
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    def record(self, status_code: int, body: Any) -> None:
+        """Add the response to the session, to be committed with the write."""
+        _maybe_purge(self.db, keep=self.key)
+        self._response = StoredResponse(
+            self.request_hash,
+            status_code,
+            json.dumps(jsonable_encoder(body)),
+            datetime.utcnow(),
+        )
+        existing = self.db.get(IdempotencyKey, self.key)
+        if existing is not None:
+            if existing.created_at >= _expiry_cutoff():
+                # A concurrent request with this key committed after replay()
+                self.db.rollback()
+                raise _key_in_use()
+            # An expired key is being reused: start afresh
+            self.db.delete(existing)
+            self.db.flush()
+        # A plain INSERT, so a concurrent duplicate fails on the primary key
+        self.db.add(
+            IdempotencyKey(
+                key=self.key,
+                request_hash=self.request_hash,
+                status_code=status_code,
+                response_body=self._response.body,
+                created_at=self._response.created_at,
+            )
+        )
+
+    def commit(self) -> None:
+        """Commit the write; a concurrent request holding the same key turns into a 409."""
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            if self.db.get(IdempotencyKey, self.key) is None:
+                raise
+            raise _key_in_use()
+        _cache.put(self.key, self._response)
+
+
+def _key_in_use() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="A request with this Idempotency-Key is already being processed; retry it",
+    )
+
+
+def idempotent_request(
+    db: Session, scope: str, key: str | None, payload: Any
+) -> IdempotentRequest | None:
+    """Return an IdempotentRequest, or None when the client sent no key."""
+    return IdempotentRequest(db, scope, key, payload) if key else None
+
+
+def _expiry_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(hours=settings.idempotency_ttl_hours)
+
+
+def _maybe_purge(db: Session, keep: str) -> None:
+    """Delete expired keys other than `keep`, at most once per PURGE_INTERVAL_SECONDS per process."""
+    global _last_purge
+
+    now = time.monotonic()
+    if now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.created_at < _expiry_cutoff(),
+        IdempotencyKey.key != keep,
+    ).delete(synchronize_session=False)
@@ -0,0 +1,197 @@
+"""
+Compact binary formats for batch wellness metric ingestion.
+
+High-frequency clients (wearable integrations) can send a batch as:
+
+- `application/x-wellness-packed`: a packed array of little-endian
+  `(userid: int32, epoch seconds: int64, score: float32)` records, 16 bytes
+  each with no header or padding
+- `application/msgpack`: an array of `[userid, epoch seconds, score]` arrays
+
+Packed records are read in place with NumPy (`numpy.frombuffer` over the
+request body, no per-record objects) when it is installed, falling back to
+`struct.iter_unpack` over a memoryview. The whole batch is then validated
+at once instead of building a Pydantic model per record.
+"""
+
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+PACKED_CONTENT_TYPE = "application/x-wellness-packed"
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+PACKED_RECORD = struct.Struct("<iqf")
+# Largest MessagePack record: a fixarray header and three 9-byte values
+MSGPACK_MAX_RECORD_SIZE = 28
+
+# float32 carries about 6 significant digits; rounding recovers the value the
+# client meant (7.3 rather than 7.300000190734863)
+SCORE_DECIMALS = 5
+
+# Largest epoch that still converts to a datetime (9999-12-31T23:59:59)
+MAX_EPOCH = 253_402_300_799
+MAX_USERID = 2**31 - 1  # user_table.userid is a 32-bit integer
+_EPOCH = datetime(1970, 1, 1)
+_MAX_ERRORS = 10
+
+
+class IngestError(ValueError):
+    """The batch could not be decoded or contains invalid records."""
+
+
+class UnsupportedContentTypeError(IngestError):
+    """The batch's content type is unknown or its decoder is not installed."""
+
+
+@dataclass
+class MetricColumns:
+    """A decoded batch, one sequence per field (NumPy arrays or lists)."""
+
+    userids: object
+    epochs: object
+    scores: object
+
+    def __len__(self) -> int:
+        return len(self.userids)
+
+    def to_rows(self) -> list[dict]:
+        """Rows for a bulk insert into wellness_metrics."""
+        userids, epochs, scores = (
+            _to_list(column) for column in (self.userids, self.epochs, self.scores)
+        )
+        return [
+            {
+                "userid": userid,
+                "time": _EPOCH + timedelta(seconds=epoch),
+                "wellness_score": score,
+            }
+            for userid, epoch, score in zip(userids, epochs, scores)
+        ]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _to_list(column) -> list:
+    return column.tolist() if hasattr(column, "tolist") else list(column)
+
+
+def decode_packed(body: bytes) -> MetricColumns:
+    """Decode `application/x-wellness-packed` records."""
+    if len(body) % PACKED_RECORD.size:
+        raise IngestError(
+            f"Body length {len(body)} is not a multiple of the {PACKED_RECORD.size}-byte record size"
+        )
+
+    np = _numpy()
+    if np is not None:
+        records = np.frombuffer(
+            body,
+            dtype=np.dtype([("userid", "<i4"), ("epoch", "<i8"), ("score", "<f4")]),
+        )
+        scores = np.round(records["score"].astype(np.float64), SCORE_DECIMALS)
+        return MetricColumns(records["userid"], records["epoch"], scores)
+
+    userids, epochs, scores = tuple(
+        zip(*PACKED_RECORD.iter_unpack(memoryview(body)))
+    ) or ((), (), ())
+    return MetricColumns(
+        userids, epochs, [round(score, SCORE_DECIMALS) for score in scores]
+    )
+
+
+def decode_msgpack(body: bytes) -> MetricColumns:
+    """Decode a MessagePack array of `[userid, epoch, score]` arrays."""
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedContentTypeError(
+            "MessagePack support is not installed (pip install msgpack)"
+        )
+
+    try:
+        records = msgpack.unpackb(body)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise IngestError(f"Invalid MessagePack body: {e}")
+    if not isinstance(records, list) or not all(
+        isinstance(record, list | tuple) and len(record) == 3 for record in records
+    ):
+        raise IngestError("Expected an array of [userid, epoch, score] arrays")
+
+    userids, epochs, scores = (
+        (list(column) for column in zip(*records)) if records else ([], [], [])
+    )
+    # bool is an int subclass, so true/false would otherwise pass as 1/0
+    if not all(
+        isinstance(v, int) and not isinstance(v, bool) for v in userids + epochs
+    ):
+        raise IngestError("userid and epoch must be integers")
+    if not all(isinstance(v, int | float) and not isinstance(v, bool) for v in scores):
+        raise IngestError("score must be a number")
+    return MetricColumns(userids, epochs, [float(score) for score in scores])
+
+
+def max_body_size(content_type: str, max_records: int) -> int:
+    """Largest body a batch of `max_records` records can have, for rejecting before reading."""
+    if content_type == PACKED_CONTENT_TYPE:
+        return max_records * PACKED_RECORD.size
+    if content_type in MSGPACK_CONTENT_TYPES:
+        return 5 + max_records * MSGPACK_MAX_RECORD_SIZE  # 5: array32 header
+    raise UnsupportedContentTypeError(f"Unsupported content type: {content_type}")
+
+
+def decode_metrics(content_type: str, body: bytes) -> MetricColumns:
+    """Decode a binary batch by content type."""
+    if content_type == PACKED_CONTENT_TYPE:
+        return decode_packed(body)
+    if content_type in MSGPACK_CONTENT_TYPES:
+        return decode_msgpack(body)
+    raise UnsupportedContentTypeError(f"Unsupported content type: {content_type}")
+
+
+def validate_metrics(columns: MetricColumns) -> list[str]:
+    """
+    Check every record's userid, score (0-10) and time at once.
+
+    Returns:
+        list: Messages for the first few invalid records (empty if all are valid)
+    """
+    np = _numpy()
+    if np is not None and hasattr(columns.scores, "dtype"):
+        scores, epochs = columns.scores, columns.epochs
+        valid = (
+            (columns.userids > 0)
+            & (scores >= 0)
+            & (scores <= 10)
+            & (epochs >= 0)
+            & (epochs <= MAX_EPOCH)
+        )
+        invalid = np.flatnonzero(~valid)[:_MAX_ERRORS].tolist()
+    else:
+        invalid = [
+            i
+            for i, record in enumerate(
+                zip(columns.userids, columns.epochs, columns.scores)
+            )
+            if _record_error(*record)
+        ][:_MAX_ERRORS]
+
+    return [
+        f"record {i}: {_record_error(columns.userids[i], columns.epochs[i], columns.scores[i])}"
+        for i in invalid
+    ]
+
+
+def _record_error(userid, epoch, score) -> str | None:
+    if not 0 < userid <= MAX_USERID:
+        return f"userid {int(userid)} is out of range"
+    if not 0 <= score <= 10:
+        return f"score {float(score)} must be between 0 and 10"
+    if not 0 <= epoch <= MAX_EPOCH:
+        return f"epoch {int(epoch)} is out of range"
+    return None
@@ -0,0 +1,230 @@
+"""
+Wellness insight generation and storage.
+
+Insights are generated by the LLM from a user's recent scores and stored in
+`wellness_insights` together with a fingerprint of the score window. The
+insight endpoint serves a stored insight instantly while the window is
+unchanged and fresh; `precompute_insights.py` fills the table off-peak for
+active users so the morning rush does not all hit the provider at once.
+Windows start at UTC midnight, so they only move once a day and an insight
+computed overnight is still current when users ask for it.
+"""
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.llm_client import create_chat_completion, get_model_name
+from app.models import WellnessInsight, WellnessMetrics
+from app.prompts import build_wellness_insight_prompt
+from app.schemas import WellnessInsightResponse
+from app.telemetry import start_span
+
+logger = logging.getLogger(__name__)
+
+INSIGHT_SYSTEM_PROMPT = (
+    "You are a compassionate wellness coach providing personalized insights."
+)
+
+
+def compute_trend(scores: list[float]) -> str:
+    """Compare the first and second half of the scores."""
+    if len(scores) < 2:
+        return "insufficient data"
+
+    mid = len(scores) // 2
+    first_half_avg = sum(scores[:mid]) / mid
+    second_half_avg = sum(scores[mid:]) / (len(scores) - mid)
+
+    if second_half_avg > first_half_avg + 0.5:
+        return "improving"
+    if second_half_avg < first_half_avg - 0.5:
+        return "declining"
+    return "stable"
+
+
+def window_start(days: int) -> datetime:
+    """
+    Start of a `days`-day insight window: UTC midnight `days` days ago.
+
+    Aligned to the day so the window (and its fingerprint) only moves at
+    midnight, and an insight precomputed off-peak still matches later that day.
+    """
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+def window_fingerprint(db: Session, userid: int, start_date: datetime) -> str | None:
+    """
+    Identify the scores in a user's window with one aggregate query.
+
+    Returns:
+        str: "<count>:<max id>:<sum>", or None if the window is empty
+    """
+    count, max_id, total = (
+        db.query(
+            func.count(WellnessMetrics.id),
+            func.max(WellnessMetrics.id),
+            func.sum(WellnessMetrics.wellness_score),
+        )
+        .filter(WellnessMetrics.userid == userid, WellnessMetrics.time >= start_date)
+        .one()
+    )
+
+    if not count:
+        return None
+    return f"{count}:{max_id}:{total:.2f}"
+
+
+def get_stored_insight(
+    db: Session, userid: int, days: int, fingerprint: str
+) -> WellnessInsight | None:
+    """Return the stored insight if it matches `fingerprint` and is not too old."""
+    stored = db.get(WellnessInsight, (userid, days))
+    if stored is None or stored.window_fingerprint != fingerprint:
+        return None
+    if datetime.utcnow() - stored.generated_at > timedelta(
+        hours=settings.insight_max_age_hours
+    ):
+        return None
+    return stored
+
+
+def generate_insight(
+    db: Session,
+    client,
+    userid: int,
+    days: int,
+    start_date: datetime,
+    fingerprint: str,
+    read_db: Session | None = None,
+) -> WellnessInsight:
+    """
+    Generate an insight for the window with the LLM and store it.
+
+    Scores are loaded from `read_db` (e.g. a replica) if given, else `db`.
+    """
+    with start_span("wellness_insight.load_metrics", userid=userid, days=days):
+        metrics = (
+            (read_db or db)
+            .query(WellnessMetrics)
+            .filter(
+                WellnessMetrics.userid == userid, WellnessMetrics.time >= start_date
+            )
+            .order_by(WellnessMetrics.time.asc())
+            .all()
+        )
+
+    scores = [m.wellness_score for m in metrics]
+    trend = compute_trend(scores)
+
+    # Long windows are summarized to stay within the prompt budget
+    with start_span("wellness_insight.build_prompt", score_count=len(scores)):
+        prompt = build_wellness_insight_prompt(
+            [(m.time, m.wellness_score) for m in metrics],
+            days=days,
+            trend=trend,
+            token_budget=settings.insight_prompt_token_budget,
+        )
+
+    chat_completion = create_chat_completion(
+        client,
+        messages=[
+            {"role": "system", "content": INSIGHT_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.7,
+        max_tokens=400,
+    )
+
+    insight = WellnessInsight(
+        userid=userid,
+        period_days=days,
+        window_fingerprint=fingerprint,
+        average_score=round(sum(scores) / len(scores), 2),
+        trend=trend,
+        total_entries=len(scores),
+        insight=chat_completion.choices[0].message.content,
+        model_used=get_model_name(),
+        generated_at=datetime.utcnow(),
+    )
+    return store_insight(db, insight)
+
+
+def store_insight(db: Session, insight: WellnessInsight) -> WellnessInsight:
+    """Insert or replace the stored insight for the user and period."""
+    try:
+        insight = db.merge(insight)
+        db.commit()
+    except IntegrityError:
+        # A concurrent request stored the same key first; keep theirs
+        db.rollback()
+    return insight
+
+
+def insight_response(
+    insight: WellnessInsight, cached: bool = False
+) -> WellnessInsightResponse:
+    """Build the API response for a stored or freshly generated insight."""
+    return WellnessInsightResponse(
+        userid=insight.userid,
+        period_days=insight.period_days,
+        average_score=insight.average_score,
+        trend=insight.trend,
+        total_entries=insight.total_entries,
+        insight=insight.insight,
+        model_used=insight.model_used,
+        generated_at=insight.generated_at,
+        cached=cached,
+    )
+
+
+def precompute_insights(session_factory, client, days: int = 7) -> dict:
+    """
+    Generate insights for every user with scores in the last INSIGHT_ACTIVE_DAYS.
+
+    Users whose stored insight is still current are skipped. At most
+    INSIGHT_PRECOMPUTE_CONCURRENCY insights are generated at once.
+
+    Returns:
+        dict: Number of users per outcome ("generated", "fresh", "empty", "failed")
+    """
+    db = session_factory()
+    try:
+        active_since = datetime.utcnow() - timedelta(days=settings.insight_active_days)
+        userids = [
+            userid
+            for (userid,) in db.query(WellnessMetrics.userid)
+            .filter(WellnessMetrics.time >= active_since)
+            .distinct()
+        ]
+    finally:
+        db.close()
+
+    def precompute(userid: int) -> str:
+        db = session_factory()
+        try:
+            start_date = window_start(days)
+            fingerprint = window_fingerprint(db, userid, start_date)
+            if fingerprint is None:
+                return "empty"
+            if get_stored_insight(db, userid, days, fingerprint):
+                return "fresh"
+            generate_insight(db, client, userid, days, start_date, fingerprint)
+            return "generated"
+        except Exception:
+            logger.exception("Failed to precompute insight for user %s", userid)
+            return "failed"
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(
+        max_workers=settings.insight_precompute_concurrency
+    ) as pool:
+        return dict(Counter(pool.map(precompute, userids)))
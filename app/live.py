@@ -0,0 +1,197 @@
+"""
+Live wellness updates over WebSocket and Server-Sent Events.
+
+Write routes publish events (new or deleted metrics with the user's updated
+running summary, and alerts) to per-user topics ("user:<id>"); a batch
+create publishes one event per user rather than one per metric. Subscribers
+listen to one user or a cohort of users.
+
+The default broker fans events out in-process: publishing is thread-safe
+(sync route handlers run in a threadpool) and hands each event to the
+subscriber's event loop with `call_soon_threadsafe`. With several worker
+processes, set LIVE_REDIS_URL so events published by any worker reach
+subscribers on all of them via Redis pub/sub.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections.abc import Iterable
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def user_topic(userid: int) -> str:
+    return f"user:{userid}"
+
+
+class Subscription:
+    """A subscriber's bounded event queue, bound to its event loop."""
+
+    def __init__(self, topics: set[str], maxsize: int):
+        self.topics = topics
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event: dict) -> None:
+        """Enqueue from the subscriber's loop, dropping the oldest event if full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """In-process pub/sub."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Subscribe to topics; must be called from the subscriber's event loop."""
+        subscription = Subscription(set(topics), self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, topic: str, event: dict) -> None:
+        """Publish from any thread."""
+        self._deliver(topic, event)
+
+    def _deliver(self, topic: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it is about to unsubscribe
+                pass
+
+    def close(self) -> None:
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """Pub/sub across processes: publishes to Redis and delivers what it hears locally."""
+
+    CHANNEL_PREFIX = "umatter:live:"
+
+    def __init__(self, url: str, queue_size: int = 100):
+        import redis
+
+        super().__init__(queue_size)
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        # run_in_thread requires a handler for every subscription
+        self._pubsub.psubscribe(**{f"{self.CHANNEL_PREFIX}*": self._on_message})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, topic: str, event: dict) -> None:
+        self._redis.publish(f"{self.CHANNEL_PREFIX}{topic}", json.dumps(event))
+
+    def _on_message(self, message: dict) -> None:
+        channel = message["channel"].decode()
+        self._deliver(channel[len(self.CHANNEL_PREFIX) :], json.loads(message["data"]))
+
+    def close(self) -> None:
+        self._listener.stop()
+        self._pubsub.close()
+
+
+_broker: LocalBroker | None = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> LocalBroker:
+    """Return the shared broker (Redis-backed if LIVE_REDIS_URL is set)."""
+    global _broker
+
+    with _broker_lock:
+        if _broker is None:
+            if settings.live_redis_url:
+                _broker = RedisBroker(settings.live_redis_url, settings.live_queue_size)
+            else:
+                _broker = LocalBroker(settings.live_queue_size)
+        return _broker
+
+
+def close_broker() -> None:
+    """Stop the broker (called on shutdown)."""
+    global _broker
+
+    with _broker_lock:
+        if _broker is not None:
+            _broker.close()
+            _broker = None
+
+
+def state_summary(state) -> dict | None:
+    """Running summary from a UserWellnessState, or None."""
+    if state is None:
+        return None
+    return {
+        "count": state.count,
+        "mean": round(state.mean, 2),
+        "ewma": round(state.ewma, 2) if state.ewma is not None else None,
+        "consecutive_low": state.consecutive_low,
+        "last_score": state.last_score,
+    }
+
+
+def _publish(userid: int, event: dict) -> None:
+    # Live updates are best effort: never fail the write that triggered them
+    try:
+        get_broker().publish(user_topic(userid), event)
+    except Exception:
+        logger.exception(
+            "Failed to publish live %s event for user %s", event["type"], userid
+        )
+
+
+def publish_metric_event(
+    kind: str, userid: int, metric: dict, summary: dict | None
+) -> None:
+    """Publish a metric_created or metric_deleted event to the user's topic."""
+    _publish(
+        userid, {"type": kind, "userid": userid, "metric": metric, "summary": summary}
+    )
+
+
+def publish_batch_event(
+    userid: int, count: int, latest: dict, summary: dict | None
+) -> None:
+    """Publish one metrics_created event for a user's scores in a batch."""
+    _publish(
+        userid,
+        {
+            "type": "metrics_created",
+            "userid": userid,
+            "count": count,
+            "latest": latest,
+            "summary": summary,
+        },
+    )
+
+
+def publish_alert_events(alert_payloads: list[dict]) -> None:
+    """Publish an alert event per payload (see app.alerts.alert_payload)."""
+    for payload in alert_payloads:
+        _publish(payload["userid"], {"type": "alert", **payload})
@@ -0,0 +1,138 @@
+"""
+Shared helpers for calling the LLM provider.
+
+All chat completions go through `create_chat_completion`, which layers, from
+the outside in: jittered retries for transient errors, the provider circuit
+breaker, optional hedging of slow calls, the per-provider concurrency cap and
+tracing.
+
+The provider SDK is imported on first use (see `get_groq_sdk_client`) to keep
+it out of the app's cold start.
+"""
+
+import math
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.ratelimit import provider_concurrency_slot
+from app.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    hedged_call,
+    retry_with_backoff,
+)
+from app.telemetry import start_span
+
+DEFAULT_GROQ_MODEL = "llama-3.1-70b-versatile"
+
+groq_breaker = CircuitBreaker(
+    "groq",
+    failure_threshold=settings.llm_circuit_failure_threshold,
+    reset_timeout=settings.llm_circuit_reset_seconds,
+)
+groq_latency = LatencyTracker()
+
+_groq_client = None
+_groq_client_lock = threading.Lock()
+
+
+def get_groq_sdk_client():
+    """Return the shared Groq client, importing the SDK on first use; None if GROQ_API_KEY is unset."""
+    global _groq_client
+
+    if not settings.groq_api_key:
+        return None
+    with _groq_client_lock:
+        if _groq_client is None:
+            from groq import Groq
+
+            # Retries are handled by create_chat_completion, not the SDK
+            _groq_client = Groq(api_key=settings.groq_api_key, max_retries=0)
+        return _groq_client
+
+
+def get_model_name() -> str:
+    """Return the configured Groq model name."""
+    return settings.groq_model or DEFAULT_GROQ_MODEL
+
+
+def _hedge_delay() -> float | None:
+    """Seconds to wait before hedging, or None if hedging is off or not yet calibrated."""
+    if not settings.llm_hedge_enabled:
+        return None
+    p95 = groq_latency.percentile(95)
+    if p95 is None:
+        return None
+    return max(p95, settings.llm_hedge_min_delay_seconds)
+
+
+def create_chat_completion(client, messages: list[dict], **params):
+    """
+    Create a chat completion and record it as an `llm.chat_completion` span.
+
+    Completions have no side effects, so transient provider errors are
+    retried and slow calls hedged; once the circuit breaker opens, calls fail
+    fast with a 503. Each attempt waits for a free provider concurrency slot;
+    raises a 429 HTTPException if none frees up in time.
+
+    Args:
+        client: Provider client exposing `chat.completions.create`
+        messages: Chat messages in OpenAI format
+        **params: Extra completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+        The provider's completion object
+    """
+    model = params.pop("model", None) or get_model_name()
+    params.setdefault("timeout", settings.llm_request_timeout)
+
+    def call():
+        with (
+            provider_concurrency_slot("groq"),
+            start_span(
+                "llm.chat_completion",
+                **{
+                    "gen_ai.system": "groq",
+                    "gen_ai.request.model": model,
+                    "gen_ai.request.max_tokens": params.get("max_tokens"),
+                    "gen_ai.request.temperature": params.get("temperature"),
+                },
+            ) as span,
+        ):
+            started = time.monotonic()
+            completion = client.chat.completions.create(
+                messages=messages, model=model, **params
+            )
+            groq_latency.record(time.monotonic() - started)
+
+            usage = getattr(completion, "usage", None)
+            if span is not None and usage is not None:
+                span.set_attribute(
+                    "gen_ai.response.model", getattr(completion, "model", None) or model
+                )
+                span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_tokens)
+                span.set_attribute(
+                    "gen_ai.usage.output_tokens", usage.completion_tokens
+                )
+
+        return completion
+
+    def attempt():
+        return groq_breaker.call(lambda: hedged_call(call, _hedge_delay()))
+
+    try:
+        return retry_with_backoff(
+            attempt,
+            attempts=settings.llm_retry_attempts,
+            base_delay=settings.llm_retry_base_delay_seconds,
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="The AI service is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
@@ -4,10 +4,33 @@ Main FastAPI application entry point.
 Sets up the FastAPI app with middleware, routes, and startup/shutdown events.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.alerts import close_alert_dispatcher
 from app.config import settings
+from app.database import dispose_engine, init_engine
+from app.live import close_broker
+from app.llm_client import groq_breaker
+from app.replicas import get_replica_router, read_your_writes_middleware
+from app.sentiment import close_local_scorer, get_local_scorer
+from app.telemetry import instrument_app, instrument_engine, shutdown_tracing
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the database engine and load models at startup; release them on shutdown."""
+    instrument_engine(init_engine())
+    get_local_scorer()  # no-op unless LOCAL_SENTIMENT_ENABLED
+    yield
+    close_local_scorer()
+    close_alert_dispatcher()
+    close_broker()
+    dispose_engine()
+    shutdown_tracing()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -16,6 +39,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url=f"{settings.api_prefix}/docs",
     redoc_url=f"{settings.api_prefix}/redoc",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -27,6 +51,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Read-your-writes across workers when read replicas are configured
+app.middleware("http")(read_your_writes_middleware)
+
 
 @app.get("/")
 async def root():
@@ -48,12 +75,14 @@ async def health_check():
         "services": {
             "database": "connected",  # Will implement actual check
             "ollama": "connected",  # Will implement actual check
+            "llm": {"groq": groq_breaker.status()},
+            "database_replicas": router.status() if (router := get_replica_router()) else [],
         },
     }
 
 
 # Import and include routers
-from app.api import wellness, llm
+from app.api import llm, wellness
 
 app.include_router(
     wellness.router,
@@ -66,3 +95,6 @@ app.include_router(
     prefix=f"{settings.api_prefix}/llm",
     tags=["llm", "ai"]
 )
+
+# Optional OpenTelemetry tracing (no-op unless OTEL_ENABLED=true)
+instrument_app(app)
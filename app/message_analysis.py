@@ -0,0 +1,113 @@
+"""
+Wellness analysis of a single user message.
+
+The LLM is asked for a JSON object (using the provider's JSON mode when
+LLM_JSON_MODE is on) with score, sentiment and concerns. `parse_analysis`
+accepts that JSON, JSON wrapped in extra text or code fences, and the older
+"Score: / Sentiment: / Concerns:" line format, so small format drift does not
+lose the score.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.llm_client import create_chat_completion
+
+ANALYSIS_SYSTEM_PROMPT = (
+    "You are a mental health assessment AI. Provide objective, clinical analysis."
+)
+
+ANALYSIS_PROMPT = """Analyze this message and respond with only a JSON object of the form:
+{{"score": <wellness score from 0-10, 0 = severe distress, 10 = excellent wellbeing>,
+ "sentiment": "<brief sentiment analysis, one sentence>",
+ "concerns": [<concerning indicators as short strings, empty if none>]}}
+
+Message: "{message}\""""
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+_SCORE_RE = re.compile(r"score\W*(-?\d+(?:\.\d+)?)", re.IGNORECASE)
+_SENTIMENT_RE = re.compile(r"sentiment\s*:\s*(.+)", re.IGNORECASE)
+_CONCERNS_RE = re.compile(r"concerns\s*:\s*(.+)", re.IGNORECASE)
+_NO_CONCERNS = {"", "none", "n/a", "no", "none."}
+
+
+@dataclass
+class MessageAnalysis:
+    """Typed result of a message analysis."""
+
+    score: float | None = None
+    sentiment: str | None = None
+    concerns: list[str] = field(default_factory=list)
+
+
+def _coerce_score(value) -> float | None:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, min(10.0, score))  # Clamp to 0-10
+
+
+def _coerce_concerns(value) -> list[str]:
+    if isinstance(value, list):
+        items = [str(item).strip() for item in value]
+    elif isinstance(value, str):
+        items = [item.strip() for item in re.split(r"[;,\n]", value)]
+    else:
+        return []
+    return [item for item in items if item.lower() not in _NO_CONCERNS]
+
+
+def parse_analysis(text: str) -> MessageAnalysis:
+    """Extract score, sentiment and concerns from the model output."""
+    match = _JSON_OBJECT_RE.search(text)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            sentiment = data.get("sentiment")
+            return MessageAnalysis(
+                score=_coerce_score(data.get("score")),
+                sentiment=str(sentiment).strip() if sentiment else None,
+                concerns=_coerce_concerns(data.get("concerns")),
+            )
+
+    # Line format fallback: "Score: 6 / Sentiment: ... / Concerns: ..."
+    score = _SCORE_RE.search(text)
+    sentiment = _SENTIMENT_RE.search(text)
+    concerns = _CONCERNS_RE.search(text)
+    return MessageAnalysis(
+        score=_coerce_score(score.group(1)) if score else None,
+        sentiment=sentiment.group(1).strip() if sentiment else None,
+        concerns=_coerce_concerns(concerns.group(1)) if concerns else [],
+    )
+
+
+def analyze_message_with_llm(client, message: str) -> tuple[MessageAnalysis, str]:
+    """
+    Ask the LLM to analyze `message`.
+
+    Returns:
+        tuple: (parsed analysis, raw model output)
+    """
+    params = {}
+    if settings.llm_json_mode:
+        params["response_format"] = {"type": "json_object"}
+
+    chat_completion = create_chat_completion(
+        client,
+        messages=[
+            {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": ANALYSIS_PROMPT.format(message=message)},
+        ],
+        temperature=0.3,
+        max_tokens=120,
+        **params,
+    )
+
+    raw = chat_completion.choices[0].message.content
+    return parse_analysis(raw), raw
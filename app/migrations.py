@@ -0,0 +1,122 @@
+"""
+Schema migrations tracked in the schema_version table.
+
+Each migration has a version number and an `upgrade(connection)` function;
+`migrate()` applies the ones newer than the recorded version in a single
+transaction (serialized with an advisory lock on PostgreSQL). A database with
+no tables at all is created straight from the models and stamped with every
+version. Checking an up-to-date database costs one small query, so it is
+cheap enough for every boot.
+
+To change the schema, update the models and append a Migration whose
+upgrade brings an existing database to the same state.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.database import Base
+from app.models import SchemaVersion
+
+# Arbitrary key for pg_advisory_xact_lock, shared by all migration runners
+MIGRATION_LOCK_KEY = 4_173_502
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A numbered schema change."""
+
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _create_tables(*names: str) -> Callable[[Connection], None]:
+    """Upgrade step creating the named model tables if they do not exist."""
+
+    def upgrade(connection: Connection) -> None:
+        tables = [Base.metadata.tables[name] for name in names]
+        Base.metadata.create_all(connection, tables=tables, checkfirst=True)
+
+    return upgrade
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1,
+        "Baseline: users, wellness metrics, chat memory and insights",
+        _create_tables(
+            "user_table",
+            "wellness_metrics",
+            "chat_sessions",
+            "chat_messages",
+            "wellness_insights",
+        ),
+    ),
+    Migration(
+        2,
+        "Incremental wellness state and alerts",
+        _create_tables("user_wellness_state", "wellness_alerts"),
+    ),
+    Migration(
+        3,
+        "Idempotency keys for wellness metric writes",
+        _create_tables("idempotency_keys"),
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(engine: Engine) -> int:
+    """Return the applied schema version (0 if never migrated)."""
+    with engine.connect() as connection:
+        try:
+            return (
+                connection.execute(select(func.max(SchemaVersion.version))).scalar()
+                or 0
+            )
+        except DBAPIError:
+            # schema_version does not exist yet
+            return 0
+
+
+def migrate(engine: Engine) -> list[Migration]:
+    """
+    Bring the database up to LATEST_VERSION.
+
+    Returns:
+        list: Migrations applied (empty if already up to date)
+    """
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+
+        if not inspect(connection).get_table_names():
+            # Empty database: create the current schema and stamp every version
+            Base.metadata.create_all(connection)
+            applied = MIGRATIONS
+        else:
+            SchemaVersion.__table__.create(connection, checkfirst=True)
+            version = (
+                connection.execute(select(func.max(SchemaVersion.version))).scalar()
+                or 0
+            )
+            applied = [m for m in MIGRATIONS if m.version > version]
+            for migration in applied:
+                migration.upgrade(connection)
+
+        for migration in applied:
+            connection.execute(
+                insert(SchemaVersion).values(
+                    version=migration.version, description=migration.description
+                )
+            )
+
+    return applied
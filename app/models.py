@@ -4,10 +4,31 @@ Database models for the Umatter application.
 Matches existing Render database structure:
 - user_table: [userid]
 - wellness_metrics: [id, userid, time, wellness_score]
+
+Chat memory:
+- chat_sessions: [id, userid, summary, created_at, updated_at]
+- chat_messages: [id, session_id, role, content, token_count, created_at]
+
+Precomputed insights:
+- wellness_insights: [userid, period_days, window_fingerprint, average_score,
+  trend, total_entries, insight, model_used, generated_at]
+
+Incremental wellness state and alerts (see app/alerts.py):
+- user_wellness_state: [userid, count, mean, ewma, consecutive_low, last_score,
+  last_time]
+- wellness_alerts: [id, userid, metric_id, kind, score, message, created_at]
+
+Idempotent writes (see app/idempotency.py):
+- idempotency_keys: [key, request_hash, status_code, response_body, created_at]
+
+Migrations (see app/migrations.py):
+- schema_version: [version, description, applied_at]
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from uuid import uuid4
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -22,6 +43,10 @@ class UserTable(Base):
 
     # Relationship to wellness metrics
     wellness_metrics = relationship("WellnessMetrics", back_populates="user", cascade="all, delete-orphan")
+    chat_sessions = relationship("ChatSession", back_populates="user", cascade="all, delete-orphan")
+    wellness_insights = relationship("WellnessInsight", cascade="all, delete-orphan")
+    wellness_state = relationship("UserWellnessState", uselist=False, cascade="all, delete-orphan")
+    wellness_alerts = relationship("WellnessAlert", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"<UserTable(userid={self.userid})>"
@@ -42,3 +67,140 @@ class WellnessMetrics(Base):
 
     def __repr__(self) -> str:
         return f"<WellnessMetrics(id={self.id}, userid={self.userid}, score={self.wellness_score}, time={self.time})>"
+
+
+class ChatSession(Base):
+    """
+    Server-side chat conversation.
+
+    Older turns are folded into `summary`, so only the summary and the most
+    recent messages are stored and sent to the LLM.
+    """
+
+    __tablename__ = "chat_sessions"
+
+    id = Column(String(32), primary_key=True, default=lambda: uuid4().hex)
+    userid = Column(Integer, ForeignKey("user_table.userid", ondelete="CASCADE"), nullable=True, index=True)
+    summary = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("UserTable", back_populates="chat_sessions")
+    messages = relationship(
+        "ChatMessage",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="ChatMessage.id",
+    )
+
+    def __repr__(self) -> str:
+        return f"<ChatSession(id={self.id}, userid={self.userid})>"
+
+
+class ChatMessage(Base):
+    """A not-yet-summarized message in a chat session."""
+
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String(32), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    role = Column(String(16), nullable=False)  # "user" or "assistant"
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    session = relationship("ChatSession", back_populates="messages")
+
+    def __repr__(self) -> str:
+        return f"<ChatMessage(id={self.id}, session_id={self.session_id}, role={self.role})>"
+
+
+class WellnessInsight(Base):
+    """
+    Latest LLM insight for a user's score window.
+
+    `window_fingerprint` identifies the scores the insight was generated from,
+    so a stored insight is only served while that window is unchanged.
+    """
+
+    __tablename__ = "wellness_insights"
+
+    userid = Column(Integer, ForeignKey("user_table.userid", ondelete="CASCADE"), primary_key=True)
+    period_days = Column(Integer, primary_key=True)
+    window_fingerprint = Column(String(64), nullable=False)
+    average_score = Column(Float, nullable=False)
+    trend = Column(String(32), nullable=False)
+    total_entries = Column(Integer, nullable=False)
+    insight = Column(Text, nullable=False)
+    model_used = Column(String(128), nullable=False)
+    generated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:
+        return f"<WellnessInsight(userid={self.userid}, period_days={self.period_days}, generated_at={self.generated_at})>"
+
+
+class UserWellnessState(Base):
+    """
+    Running statistics over a user's scores, updated in O(1) per insert.
+
+    `ewma` and `consecutive_low` follow scores in time order; `count` and
+    `mean` cover all scores.
+    """
+
+    __tablename__ = "user_wellness_state"
+
+    userid = Column(Integer, ForeignKey("user_table.userid", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    ewma = Column(Float)
+    consecutive_low = Column(Integer, nullable=False, default=0)
+    last_score = Column(Float)
+    last_time = Column(DateTime)
+
+    def __repr__(self) -> str:
+        return f"<UserWellnessState(userid={self.userid}, count={self.count}, ewma={self.ewma})>"
+
+
+class WellnessAlert(Base):
+    """A concerning pattern detected when a score was recorded."""
+
+    __tablename__ = "wellness_alerts"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    userid = Column(Integer, ForeignKey("user_table.userid", ondelete="CASCADE"), nullable=False, index=True)
+    metric_id = Column(Integer)  # score that triggered the alert (not a FK: alerts outlive deletes)
+    kind = Column(String(32), nullable=False)  # "consecutive_low" or "sharp_decline"
+    score = Column(Float, nullable=False)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:
+        return f"<WellnessAlert(id={self.id}, userid={self.userid}, kind={self.kind})>"
+
+
+class IdempotencyKey(Base):
+    """Response recorded for a write sent with an Idempotency-Key header."""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(320), primary_key=True)  # "<scope>:<client key>"
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey(key={self.key}, created_at={self.created_at})>"
+
+
+class SchemaVersion(Base):
+    """One row per applied schema migration."""
+
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(255), nullable=False)
+    applied_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<SchemaVersion(version={self.version})>"
@@ -0,0 +1,149 @@
+"""
+Prompt builders for LLM endpoints.
+
+`build_wellness_insight_prompt` keeps the insight prompt under a token budget
+however many scores a user has logged: short series are inlined verbatim,
+longer ones are summarized into daily (then progressively wider) buckets with
+mean/min/max/count, plus the most notable day-to-day changes.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from app.tokens import estimate_tokens
+
+_INSIGHT_TEMPLATE = """Analyze this user's wellness journey:
+
+{series}
+
+Statistics:
+- Average: {avg_score:.1f}
+- Trend: {trend}
+- Range: {min_score:.1f} to {max_score:.1f}
+- Number of recordings: {count}
+{changes}
+Provide:
+1. A brief, compassionate summary of their wellness pattern (2-3 sentences)
+2. 2-3 specific, actionable recommendations to support their wellbeing
+3. One encouraging message
+
+Keep it personal, warm, and under 200 words."""
+
+
+@dataclass
+class ScoreBucket:
+    """Summary statistics for the scores in one time bucket."""
+
+    start: date
+    mean: float
+    min: float
+    max: float
+    count: int
+
+
+def bucket_scores(
+    points: list[tuple[datetime, float]], width_days: int = 1
+) -> list[ScoreBucket]:
+    """
+    Group time-ordered (time, score) points into buckets `width_days` wide.
+
+    Buckets are aligned to the day of the first point; empty buckets are omitted.
+    """
+    if not points:
+        return []
+
+    origin = points[0][0].date()
+    grouped: dict[int, list[float]] = {}
+    for time, score in points:
+        grouped.setdefault((time.date() - origin).days // width_days, []).append(score)
+
+    return [
+        ScoreBucket(
+            start=date.fromordinal(origin.toordinal() + index * width_days),
+            mean=sum(scores) / len(scores),
+            min=min(scores),
+            max=max(scores),
+            count=len(scores),
+        )
+        for index, scores in sorted(grouped.items())
+    ]
+
+
+def _notable_changes(
+    daily: list[ScoreBucket], limit: int = 3, min_delta: float = 1.0
+) -> str:
+    """Describe the largest changes in daily mean between consecutive logged days."""
+    changes = [
+        (current.mean - previous.mean, previous.start, current.start)
+        for previous, current in zip(daily, daily[1:])
+        if abs(current.mean - previous.mean) >= min_delta
+    ]
+    if not changes:
+        return ""
+
+    changes.sort(key=lambda change: abs(change[0]), reverse=True)
+    lines = [
+        f"- {start:%b %d} to {end:%b %d}: {delta:+.1f}"
+        for delta, start, end in sorted(changes[:limit], key=lambda change: change[1])
+    ]
+    return "\nNotable changes in daily average:\n" + "\n".join(lines) + "\n"
+
+
+def _bucket_series(buckets: list[ScoreBucket], days: int, width_days: int) -> str:
+    label = "Daily" if width_days == 1 else f"{width_days}-day"
+    lines = [
+        f"{b.start:%b %d}: mean {b.mean:.1f}, min {b.min:.1f}, max {b.max:.1f}, n={b.count}"
+        for b in buckets
+    ]
+    return f"{label} wellness summary (0-10 scale, last {days} days):\n" + "\n".join(
+        lines
+    )
+
+
+def build_wellness_insight_prompt(
+    points: list[tuple[datetime, float]],
+    days: int,
+    trend: str,
+    token_budget: int,
+) -> str:
+    """
+    Build the wellness insight prompt within `token_budget` tokens.
+
+    Args:
+        points: Time-ordered (time, score) pairs
+        days: Length of the analysed window in days
+        trend: Trend label computed by the caller
+        token_budget: Maximum estimated prompt size in tokens
+
+    Returns:
+        str: The prompt text
+    """
+    scores = [score for _, score in points]
+    daily = bucket_scores(points)
+
+    def render(series: str, changes: str = "") -> str:
+        return _INSIGHT_TEMPLATE.format(
+            series=series,
+            avg_score=sum(scores) / len(scores),
+            trend=trend,
+            min_score=min(scores),
+            max_score=max(scores),
+            count=len(scores),
+            changes=changes,
+        )
+
+    scores_str = ", ".join(f"{s:.1f}" for s in scores)
+    prompt = render(
+        f"Recent wellness scores (0-10 scale, last {days} days): {scores_str}"
+    )
+    if estimate_tokens(prompt) <= token_budget:
+        return prompt
+
+    changes = _notable_changes(daily)
+    width_days = 1
+    while True:
+        buckets = daily if width_days == 1 else bucket_scores(points, width_days)
+        prompt = render(_bucket_series(buckets, days, width_days), changes)
+        if estimate_tokens(prompt) <= token_budget or len(buckets) == 1:
+            return prompt
+        width_days *= 2
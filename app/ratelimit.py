@@ -0,0 +1,209 @@
+"""
+Rate limiting and concurrency caps for LLM endpoints.
+
+Two independent controls shape load on the LLM provider:
+
+- Token buckets (per address, per user and global) limit how often requests
+  may start.
+  Bucket state lives in a `BucketStore`; the default is in-process, and a
+  Redis-backed store can be selected with RATE_LIMIT_REDIS_URL so limits are
+  shared across workers.
+- A semaphore per provider caps how many completions run at once, so a burst
+  cannot tie up the whole threadpool waiting on the provider.
+
+Both reject with 429 and a `Retry-After` header.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+
+class BucketStore(ABC):
+    """Storage backend for token buckets."""
+
+    @abstractmethod
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        """
+        Try to take `cost` tokens from the bucket at `key`.
+
+        Args:
+            key: Bucket identifier
+            rate: Refill rate in tokens per second
+            capacity: Maximum number of tokens (burst size)
+            cost: Tokens required by this request
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will be available
+        """
+
+
+class InMemoryBucketStore(BucketStore):
+    """Token buckets kept in a dict, local to the current process."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        # key -> (tokens, last update, rate, capacity)
+        self._buckets: dict[str, tuple[float, float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(
+                key, (capacity, now, rate, capacity)
+            )
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now, rate, capacity)
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        """Drop buckets that have refilled completely; they carry no state."""
+        full = [
+            key
+            for key, (tokens, updated, rate, capacity) in self._buckets.items()
+            if tokens + (now - updated) * rate >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+
+class RedisBucketStore(BucketStore):
+    """Token buckets in Redis, shared by every worker that uses the same server."""
+
+    # Refill and take atomically; returns the wait time in milliseconds.
+    _SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return math.ceil(wait * 1000)
+"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(self._SCRIPT)
+
+    def take(self, key, rate, capacity, cost=1.0):
+        wait_ms = self._take(
+            keys=[f"ratelimit:{key}"], args=[rate, capacity, cost, time.time()]
+        )
+        return int(wait_ms) / 1000
+
+
+def _create_store() -> BucketStore:
+    if settings.rate_limit_redis_url:
+        return RedisBucketStore(settings.rate_limit_redis_url)
+    return InMemoryBucketStore()
+
+
+bucket_store = _create_store()
+
+
+def _client_address(request: Request) -> str:
+    """The caller's address (the real client once proxy headers are trusted; see gunicorn_conf.py)."""
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(retry_after: float, detail: str):
+    raise HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _take(key: str, per_minute: float, burst: int, detail: str) -> None:
+    if per_minute <= 0:
+        return
+    wait = bucket_store.take(key, rate=per_minute / 60, capacity=burst)
+    if wait:
+        _reject(wait, detail)
+
+
+def enforce_llm_rate_limit(request: Request):
+    """
+    Dependency that applies the per-address, per-user and global LLM token buckets.
+
+    Every request is charged to its address's bucket. X-User-Id is not
+    authenticated, so it only selects a tighter per-user bucket within that
+    address; sending a new value each time never gets past the address limit.
+    A limit of 0 requests per minute disables that bucket.
+    """
+    address = _client_address(request)
+    _take(
+        f"llm:ip:{address}",
+        settings.llm_rate_limit_per_ip_per_minute,
+        settings.llm_rate_limit_per_ip_burst,
+        "Too many requests. Please slow down.",
+    )
+    _take(
+        f"llm:ip:{address}:user:{request.headers.get('x-user-id', '')}",
+        settings.llm_rate_limit_per_minute,
+        settings.llm_rate_limit_burst,
+        "Too many requests. Please slow down.",
+    )
+    _take(
+        "llm:global",
+        settings.llm_global_rate_limit_per_minute,
+        settings.llm_global_rate_limit_burst,
+        "The AI service is busy. Please try again shortly.",
+    )
+
+
+_provider_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_semaphores_lock = threading.Lock()
+
+
+def _get_semaphore(provider: str) -> threading.BoundedSemaphore:
+    with _semaphores_lock:
+        if provider not in _provider_semaphores:
+            _provider_semaphores[provider] = threading.BoundedSemaphore(
+                settings.llm_max_concurrency
+            )
+        return _provider_semaphores[provider]
+
+
+@contextmanager
+def provider_concurrency_slot(provider: str):
+    """
+    Hold one of the provider's concurrency slots for the duration of a call.
+
+    Waits up to LLM_CONCURRENCY_WAIT_SECONDS for a slot, then rejects with 429.
+    """
+    semaphore = _get_semaphore(provider)
+    if not semaphore.acquire(timeout=settings.llm_concurrency_wait_seconds):
+        _reject(1, "The AI service is at capacity. Please try again shortly.")
+    try:
+        yield
+    finally:
+        semaphore.release()
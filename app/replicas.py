@@ -0,0 +1,235 @@
+"""
+Read-replica routing.
+
+When DATABASE_REPLICA_URLS is set, read-only routes take their session from
+`get_read_db`, which picks a replica round-robin. A replica that fails to
+connect or raises a connection error is ejected for REPLICA_EJECT_SECONDS and
+reads fall back to the primary while no replica is healthy.
+
+Replicas lag the primary, so a client that wrote within the last
+READ_YOUR_WRITES_SECONDS reads from the primary instead. Write routes call
+`note_write(userid)`, which is tracked two ways:
+
+- `read_your_writes_middleware` sets a cookie with the time of the write, so
+  the client's next reads go to the primary whichever worker serves them
+- an in-process map of recent writers, matched on the `userid` path parameter
+  or the X-User-Id header, covers clients that do not keep cookies but only
+  when the read lands on the worker that took the write (one process)
+
+The cookie holds a wall-clock time, so worker hosts need synchronized clocks.
+"""
+
+import itertools
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import build_engine_kwargs, get_db
+
+logger = logging.getLogger(__name__)
+
+WRITE_COOKIE = "umatter_last_write"
+
+# Users written during the current request, set by read_your_writes_middleware
+_request_writes: ContextVar[list[int] | None] = ContextVar(
+    "request_writes", default=None
+)
+
+
+class Replica:
+    """One replica engine and its health state."""
+
+    def __init__(self, url: str, engine: Engine):
+        self.url = url
+        self.engine = engine
+        self.ejected_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas with time-based ejection."""
+
+    def __init__(
+        self,
+        urls: list[str],
+        eject_seconds: float = 30,
+        engine_factory: Callable[[str], Engine] | None = None,
+    ):
+        engine_factory = engine_factory or _create_replica_engine
+        self.replicas = [Replica(url, engine_factory(url)) for url in urls]
+        self.eject_seconds = eject_seconds
+        self._counter = itertools.count()
+
+    def pick(self) -> Replica | None:
+        """Return the next healthy replica, or None if all are ejected."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._counter) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    def eject(self, replica: Replica) -> None:
+        """Take a replica out of rotation for `eject_seconds`."""
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        logger.warning(
+            "Ejecting read replica %s for %ss", replica.engine.url, self.eject_seconds
+        )
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "url": r.engine.url.render_as_string(hide_password=True),
+                "healthy": r.healthy,
+            }
+            for r in self.replicas
+        ]
+
+
+class RecentWrites:
+    """Remembers which users wrote recently, for read-your-writes (this process only)."""
+
+    def __init__(self, window_seconds: float):
+        self.window = window_seconds
+        self._writes: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def note(self, userid: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._writes[userid] = now
+            if len(self._writes) > 10_000:
+                self._writes = {
+                    u: t for u, t in self._writes.items() if now - t < self.window
+                }
+
+    def is_recent(self, userid: int) -> bool:
+        written = self._writes.get(userid)
+        return written is not None and time.monotonic() - written < self.window
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes.clear()
+
+
+def _create_replica_engine(url: str) -> Engine:
+    cfg = settings.model_copy(update={"database_url": url})
+    return create_engine(url, **build_engine_kwargs(cfg))
+
+
+_router: ReplicaRouter | None = None
+_router_lock = threading.Lock()
+recent_writes = RecentWrites(settings.read_your_writes_seconds)
+
+
+def get_replica_router() -> ReplicaRouter | None:
+    """Return the shared router, creating replica engines on first use; None if unset."""
+    global _router
+
+    urls = [
+        url.strip() for url in settings.database_replica_urls.split(",") if url.strip()
+    ]
+    if not urls:
+        return None
+    with _router_lock:
+        if _router is None:
+            _router = ReplicaRouter(urls, eject_seconds=settings.replica_eject_seconds)
+        return _router
+
+
+def note_write(userid: int) -> None:
+    """Send this user's reads to the primary for the read-your-writes window."""
+    recent_writes.note(userid)
+    writes = _request_writes.get()
+    if writes is not None:
+        writes.append(userid)
+
+
+def wrote_recently(userid: int | None) -> bool:
+    return userid is not None and recent_writes.is_recent(userid)
+
+
+def _client_wrote_recently(request: Request) -> bool:
+    try:
+        written = float(request.cookies.get(WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return 0 <= time.time() - written < settings.read_your_writes_seconds
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """Set the last-write cookie on responses to requests that wrote."""
+    writes: list[int] = []
+    token = _request_writes.set(writes)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_writes.reset(token)
+    if writes:
+        response.set_cookie(
+            WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=math.ceil(settings.read_your_writes_seconds),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+def _request_userid(request: Request) -> int | None:
+    userid = request.path_params.get("userid") or request.headers.get("X-User-Id")
+    try:
+        return int(userid) if userid is not None else None
+    except ValueError:
+        return None
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Dependency for read-only routes: a replica session, or the primary one.
+
+    Yields:
+        Session: SQLAlchemy session bound to a replica or the primary
+    """
+    router = get_replica_router()
+    if (
+        router is None
+        or _client_wrote_recently(request)
+        or wrote_recently(_request_userid(request))
+    ):
+        yield db
+        return
+
+    replica = router.pick()
+    if replica is None:
+        yield db
+        return
+
+    session = Session(bind=replica.engine)
+    try:
+        session.connection()
+    except OperationalError:
+        router.eject(replica)
+        session.close()
+        yield db
+        return
+
+    try:
+        yield session
+    except OperationalError:
+        router.eject(replica)
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,199 @@
+"""
+Resilience helpers for calls to external services.
+
+- `retry_with_backoff` retries transient failures with full-jitter
+  exponential backoff.
+- `hedged_call` starts a second copy of a slow call once it has run longer
+  than a latency threshold and returns whichever finishes first.
+- `CircuitBreaker` fails fast while a dependency is down, letting a single
+  probe through after a cool-down to check whether it has recovered.
+
+Only use retries and hedging for idempotent calls.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from fastapi import HTTPException
+
+# Provider SDK errors that are worth retrying, matched by class name so this
+# module does not need to import any SDK.
+_TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+}
+_TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Return True if `exc` looks like a temporary failure worth retrying."""
+    if isinstance(exc, HTTPException | CircuitOpenError):
+        return False
+    if isinstance(exc, TimeoutError | ConnectionError):
+        return True
+    if type(exc).__name__ in _TRANSIENT_ERROR_NAMES:
+        return True
+    return getattr(exc, "status_code", None) in _TRANSIENT_STATUS_CODES
+
+
+def retry_with_backoff(
+    fn,
+    attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    retry_if=is_transient_error,
+):
+    """
+    Call `fn()` until it succeeds, retrying errors accepted by `retry_if`.
+
+    Sleeps a random time in [0, min(max_delay, base_delay * 2**n)] between
+    attempts ("full jitter") so that clients do not retry in lockstep.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt == attempts - 1 or not retry_if(exc):
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2**attempt)))
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> float | None:
+        """Return the `pct` percentile (0-100), or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+def hedged_call(fn, hedge_after: float | None):
+    """
+    Run `fn()`, starting a second copy if the first has not finished after
+    `hedge_after` seconds. Returns the first successful result.
+
+    With `hedge_after=None` the call is made directly without hedging.
+    """
+    if hedge_after is None:
+        return fn()
+
+    primary = _hedge_executor.submit(fn)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    pending = {primary, _hedge_executor.submit(fn)}
+    first_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            first_error = first_error or future.exception()
+    raise first_error
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker.
+
+    closed: calls pass; consecutive failures are counted.
+    open: calls fail fast with CircuitOpenError until `reset_timeout` passes.
+    half_open: one probe call is allowed; success closes, failure re-opens.
+
+    Errors that say nothing about the dependency's health (see `call`) are
+    neither a success nor a failure.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call should not be attempted."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let another probe through without changing the state."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, is_failure=is_transient_error):
+        """Call `fn()` through the breaker; only errors accepted by `is_failure` count."""
+        self.before_call()
+        try:
+            result = fn()
+        except Exception as exc:
+            if is_failure(exc):
+                self.record_failure()
+            else:
+                # e.g. a 400 for a bad request: the upstream may still be failing
+                self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def status(self) -> dict:
+        """Current state for health reporting."""
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
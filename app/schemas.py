@@ -6,11 +6,9 @@ Matches simplified database structure:
 - wellness_metrics: [id, userid, time, wellness_score]
 """
 
-from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from datetime import UTC, datetime
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, Field, field_validator
 
 # ============================================================================
 # User Schemas
@@ -32,7 +30,20 @@ class WellnessMetricCreate(BaseModel):
     """Schema for creating a new wellness metric entry."""
     userid: int
     wellness_score: float = Field(..., ge=0, le=10, description="Wellness score between 0-10")
-    time: Optional[datetime] = None  # If None, will use current time
+    time: datetime | None = None  # If None, will use current time
+
+    @field_validator("time")
+    @classmethod
+    def to_naive_utc(cls, value: datetime | None) -> datetime | None:
+        """Stored times are naive UTC; convert times sent with an offset."""
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(UTC).replace(tzinfo=None)
+        return value
+
+
+class WellnessMetricBatchCreate(BaseModel):
+    """Schema for creating several wellness metric entries at once."""
+    metrics: list[WellnessMetricCreate] = Field(..., min_length=1, max_length=1000)
 
 
 class WellnessMetricResponse(BaseModel):
@@ -46,12 +57,20 @@ class WellnessMetricResponse(BaseModel):
         from_attributes = True
 
 
+class BatchCreateResponse(BaseModel):
+    """Schema for the result of a batch wellness metric create."""
+    created: int
+    ids: list[int]  # ascending
+
+
 class WellnessHistoryResponse(BaseModel):
     """Schema for wellness history (list of metrics for a user)."""
     userid: int
-    metrics: List[WellnessMetricResponse]
-    total_count: int
-    average_score: Optional[float] = None
+    metrics: list[WellnessMetricResponse]
+    total_count: int  # Stats below cover the whole filtered range, not just this page
+    average_score: float | None = None
+    min_score: float | None = None
+    max_score: float | None = None
 
 
 # ============================================================================
@@ -61,12 +80,69 @@ class WellnessHistoryResponse(BaseModel):
 class WellnessTrendResponse(BaseModel):
     """Schema for wellness trend data."""
     userid: int
-    data_points: List[WellnessMetricResponse]
+    data_points: list[WellnessMetricResponse]
     trend: str  # "improving", "declining", "stable"
     average_score: float
     period_days: int
 
 
+class WellnessBucket(BaseModel):
+    """Schema for one time bucket of a wellness series."""
+    start: datetime
+    count: int
+    mean: float
+    min: float
+    max: float
+
+
+class WellnessSeriesResponse(BaseModel):
+    """Schema for a time-bucketed wellness series."""
+    userid: int
+    bucket: str  # "hour", "day" or "week"
+    buckets: list[WellnessBucket]
+    total_buckets: int  # before downsampling
+
+
+class UserSummariesRequest(BaseModel):
+    """Schema for requesting wellness summaries for many users at once."""
+    userids: list[int] = Field(..., min_length=1, max_length=1000)
+    days: int = Field(30, ge=1, le=365, description="Number of days to summarize")
+
+
+class UserWellnessSummary(BaseModel):
+    """Schema for one user's wellness summary over a period."""
+    userid: int
+    data_points: int
+    average_score: float | None = None
+    latest_score: float | None = None
+    latest_time: datetime | None = None
+    trend: str  # same rules as the wellness trend endpoint
+
+
+class WellnessAlertResponse(BaseModel):
+    """Schema for a detected wellness alert."""
+    id: int
+    userid: int
+    metric_id: int | None
+    kind: str  # "consecutive_low" or "sharp_decline"
+    score: float
+    message: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class BulkImportResponse(BaseModel):
+    """Schema for the result of a bulk wellness metric import."""
+    rows_imported: int
+    rows_rejected: int
+    chunks_committed: int
+    next_row: int  # pass as skip_rows to resume an incomplete import
+    completed: bool
+    errors: list[str]  # first few rejected rows
+
+
 # ============================================================================
 # LLM / Chat Schemas
 # ============================================================================
@@ -75,18 +151,45 @@ class WellnessTrendResponse(BaseModel):
 class ChatRequest(BaseModel):
     """Schema for chat requests."""
     message: str = Field(..., min_length=1, max_length=2000, description="User's message")
+    session_id: str | None = Field(None, description="Continue a server-side chat session")
 
 
 class ChatResponse(BaseModel):
     """Schema for chat responses."""
     message: str
     model_used: str
+    cached: bool = False  # True if served from the semantic cache
+    session_id: str | None = None
+
+
+class ChatSessionCreate(BaseModel):
+    """Schema for starting a chat session."""
+    userid: int | None = None
+
+
+class ChatSessionResponse(BaseModel):
+    """Schema for chat session responses."""
+    session_id: str
+    userid: int | None = None
+    summary: str
+    message_count: int
+
+
+class MessageAnalysisResponse(BaseModel):
+    """Schema for message analysis responses."""
+    message: str
+    estimated_wellness_score: float | None = Field(None, ge=0, le=10)
+    sentiment: str | None = None
+    concerns: list[str] = []
+    analysis: str  # Raw model output
+    source: str = "llm"  # "local" if answered by the local sentiment model
+    confidence: float | None = None  # Local model confidence (0-1)
 
 
 class WellnessInsightRequest(BaseModel):
     """Schema for requesting wellness insights."""
     userid: int
-    days: Optional[int] = Field(7, ge=1, le=90, description="Number of days to analyze")
+    days: int | None = Field(7, ge=1, le=90, description="Number of days to analyze")
 
 
 class WellnessInsightResponse(BaseModel):
@@ -98,3 +201,5 @@ class WellnessInsightResponse(BaseModel):
     total_entries: int
     insight: str
     model_used: str
+    generated_at: datetime | None = None
+    cached: bool = False  # True if a stored insight for the same scores was returned
@@ -0,0 +1,234 @@
+"""
+Semantic response cache for chat messages.
+
+Messages are embedded on the CPU and looked up with random-hyperplane LSH
+(approximate nearest neighbour), then re-ranked by exact cosine similarity.
+A cached answer is served when the best match is above the similarity
+threshold. The cache is size bounded (LRU) and entries expire after a TTL.
+Every entry belongs to a scope (the caller's user id), and a lookup only
+matches entries from its own scope, so one user's answer is never served
+to another.
+
+The embedding model is a small sentence-transformers model when that package
+is installed; otherwise a hashed character n-gram embedding is used, which
+only catches near-verbatim repeats.
+"""
+
+import logging
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HashingEmbedder:
+    """Dependency-free embedding from hashed words and character trigrams."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for word in re.findall(r"\w+", text.lower()):
+            padded = f"<{word}>"
+            features = [word] + [padded[i : i + 3] for i in range(len(padded) - 2)]
+            for feature in features:
+                h = zlib.crc32(feature.encode())
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(vector)
+
+
+class SentenceTransformerEmbedder:
+    """Small local sentence-transformers model, run on the CPU."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text: str) -> list[float]:
+        return self._model.encode(text, normalize_embeddings=True).tolist()
+
+
+def _normalize(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+def _dot(a: list[float], b: list[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+@dataclass
+class CacheLookup:
+    """Result of a cache lookup; `vector` is reused when storing the fresh answer."""
+
+    vector: list[float]
+    response: str | None = None
+    similarity: float = 0.0
+
+
+@dataclass
+class _Entry:
+    scope: str
+    vector: list[float]
+    response: str
+    created: float
+    signatures: list[int]
+
+
+class SemanticCache:
+    """LRU cache of responses keyed by message embedding."""
+
+    def __init__(
+        self,
+        embedder,
+        max_entries: int = 1000,
+        threshold: float = 0.92,
+        ttl_seconds: float = 3600,
+        num_tables: int = 4,
+        bits_per_table: int = 8,
+        seed: int = 0,
+    ):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.num_tables = num_tables
+        self.bits_per_table = bits_per_table
+        self._rng = random.Random(seed)
+        self._planes: list[list[list[float]]] | None = None
+        self._tables: list[dict[int, set[int]]] = [{} for _ in range(num_tables)]
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _signatures(self, vector: list[float]) -> list[int]:
+        if self._planes is None:
+            self._planes = [
+                [
+                    [self._rng.gauss(0, 1) for _ in vector]
+                    for _ in range(self.bits_per_table)
+                ]
+                for _ in range(self.num_tables)
+            ]
+        signatures = []
+        for planes in self._planes:
+            signature = 0
+            for bit, plane in enumerate(planes):
+                if _dot(plane, vector) >= 0:
+                    signature |= 1 << bit
+            signatures.append(signature)
+        return signatures
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for table, signature in zip(self._tables, entry.signatures):
+            bucket = table.get(signature)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del table[signature]
+
+    def lookup(self, scope: str, text: str) -> CacheLookup:
+        """Embed `text` and return the best answer cached in `scope` above the threshold."""
+        vector = self.embedder.embed(text)
+        now = time.monotonic()
+
+        with self._lock:
+            signatures = self._signatures(vector)
+            candidates = set()
+            for table, signature in zip(self._tables, signatures):
+                candidates |= table.get(signature, set())
+
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if now - entry.created > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                if entry.scope != scope:
+                    continue
+                similarity = _dot(vector, entry.vector)
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is not None and best_similarity >= self.threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return CacheLookup(
+                    vector, self._entries[best_id].response, best_similarity
+                )
+
+            self.misses += 1
+            return CacheLookup(vector, similarity=best_similarity)
+
+    def store(self, scope: str, vector: list[float], response: str) -> None:
+        """Cache `response` in `scope` under the embedding returned by `lookup`."""
+        with self._lock:
+            signatures = self._signatures(vector)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(
+                scope, vector, response, time.monotonic(), signatures
+            )
+            for table, signature in zip(self._tables, signatures):
+                table.setdefault(signature, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        """Size and hit-rate metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_chat_cache: SemanticCache | None = None
+_chat_cache_lock = threading.Lock()
+
+
+def _create_embedder():
+    if settings.semantic_cache_model:
+        try:
+            return SentenceTransformerEmbedder(settings.semantic_cache_model)
+        except ImportError:
+            logger.warning(
+                "sentence-transformers is not installed; "
+                "semantic cache falls back to hashed n-gram embeddings"
+            )
+    return HashingEmbedder()
+
+
+def get_chat_cache() -> SemanticCache | None:
+    """Return the shared chat cache, creating it on first use; None if disabled."""
+    global _chat_cache
+
+    if not settings.semantic_cache_enabled:
+        return None
+    with _chat_cache_lock:
+        if _chat_cache is None:
+            _chat_cache = SemanticCache(
+                _create_embedder(),
+                max_entries=settings.semantic_cache_max_entries,
+                threshold=settings.semantic_cache_threshold,
+                ttl_seconds=settings.semantic_cache_ttl_seconds,
+            )
+        return _chat_cache
@@ -0,0 +1,335 @@
+"""
+Local on-CPU sentiment scoring for /llm/analyze-message.
+
+When LOCAL_SENTIMENT_ENABLED is on, messages are first scored by a local
+model: a Hugging Face text-classification model if LOCAL_SENTIMENT_MODEL is
+set and `transformers` is installed, otherwise a small built-in lexicon
+model. Requests are micro-batched on a worker thread so concurrent messages
+share one inference call. Results below LOCAL_SENTIMENT_MIN_CONFIDENCE, and
+any message containing crisis language, are escalated to the LLM.
+"""
+
+import logging
+import math
+import queue
+import re
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Messages mentioning any of these always go to the LLM
+CRISIS_PATTERNS = re.compile(
+    r"\b(suicid\w*|kill(ing)? myself|end(ing)? my life|self[- ]harm\w*|hurt(ing)? myself|"
+    r"overdos\w*|don'?t want to (live|be alive)|no reason to live|want to die)\b",
+    re.IGNORECASE,
+)
+
+_LEXICON = {
+    # positive
+    "happy": 2.0,
+    "great": 2.0,
+    "good": 1.5,
+    "better": 1.5,
+    "calm": 1.5,
+    "relaxed": 1.5,
+    "grateful": 2.0,
+    "thankful": 2.0,
+    "excited": 2.0,
+    "hopeful": 1.5,
+    "proud": 1.5,
+    "love": 2.0,
+    "loved": 2.0,
+    "joy": 2.5,
+    "peaceful": 2.0,
+    "rested": 1.5,
+    "energized": 1.5,
+    "confident": 1.5,
+    "content": 1.5,
+    "fine": 0.5,
+    "okay": 0.5,
+    "ok": 0.5,
+    "amazing": 2.5,
+    "wonderful": 2.5,
+    "fantastic": 2.5,
+    "productive": 1.5,
+    "motivated": 1.5,
+    "supported": 1.5,
+    "enjoyed": 1.5,
+    "fun": 1.5,
+    "laughed": 1.5,
+    "improving": 1.5,
+    "optimistic": 2.0,
+    # negative
+    "sad": -2.0,
+    "anxious": -2.0,
+    "anxiety": -2.0,
+    "worried": -1.5,
+    "stressed": -2.0,
+    "stress": -1.5,
+    "tired": -1.0,
+    "exhausted": -2.0,
+    "lonely": -2.0,
+    "alone": -1.0,
+    "depressed": -3.0,
+    "depression": -3.0,
+    "angry": -2.0,
+    "upset": -2.0,
+    "scared": -2.0,
+    "afraid": -2.0,
+    "overwhelmed": -2.5,
+    "hopeless": -3.0,
+    "worthless": -3.0,
+    "awful": -2.5,
+    "terrible": -2.5,
+    "bad": -1.5,
+    "worse": -2.0,
+    "worst": -2.5,
+    "cry": -2.0,
+    "crying": -2.0,
+    "panic": -2.5,
+    "hurt": -2.0,
+    "pain": -2.0,
+    "miserable": -3.0,
+    "empty": -2.0,
+    "numb": -2.0,
+    "frustrated": -1.5,
+    "insomnia": -1.5,
+    "struggling": -2.0,
+    "nervous": -1.5,
+    "guilty": -1.5,
+    "ashamed": -2.0,
+    "broken": -2.5,
+    "lost": -1.5,
+    "hate": -2.5,
+}
+_NEGATIONS = {
+    "not",
+    "no",
+    "never",
+    "isn't",
+    "wasn't",
+    "don't",
+    "didn't",
+    "can't",
+    "cannot",
+    "hardly",
+}
+_INTENSIFIERS = {
+    "very": 1.5,
+    "really": 1.4,
+    "so": 1.3,
+    "extremely": 1.8,
+    "super": 1.4,
+    "bit": 0.6,
+    "slightly": 0.6,
+}
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+@dataclass
+class LocalScore:
+    """Wellness score from a local model."""
+
+    score: float  # 0-10
+    confidence: float  # 0-1
+    label: str  # "positive", "negative" or "neutral"
+    flagged: bool = False  # crisis language detected; must be escalated
+
+
+def _label(score: float) -> str:
+    if score >= 6:
+        return "positive"
+    if score <= 4:
+        return "negative"
+    return "neutral"
+
+
+class LexiconSentimentModel:
+    """Tiny rule-based model: weighted word lexicon with negation and intensifiers."""
+
+    name = "lexicon"
+
+    def predict_batch(self, texts: list[str]) -> list[LocalScore]:
+        return [self._predict(text) for text in texts]
+
+    def _predict(self, text: str) -> LocalScore:
+        words = _WORD_RE.findall(text.lower())
+        total = 0.0
+        hits = 0
+        for i, word in enumerate(words):
+            weight = _LEXICON.get(word)
+            if weight is None:
+                continue
+            hits += 1
+            window = words[max(0, i - 3) : i]
+            if any(w in _NEGATIONS or w.endswith("n't") for w in window):
+                weight = -weight * 0.75
+            if i > 0 and words[i - 1] in _INTENSIFIERS:
+                weight *= _INTENSIFIERS[words[i - 1]]
+            total += weight
+
+        polarity = math.tanh(total / 4)
+        score = round(5 + 5 * polarity, 1)
+        # Confidence grows with evidence (matched words) and strength of polarity
+        confidence = min(1.0, hits / 3) * (0.5 + 0.5 * abs(polarity))
+        return LocalScore(
+            score=score, confidence=round(confidence, 3), label=_label(score)
+        )
+
+
+def _label_polarity(label: str) -> float | None:
+    """Polarity (0 negative to 1 positive) of a model's class label, or None if unknown."""
+    label = label.lower()
+    for prefix, polarity in (("pos", 1.0), ("neu", 0.5), ("neg", 0.0)):
+        if label.startswith(prefix):
+            return polarity
+    return None
+
+
+class TransformerSentimentModel:
+    """
+    Hugging Face text-classification model run on the CPU.
+
+    The model's labels (`config.id2label`) must be named positive, neutral or
+    negative; with generic names such as LABEL_0 every message is escalated.
+    """
+
+    def __init__(self, model_name: str):
+        from transformers import pipeline
+
+        self.name = model_name
+        self._pipeline = pipeline(
+            "text-classification", model=model_name, device=-1, top_k=None
+        )
+        self._polarity = {
+            label.lower(): _label_polarity(label)
+            for label in self._pipeline.model.config.id2label.values()
+        }
+        unknown = sorted(
+            label for label, polarity in self._polarity.items() if polarity is None
+        )
+        if unknown:
+            logger.warning(
+                "Sentiment model %s has unknown labels %s; escalating to the LLM",
+                model_name,
+                unknown,
+            )
+
+    def predict_batch(self, texts: list[str]) -> list[LocalScore]:
+        results = []
+        for label_scores in self._pipeline(texts, truncation=True):
+            probs = {item["label"].lower(): item["score"] for item in label_scores}
+            if any(self._polarity.get(label) is None for label in probs):
+                results.append(LocalScore(score=5.0, confidence=0.0, label="neutral"))
+                continue
+            score = round(
+                10 * sum(p * self._polarity[label] for label, p in probs.items()), 1
+            )
+            results.append(
+                LocalScore(
+                    score=score, confidence=max(probs.values()), label=_label(score)
+                )
+            )
+        return results
+
+
+class BatchingScorer:
+    """
+    Runs a model on a worker thread, batching requests that arrive together.
+
+    The worker waits up to `max_wait_ms` after the first queued message to
+    fill a batch of at most `batch_size`.
+    """
+
+    def __init__(self, model, batch_size: int = 16, max_wait_ms: float = 5):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name="local-sentiment", daemon=True
+        )
+        self._worker.start()
+
+    def score(self, text: str) -> LocalScore:
+        """Score one message, blocking until its batch has run."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        result = future.result()
+        result.flagged = bool(CRISIS_PATTERNS.search(text))
+        return result
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            try:
+                while len(batch) < self.batch_size:
+                    item = self._queue.get(timeout=self.max_wait)
+                    if item is None:
+                        self._queue.put(None)
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            texts = [text for text, _ in batch]
+            try:
+                results = self.model.predict_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+_scorer: BatchingScorer | None = None
+_scorer_lock = threading.Lock()
+
+
+def _load_model():
+    if settings.local_sentiment_model:
+        try:
+            return TransformerSentimentModel(settings.local_sentiment_model)
+        except ImportError:
+            logger.warning(
+                "transformers is not installed; using the lexicon sentiment model"
+            )
+    return LexiconSentimentModel()
+
+
+def get_local_scorer() -> BatchingScorer | None:
+    """Return the shared local scorer, loading the model on first use; None if disabled."""
+    global _scorer
+
+    if not settings.local_sentiment_enabled:
+        return None
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = BatchingScorer(
+                _load_model(),
+                batch_size=settings.local_sentiment_batch_size,
+                max_wait_ms=settings.local_sentiment_max_wait_ms,
+            )
+        return _scorer
+
+
+def close_local_scorer() -> None:
+    """Stop the worker thread (called on shutdown)."""
+    global _scorer
+
+    with _scorer_lock:
+        if _scorer is not None:
+            _scorer.close()
+            _scorer = None
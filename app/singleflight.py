@@ -0,0 +1,52 @@
+"""
+Single-flight request coalescing.
+
+When several threads ask for the same key at the same time, only the first
+(the leader) runs the computation; the others wait and receive its result or
+exception. Once the computation finishes the key is forgotten, so later calls
+compute afresh - this deduplicates concurrent work, it is not a cache.
+"""
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run `fn()` unless a call for `key` is already in flight, then share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
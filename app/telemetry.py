@@ -0,0 +1,121 @@
+"""
+Optional OpenTelemetry tracing.
+
+Tracing is off unless OTEL_ENABLED=true. When enabled, every FastAPI route,
+every SQL statement and every LLM completion produces a span, exported either
+to an OTLP collector or to a local JSON-lines file for offline analysis.
+
+The OpenTelemetry packages are only imported when tracing is enabled, so the
+rest of the app can call `start_span()` unconditionally.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_tracer_provider = None
+_tracer = None
+_export_file = None  # opened by the "file" exporter; closed by shutdown_tracing
+
+
+def _build_exporter():
+    """Create the span exporter selected by OTEL_EXPORTER ("otlp" or "file")."""
+    global _export_file
+
+    if settings.otel_exporter == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        _export_file = open(settings.otel_file_path, "a", encoding="utf-8")
+        return ConsoleSpanExporter(
+            out=_export_file,
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter(endpoint=settings.otel_exporter_otlp_endpoint)
+
+
+def setup_tracing() -> bool:
+    """
+    Configure the global tracer provider.
+
+    Returns:
+        bool: True if tracing is active, False if disabled or unavailable
+    """
+    global _tracer_provider, _tracer
+
+    if _tracer_provider is not None:
+        return True
+    if not settings.otel_enabled:
+        return False
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but opentelemetry-sdk is not installed")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.otel_service_name})
+    )
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter()))
+    trace.set_tracer_provider(provider)
+
+    _tracer_provider = provider
+    _tracer = provider.get_tracer("app")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Export buffered spans and close the trace file (called on shutdown)."""
+    global _tracer_provider, _tracer, _export_file
+
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+        _tracer_provider = _tracer = None
+    if _export_file is not None:
+        _export_file.close()
+        _export_file = None
+
+
+def instrument_app(app) -> None:
+    """Add a server span for each FastAPI route."""
+    if not setup_tracing():
+        return
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=_tracer_provider)
+
+
+def instrument_engine(engine) -> None:
+    """Add a client span for each SQL statement executed on `engine`."""
+    if not setup_tracing():
+        return
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+    SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=_tracer_provider)
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """
+    Start a child span if tracing is active.
+
+    Yields:
+        The active span, or None when tracing is disabled
+    """
+    if _tracer is None:
+        yield None
+        return
+
+    attributes = {k: v for k, v in attributes.items() if v is not None}
+    with _tracer.start_as_current_span(name, attributes=attributes) as span:
+        yield span
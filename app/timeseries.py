@@ -0,0 +1,106 @@
+"""
+Time-bucketed wellness series for charts.
+
+Scores are grouped into hour, day or week buckets in SQL (`date_trunc` on
+PostgreSQL, the equivalent date functions on SQLite), so the response size
+depends on the period and bucket width, not on how many scores were logged.
+The bucket series can be reduced further to a target number of points with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of the
+line (peaks and dips) far better than taking every n-th bucket.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+
+from sqlalchemy import DateTime, func, literal_column, select, type_coerce
+from sqlalchemy.orm import Session
+
+from app.models import WellnessMetrics
+
+BUCKETS = ("hour", "day", "week")
+
+# SQLite has no date_trunc; weeks start on Monday as with PostgreSQL's
+_SQLITE_TRUNCATE = {
+    "hour": lambda time: func.strftime("%Y-%m-%d %H:00:00", time),
+    "day": lambda time: func.datetime(time, "start of day"),
+    "week": lambda time: func.datetime(time, "weekday 0", "-6 days", "start of day"),
+}
+
+
+def bucket_start(time, bucket: str, dialect: str):
+    """SQL expression truncating `time` to the start of its bucket (one of BUCKETS)."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    if dialect == "sqlite":
+        return type_coerce(_SQLITE_TRUNCATE[bucket](time), DateTime)
+    # Inline the unit so the SELECT and GROUP BY expressions are identical
+    return func.date_trunc(literal_column(f"'{bucket}'"), time)
+
+
+def bucket_wellness_scores(
+    db: Session,
+    userid: int,
+    bucket: str,
+    start_date: datetime,
+    end_date: datetime | None = None,
+) -> list[tuple[datetime, int, float, float, float]]:
+    """
+    Aggregate a user's scores per bucket.
+
+    Returns:
+        list: (bucket start, count, mean, min, max) tuples in time order
+    """
+    score = WellnessMetrics.wellness_score
+    start = bucket_start(
+        WellnessMetrics.time, bucket, db.get_bind().dialect.name
+    ).label("start")
+    query = select(
+        start, func.count(), func.avg(score), func.min(score), func.max(score)
+    ).where(
+        WellnessMetrics.userid == userid,
+        WellnessMetrics.time >= start_date,
+    )
+    if end_date:
+        query = query.where(WellnessMetrics.time <= end_date)
+
+    return [tuple(row) for row in db.execute(query.group_by(start).order_by(start))]
+
+
+def lttb(points: Sequence[tuple[float, float]], threshold: int) -> list[int]:
+    """
+    Pick `threshold` points that preserve the shape of an (x, y) series.
+
+    The first and last points are always kept. Between them the series is
+    split into threshold - 2 equal ranges, and from each range the point
+    forming the largest triangle with the previously kept point and the
+    average of the next range is kept.
+
+    Returns:
+        list: Indices of the kept points, ascending
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_points = points[next_start:next_end]
+        avg_x = sum(x for x, _ in next_points) / len(next_points)
+        avg_y = sum(y for _, y in next_points) / len(next_points)
+
+        ax, ay = points[a]
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, next_start):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+
+    kept.append(n - 1)
+    return kept
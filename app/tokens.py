@@ -0,0 +1,42 @@
+"""
+Token counting helpers for prompt budgeting.
+
+Uses tiktoken's cl100k_base encoding when it is installed and loadable; it is
+not the Llama tokenizer but is close enough for budgeting. Otherwise falls
+back to a word-piece heuristic (roughly one token per four characters of
+each word, one per punctuation mark).
+"""
+
+import math
+import re
+import threading
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+_WORDS_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+
+    with _encoder_lock:
+        if not _encoder_loaded:
+            _encoder_loaded = True
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                # Not installed, or the encoding file could not be downloaded
+                _encoder = None
+        return _encoder
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens `text` uses in a prompt."""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _WORDS_RE.findall(text))
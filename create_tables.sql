@@ -32,6 +32,94 @@ CREATE TABLE IF NOT EXISTS wellness_metrics (
 CREATE INDEX IF NOT EXISTS idx_wellness_metrics_userid ON wellness_metrics(userid);
 CREATE INDEX IF NOT EXISTS idx_wellness_metrics_time ON wellness_metrics(time);
 
+-- Create chat_sessions table (server-side chat memory)
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id VARCHAR(32) PRIMARY KEY,
+    userid INTEGER REFERENCES user_table(userid) ON DELETE CASCADE,
+    summary TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Create chat_messages table (messages not yet folded into the summary)
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id SERIAL PRIMARY KEY,
+    session_id VARCHAR(32) NOT NULL REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    role VARCHAR(16) NOT NULL,
+    content TEXT NOT NULL,
+    token_count INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_userid ON chat_sessions(userid);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
+
+-- Create wellness_insights table (stored/precomputed LLM insights)
+CREATE TABLE IF NOT EXISTS wellness_insights (
+    userid INTEGER NOT NULL REFERENCES user_table(userid) ON DELETE CASCADE,
+    period_days INTEGER NOT NULL,
+    window_fingerprint VARCHAR(64) NOT NULL,
+    average_score FLOAT NOT NULL,
+    trend VARCHAR(32) NOT NULL,
+    total_entries INTEGER NOT NULL,
+    insight TEXT NOT NULL,
+    model_used VARCHAR(128) NOT NULL,
+    generated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (userid, period_days)
+);
+
+CREATE INDEX IF NOT EXISTS idx_wellness_insights_generated_at ON wellness_insights(generated_at);
+
+-- Running per-user wellness statistics (updated on every insert)
+CREATE TABLE IF NOT EXISTS user_wellness_state (
+    userid INTEGER PRIMARY KEY REFERENCES user_table(userid) ON DELETE CASCADE,
+    count INTEGER NOT NULL DEFAULT 0,
+    mean FLOAT NOT NULL DEFAULT 0,
+    ewma FLOAT,
+    consecutive_low INTEGER NOT NULL DEFAULT 0,
+    last_score FLOAT,
+    last_time TIMESTAMP
+);
+
+-- Alerts detected when scores are recorded
+CREATE TABLE IF NOT EXISTS wellness_alerts (
+    id SERIAL PRIMARY KEY,
+    userid INTEGER NOT NULL REFERENCES user_table(userid) ON DELETE CASCADE,
+    metric_id INTEGER,
+    kind VARCHAR(32) NOT NULL,
+    score FLOAT NOT NULL,
+    message TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wellness_alerts_userid ON wellness_alerts(userid);
+CREATE INDEX IF NOT EXISTS idx_wellness_alerts_created_at ON wellness_alerts(created_at);
+
+-- Responses to writes sent with an Idempotency-Key header (expire after IDEMPOTENCY_TTL_HOURS)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(320) PRIMARY KEY,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code INTEGER NOT NULL,
+    response_body TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at);
+
+-- Applied schema migrations (see app/migrations.py); this file matches version 3
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO schema_version (version, description)
+VALUES
+    (1, 'Baseline: users, wellness metrics, chat memory and insights'),
+    (2, 'Incremental wellness state and alerts'),
+    (3, 'Idempotency keys for wellness metric writes')
+ON CONFLICT (version) DO NOTHING;
+
 -- Verify tables were created
 SELECT
     table_name,
@@ -40,10 +128,17 @@ SELECT
 FROM
     information_schema.columns
 WHERE
-    table_name IN ('user_table', 'wellness_metrics')
+    table_name IN ('user_table', 'wellness_metrics', 'chat_sessions', 'chat_messages', 'wellness_insights', 'user_wellness_state', 'wellness_alerts', 'idempotency_keys', 'schema_version')
 ORDER BY
     table_name, ordinal_position;
 
 -- Show table structure
 \d user_table
 \d wellness_metrics
+\d chat_sessions
+\d chat_messages
+\d wellness_insights
+\d user_wellness_state
+\d wellness_alerts
+\d idempotency_keys
+\d schema_version
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Analytics export script.
+
+Writes wellness metrics added since the last run to a date-partitioned
+Parquet dataset for the data team (see app/analytics_export.py). Intended to
+run nightly; the first run exports everything.
+
+Usage:
+    python export_parquet.py                     # incremental, to ANALYTICS_EXPORT_DIR
+    python export_parquet.py --rollups           # also write per-user daily rollups
+    python export_parquet.py --full --output /data/umatter
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from app.analytics_export import export_wellness_metrics_parquet
+from app.config import settings
+from app.database import SessionLocal, init_engine
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Export wellness metrics to Parquet")
+    parser.add_argument(
+        "--output", default=settings.analytics_export_dir, help="Dataset root directory"
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Clear the dataset and re-export all rows"
+    )
+    parser.add_argument(
+        "--rollups", action="store_true", help="Also write per-user daily rollups"
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Umatter Backend - Parquet Analytics Export")
+    print("=" * 60)
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        result = export_wellness_metrics_parquet(
+            db, Path(args.output), full=args.full, include_rollups=args.rollups
+        )
+    except ImportError:
+        print("✗ pyarrow is not installed (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"\nRows exported: {result.rows_exported}")
+    if args.rollups:
+        print(f"Rollup rows:   {result.rollup_rows}")
+    print(f"Watermark:     id {result.watermark}")
+    print(f"\n✓ Export written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,11 @@ Usage:
     python generate_mock_data.py
 """
 
+import random
 import sys
 from datetime import datetime, timedelta
-import random
 
-from app.database import SessionLocal, engine
+from app.database import SessionLocal, init_engine
 from app.models import UserTable, WellnessMetrics
 
 
@@ -58,14 +58,11 @@ def generate_mock_data(auto_mode=False):
         print("Creating Users")
         print("=" * 60)
 
-        # Create 2 users
-        users = []
-        for i in range(2):
-            user = UserTable()
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            users.append(user)
+        # Create 2 users (flushed together to get their ids; committed with the metrics)
+        users = [UserTable() for _ in range(2)]
+        db.add_all(users)
+        db.flush()
+        for i, user in enumerate(users):
             print(f"✓ Created User {i+1}: userid={user.userid}")
 
         print("\n" + "=" * 60)
@@ -75,6 +72,7 @@ def generate_mock_data(auto_mode=False):
         # Generate wellness metrics for each user
         # Spread over 2 days, 10 records per user
         base_time = datetime.utcnow() - timedelta(days=2)
+        metrics = []
 
         for user_idx, user in enumerate(users):
             print(f"\nUser {user_idx + 1} (userid={user.userid}):")
@@ -106,14 +104,11 @@ def generate_mock_data(auto_mode=False):
                 wellness_score = max(0.0, min(10.0, wellness_score))
 
                 # Create wellness metric
-                metric = WellnessMetrics(
+                metrics.append(WellnessMetrics(
                     userid=user.userid,
                     time=record_time,
                     wellness_score=wellness_score
-                )
-                db.add(metric)
-                db.commit()
-                db.refresh(metric)
+                ))
 
                 # Print with day indicator
                 day_label = "Day 1" if day == 0 else "Day 2"
@@ -121,6 +116,10 @@ def generate_mock_data(auto_mode=False):
                       f"score={wellness_score:4.1f}, "
                       f"time={record_time.strftime('%Y-%m-%d %H:%M')}")
 
+        # Insert all metrics in one batch and a single transaction
+        db.add_all(metrics)
+        db.commit()
+
         print("\n" + "=" * 60)
         print("Summary")
         print("=" * 60)
@@ -238,7 +237,7 @@ def show_current_data():
 
             print(f"  Total Records: {len(metrics)}")
             print(f"  Average Score: {sum(m.wellness_score for m in metrics) / len(metrics):.2f}")
-            print(f"\n  Recent Metrics:")
+            print("\n  Recent Metrics:")
 
             for metric in metrics[-5:]:  # Show last 5
                 print(f"    {metric.time.strftime('%Y-%m-%d %H:%M')} - "
@@ -250,6 +249,7 @@ def show_current_data():
 
 def main():
     """Main function with menu."""
+    init_engine()
 
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
@@ -0,0 +1,68 @@
+"""
+Gunicorn configuration for production.
+
+Runs the app under Uvicorn workers:
+- One worker per available CPU (respecting container CPU limits) unless
+  WEB_CONCURRENCY is set. The value is
+  exported so the app sizes its connection pools for the same worker count.
+- The app is imported once in the master (preload_app) and forked. Each worker
+  creates its own database engine in the app lifespan, and post_fork drops
+  any engine inherited from the master, so pooled connections are never
+  shared between processes.
+- On SIGTERM, workers stop accepting connections and have GRACEFUL_TIMEOUT
+  seconds to finish in-flight requests.
+- Workers are recycled after MAX_REQUESTS requests (with jitter so they do
+  not all restart together) to bound memory growth.
+- X-Forwarded-For/-Proto are trusted from FORWARDED_ALLOW_IPS (default any
+  address: on Render the app is only reachable through its proxy), so the
+  client address used for rate limiting is the real client, not the proxy.
+
+Usage:
+    gunicorn -c gunicorn_conf.py app.main:app
+"""
+
+import math
+import os
+
+
+def _available_cpus() -> int:
+    """CPUs this container may use, honouring a cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+workers = int(os.environ.get("WEB_CONCURRENCY") or _available_cpus())
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "*")
+
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+timeout = 120  # seconds without a worker heartbeat before it is killed
+keepalive = 5
+
+max_requests = int(os.environ.get("MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Forget any engine created in the master before the worker handles requests."""
+    from app.database import dispose_engine
+
+    dispose_engine(close=False)
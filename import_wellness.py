@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bulk wellness metric import script.
+
+Streams a CSV (userid,time,wellness_score header) or NDJSON file into the
+wellness_metrics table, using PostgreSQL COPY in committed chunks. Rows that
+fail validation or reference unknown users are rejected and reported. If the
+import stops early, rerun with the printed --skip-rows value to resume.
+
+Usage:
+    python import_wellness.py scores.csv
+    python import_wellness.py scores.ndjson --skip-rows 250000
+"""
+
+import argparse
+import sys
+
+from app.bulk_import import import_wellness_metrics
+from app.database import SessionLocal, init_engine
+
+
+def report_progress(result):
+    """Print a progress line after each committed chunk."""
+    print(
+        f"  chunk {result.chunks_committed}: {result.rows_imported} imported, "
+        f"{result.rows_rejected} rejected (next row {result.next_row})"
+    )
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Bulk import wellness metrics")
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument(
+        "--format", choices=["csv", "ndjson"], help="Defaults to the file extension"
+    )
+    parser.add_argument(
+        "--skip-rows", type=int, default=0, help="Data rows to skip (resume point)"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, help="Rows per commit (default IMPORT_CHUNK_SIZE)"
+    )
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    print("=" * 60)
+    print(f"Umatter Backend - Importing Wellness Metrics ({fmt})")
+    print("=" * 60)
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8", newline="") as f:
+            result = import_wellness_metrics(
+                db,
+                f,
+                fmt,
+                chunk_size=args.chunk_size,
+                skip_rows=args.skip_rows,
+                progress=report_progress,
+            )
+    finally:
+        db.close()
+
+    print(f"\nImported: {result.rows_imported}")
+    print(f"Rejected: {result.rows_rejected}")
+    for error in result.errors:
+        print(f"  - {error}")
+
+    if not result.completed:
+        print(
+            f"\n✗ Import stopped early; resume with --skip-rows {result.next_row}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    print("\n✓ Import complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,43 @@
 """
 Database initialization script.
 
-This script creates all tables defined in the SQLAlchemy models.
-Run this after deploying to Render or starting local development.
+Brings the schema up to date using the migrations in app/migrations.py.
+On an up-to-date database the default mode is a single version query, so it
+is cheap enough to run on every boot; run the one-shot job mode from a
+deploy step instead of on web boot.
 
 Usage:
-    python init_db.py
+    python init_db.py                  # check version; migrate only if behind
+    python init_db.py --migrate        # one-shot migration job (non-interactive)
+    python init_db.py --migrate --seed # ...and add mock data to an empty database
+    python init_db.py --reset          # drop and recreate all tables (asks first)
+
+Mock data is also added to an empty database when AUTO_GENERATE_MOCK_DATA=true
+or ENVIRONMENT=development; a database that already has users is never
+cleared.
 """
 
+import argparse
+import os
 import sys
+
 from sqlalchemy import inspect
 
-from app.database import engine, Base
-from app.models import UserTable, WellnessMetrics
+from app.database import Base, SessionLocal, get_engine
+from app.migrations import LATEST_VERSION, current_version, migrate
+from app.models import UserTable
 
 
 def check_tables_exist():
     """Check if tables already exist."""
-    inspector = inspect(engine)
+    inspector = inspect(get_engine())
     existing_tables = inspector.get_table_names()
     return existing_tables
 
 
-def create_tables():
-    """Create all tables defined in the models."""
+def reset_tables():
+    """Drop and recreate all tables defined in the models."""
     try:
-        # Check existing tables
         existing_tables = check_tables_exist()
 
         if existing_tables:
@@ -35,33 +47,56 @@ def create_tables():
                 print(f"  - {table}")
 
             response = input("\nDo you want to recreate tables? This will DROP all existing data! (yes/no): ")
-            if response.lower() == 'yes':
-                print("\nDropping all tables...")
-                Base.metadata.drop_all(bind=engine)
-                print("✓ All tables dropped")
-
-        print("\nCreating tables...")
-        Base.metadata.create_all(bind=engine)
-        print("✓ Tables created successfully!")
-
-        # Verify tables were created
-        tables = check_tables_exist()
-        print(f"\nCurrent tables in database:")
-        for table in tables:
-            print(f"  - {table}")
-
-        print("\n✓ Database initialization complete!")
+            if response.lower() != 'yes':
+                print("\nKeeping existing tables.")
+                return True
+
+            print("\nDropping all tables...")
+            Base.metadata.drop_all(bind=get_engine())
+            print("✓ All tables dropped")
+
+        return run_migrations()
+
+    except Exception as e:
+        print(f"\n✗ Error recreating tables: {e}", file=sys.stderr)
+        return False
+
+
+def run_migrations():
+    """Apply pending migrations."""
+    try:
+        applied = migrate(get_engine())
+        for migration in applied:
+            print(f"✓ Applied migration {migration.version}: {migration.description}")
+        print(f"\n✓ Schema is at version {LATEST_VERSION}")
         return True
 
     except Exception as e:
-        print(f"\n✗ Error creating tables: {e}", file=sys.stderr)
+        print(f"\n✗ Error applying migrations: {e}", file=sys.stderr)
         return False
 
 
+def seed_if_empty():
+    """Generate mock data, but only into a database without users."""
+    db = SessionLocal()
+    try:
+        has_users = db.query(UserTable.userid).first() is not None
+    finally:
+        db.close()
+
+    if has_users:
+        print("Database already has users; skipping mock data")
+        return True
+
+    from generate_mock_data import generate_mock_data
+    return generate_mock_data(auto_mode=True)
+
+
 def verify_connection():
     """Verify database connection."""
     try:
-        with engine.connect() as connection:
+        engine = get_engine()
+        with engine.connect():
             print("✓ Database connection successful!")
             print(f"  Database URL: {engine.url.render_as_string(hide_password=True)}")
             return True
@@ -72,6 +107,39 @@ def verify_connection():
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Initialize or migrate the database")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--migrate", action="store_true", help="Run as a one-shot migration job")
+    mode.add_argument("--reset", action="store_true", help="Drop and recreate all tables")
+    parser.add_argument(
+        "--seed", action="store_true",
+        help="Add mock data if the database has no users (also enabled by "
+             "AUTO_GENERATE_MOCK_DATA=true or ENVIRONMENT=development)",
+    )
+    args = parser.parse_args()
+    seed = (
+        args.seed
+        or os.environ.get("AUTO_GENERATE_MOCK_DATA") == "true"
+        or os.environ.get("ENVIRONMENT") == "development"
+    )
+
+    if not (args.migrate or args.reset):
+        # Boot-time check: one query when the schema is current
+        try:
+            version = current_version(get_engine())
+        except Exception as e:
+            print(f"✗ Database connection failed: {e}", file=sys.stderr)
+            sys.exit(1)
+        if version == LATEST_VERSION:
+            print(f"✓ Database schema is up to date (version {version})")
+        else:
+            print(f"Database schema is at version {version}, migrating to {LATEST_VERSION}...")
+            if not run_migrations():
+                sys.exit(1)
+        if seed and not seed_if_empty():
+            sys.exit(1)
+        return
+
     print("=" * 60)
     print("Umatter Backend - Database Initialization")
     print("=" * 60)
@@ -84,9 +152,20 @@ def main():
         sys.exit(1)
 
     print()
-    print("Step 2: Creating tables...")
-    if not create_tables():
-        sys.exit(1)
+    if args.reset:
+        print("Step 2: Recreating tables...")
+        if not reset_tables():
+            sys.exit(1)
+    else:
+        print("Step 2: Applying migrations...")
+        if not run_migrations():
+            sys.exit(1)
+
+        if seed:
+            print()
+            print("Step 3: Seeding mock data...")
+            if not seed_if_empty():
+                sys.exit(1)
 
     print()
     print("=" * 60)
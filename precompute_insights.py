@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Wellness insight precomputation job.
+
+Generates insights for every recently active user so that the
+/llm/wellness-insight endpoint can serve them instantly. Intended to run
+off-peak (see the cron job in render.yaml). Users whose stored insight is
+still current are skipped, and at most INSIGHT_PRECOMPUTE_CONCURRENCY
+requests are sent to the LLM provider at once.
+
+Usage:
+    python precompute_insights.py            # 7-day insights
+    python precompute_insights.py 30         # 30-day insights
+"""
+
+import sys
+
+from app.database import SessionLocal, init_engine
+from app.insights import precompute_insights
+from app.llm_client import get_groq_sdk_client
+
+
+def main():
+    """Main function."""
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+
+    print("=" * 60)
+    print(f"Umatter Backend - Precomputing {days}-day Wellness Insights")
+    print("=" * 60)
+
+    groq_client = get_groq_sdk_client()
+    if groq_client is None:
+        print("✗ GROQ_API_KEY is not set", file=sys.stderr)
+        sys.exit(1)
+
+    init_engine()
+    results = precompute_insights(SessionLocal, groq_client, days=days)
+
+    print()
+    for outcome in ("generated", "fresh", "empty", "failed"):
+        print(f"  {outcome:>9}: {results.get(outcome, 0)}")
+
+    if results.get("failed"):
+        sys.exit(1)
+    print("\n✓ Precomputation complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 #!/bin/bash
 # Startup script for Render deployment
+#
+# Migrations run as a one-shot job before the deploy goes live
+# (preDeployCommand in render.yaml: python init_db.py --migrate). Web boot
+# only does a cheap schema version check, plus seeding an empty database
+# when AUTO_GENERATE_MOCK_DATA=true.
 
 set -e  # Exit on error
 
@@ -8,28 +13,13 @@ echo "Starting Umatter Backend"
 echo "Environment: $ENVIRONMENT"
 echo "=========================================="
 
-# Initialize database (create tables if they don't exist)
+# Check the schema version (one query; migrates only if the deploy job didn't)
 echo ""
-echo "Step 1: Initializing database..."
+echo "Step 1: Checking database schema..."
 python init_db.py
 
-# Generate mock data based on environment
-echo ""
-echo "Step 2: Checking if mock data should be generated..."
-
-if [ "$AUTO_GENERATE_MOCK_DATA" = "true" ]; then
-    echo "AUTO_GENERATE_MOCK_DATA=true - Generating mock data..."
-    python generate_mock_data.py auto
-elif [ "$ENVIRONMENT" = "development" ]; then
-    echo "ENVIRONMENT=development - Generating mock data..."
-    python generate_mock_data.py auto
-else
-    echo "Skipping mock data generation"
-    echo "To generate mock data, set AUTO_GENERATE_MOCK_DATA=true"
-fi
-
 # Start the server
 echo ""
-echo "Step 3: Starting FastAPI server..."
+echo "Step 2: Starting FastAPI server..."
 echo "=========================================="
-exec uvicorn app.main:app --host 0.0.0.0 --port "$PORT"
+exec gunicorn -c gunicorn_conf.py app.main:app
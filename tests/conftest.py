@@ -4,11 +4,15 @@ Test configuration and fixtures.
 Provides reusable test fixtures for database, client, and authentication.
 """
 
+from types import SimpleNamespace
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from app import llm_client, ratelimit
+from app.api.llm import get_groq_client, get_optional_groq_client
 from app.database import Base, get_db
 from app.main import app
 
@@ -58,6 +62,8 @@ def client(db_session):
             db_session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    ratelimit.bucket_store = ratelimit.InMemoryBucketStore()
+    llm_client.groq_breaker.record_success()
 
     with TestClient(app) as test_client:
         yield test_client
@@ -74,3 +80,42 @@ def sample_user_data():
         "provider": "google",
         "provider_user_id": "google_123456",
     }
+
+
+class FakeLLMClient:
+    """
+    Stand-in for the Groq client.
+
+    Records every `chat.completions.create` call and answers with `reply`.
+    Exceptions queued in `errors` are raised, one per call, before replying.
+    """
+
+    def __init__(self, reply="Thanks for sharing. You're doing great."):
+        self.reply = reply
+        self.calls = []
+        self.errors = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(
+            model=kwargs.get("model"),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))],
+            usage=SimpleNamespace(prompt_tokens=42, completion_tokens=7),
+        )
+
+
+@pytest.fixture
+def fake_llm(client):
+    """
+    Replace the Groq client dependency with a FakeLLMClient.
+
+    Yields:
+        FakeLLMClient: The fake client used by the LLM routes
+    """
+    fake = FakeLLMClient()
+    app.dependency_overrides[get_groq_client] = lambda: fake
+    app.dependency_overrides[get_optional_groq_client] = lambda: fake
+    yield fake
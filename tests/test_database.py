@@ -0,0 +1,142 @@
+"""
+Tests for engine, connection pool and read-replica configuration.
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from app import replicas
+from app.api import wellness
+from app.config import Settings
+from app.database import build_engine_kwargs, pool_sizing
+from app.replicas import ReplicaRouter
+from tests.conftest import SQLALCHEMY_TEST_DATABASE_URL
+
+
+def test_pool_sizing_splits_connections_between_workers():
+    """Test the automatic pool size divides max_connections across workers."""
+    cfg = Settings(
+        database_max_connections=100,
+        database_reserved_connections=10,
+        web_concurrency=4,
+    )
+    assert pool_sizing(cfg) == (11, 11)
+
+    # A single worker is capped at the handler threadpool size
+    assert sum(pool_sizing(Settings(web_concurrency=1))) == 40
+
+    # Explicit settings win
+    assert pool_sizing(Settings(database_pool_size=3, database_max_overflow=2)) == (
+        3,
+        2,
+    )
+
+
+def test_engine_kwargs_pre_ping_and_pgbouncer():
+    """Test pre-ping strategy and PgBouncer mode map to engine arguments."""
+    kwargs = build_engine_kwargs(Settings(database_pre_ping="pessimistic"))
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["pool_use_lifo"] is True
+
+    kwargs = build_engine_kwargs(Settings(database_pgbouncer=True))
+    assert kwargs["poolclass"] is NullPool
+    assert "pool_size" not in kwargs
+
+
+def _sqlite_engine(url):
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def test_replica_router_round_robin_and_ejection():
+    """Test replicas are used in turn and ejected ones are skipped."""
+    router = ReplicaRouter(["sqlite://", "sqlite://"], engine_factory=_sqlite_engine)
+    first, second = router.replicas
+
+    assert [router.pick() for _ in range(4)] == [first, second, first, second]
+
+    router.eject(first)
+    assert [router.pick() for _ in range(2)] == [second, second]
+
+    router.eject(second)
+    assert router.pick() is None
+
+
+def test_reads_use_replica_except_after_own_write(client, monkeypatch):
+    """Test read routes go to a replica, but to the primary right after a write."""
+    router = ReplicaRouter(
+        [SQLALCHEMY_TEST_DATABASE_URL], engine_factory=_sqlite_engine
+    )
+    monkeypatch.setattr(replicas, "_router", router)
+    monkeypatch.setattr(
+        replicas.settings, "database_replica_urls", SQLALCHEMY_TEST_DATABASE_URL
+    )
+    picks = []
+    original_pick = router.pick
+    monkeypatch.setattr(router, "pick", lambda: picks.append(1) or original_pick())
+
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    client.post(
+        "/api/v1/wellness/wellness-metrics",
+        json={"userid": userid, "wellness_score": 6.0},
+    )
+
+    response = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics")
+    assert response.json()["total_count"] == 1
+    assert picks == []  # read-your-writes: served by the primary
+
+    # Another worker has no record of the write; the cookie still routes to the primary
+    replicas.recent_writes.clear()
+    response = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics")
+    assert response.json()["total_count"] == 1
+    assert picks == []
+
+    client.cookies.clear()
+    response = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics")
+    assert response.json()["total_count"] == 1
+    assert picks == [1]
+
+
+def test_trend_flights_keyed_by_read_database(client, monkeypatch):
+    """Test a read from the primary never shares a trend computation with a replica read."""
+    router = ReplicaRouter(
+        [SQLALCHEMY_TEST_DATABASE_URL], engine_factory=_sqlite_engine
+    )
+    monkeypatch.setattr(replicas, "_router", router)
+    monkeypatch.setattr(
+        replicas.settings, "database_replica_urls", SQLALCHEMY_TEST_DATABASE_URL
+    )
+    keys = []
+    flights = wellness._trend_flights
+    monkeypatch.setattr(flights, "do", lambda key, fn: keys.append(key) or fn())
+
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    client.cookies.clear()
+    replicas.recent_writes.clear()
+    client.get(f"/api/v1/wellness/users/{userid}/wellness-trend")
+    client.post(
+        "/api/v1/wellness/wellness-metrics",
+        json={"userid": userid, "wellness_score": 6.0},
+    )
+    client.get(f"/api/v1/wellness/users/{userid}/wellness-trend")
+
+    assert keys[0][:2] == keys[1][:2]
+    assert keys[0][2] is router.replicas[0].engine
+    assert keys[1][2] is not router.replicas[0].engine
+
+
+def test_unreachable_replica_is_ejected(client, monkeypatch):
+    """Test a replica that fails to connect is ejected and reads fall back to the primary."""
+    router = ReplicaRouter(
+        ["sqlite:////nonexistent/dir/replica.db"], engine_factory=_sqlite_engine
+    )
+    monkeypatch.setattr(replicas, "_router", router)
+    monkeypatch.setattr(
+        replicas.settings,
+        "database_replica_urls",
+        "sqlite:////nonexistent/dir/replica.db",
+    )
+
+    response = client.get("/api/v1/wellness/users")
+
+    assert response.status_code == 200
+    assert not router.replicas[0].healthy
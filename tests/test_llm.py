@@ -0,0 +1,647 @@
+"""
+Tests for LLM API endpoints.
+
+The Groq client is replaced by a fake (see conftest.py), so no network calls are made.
+"""
+
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import semantic_cache, sentiment, telemetry
+from app.api.llm import get_optional_groq_client
+from app.config import settings
+from app.conversation import build_context_messages
+from app.llm_client import create_chat_completion
+from app.main import app
+from app.message_analysis import parse_analysis
+from app.models import ChatMessage, ChatSession
+from app.ratelimit import provider_concurrency_slot
+from app.resilience import CircuitBreaker, CircuitOpenError, hedged_call
+from app.semantic_cache import HashingEmbedder, SemanticCache
+
+
+def _create_user_with_scores(client: TestClient, scores):
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    for score in scores:
+        client.post(
+            "/api/v1/wellness/wellness-metrics",
+            json={"userid": userid, "wellness_score": score},
+        )
+    return userid
+
+
+def test_chat(client: TestClient, fake_llm):
+    """Test chatting returns the model's reply."""
+    response = client.post("/api/v1/llm/chat", json={"message": "I feel anxious today"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == fake_llm.reply
+    assert len(fake_llm.calls) == 1
+    assert fake_llm.calls[0]["messages"][-1]["content"] == "I feel anxious today"
+
+
+def test_wellness_insight(client: TestClient, fake_llm):
+    """Test generating a wellness insight from recent scores."""
+    userid = _create_user_with_scores(client, [4.0, 5.0, 6.0, 7.0])
+
+    response = client.post(
+        "/api/v1/llm/wellness-insight", json={"userid": userid, "days": 7}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_entries"] == 4
+    assert data["trend"] == "improving"
+    assert data["insight"] == fake_llm.reply
+
+
+def test_wellness_insight_no_data(client: TestClient, fake_llm):
+    """Test insight for a user without recent scores returns 404."""
+    userid = _create_user_with_scores(client, [])
+
+    response = client.post("/api/v1/llm/wellness-insight", json={"userid": userid})
+
+    assert response.status_code == 404
+    assert fake_llm.calls == []
+
+
+def test_completion_span_records_model_and_tokens(monkeypatch):
+    """Test LLM completions are traced with model and token counts."""
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    from tests.conftest import FakeLLMClient
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(telemetry, "_tracer", provider.get_tracer("test"))
+
+    create_chat_completion(
+        FakeLLMClient(),
+        messages=[{"role": "user", "content": "hi"}],
+        model="test-model",
+        max_tokens=10,
+    )
+
+    [span] = exporter.get_finished_spans()
+    assert span.name == "llm.chat_completion"
+    assert span.attributes["gen_ai.request.model"] == "test-model"
+    assert span.attributes["gen_ai.usage.input_tokens"] == 42
+    assert span.attributes["gen_ai.usage.output_tokens"] == 7
+
+
+def test_shutdown_tracing_flushes_and_closes_trace_file(monkeypatch, tmp_path):
+    """Test shutdown exports buffered spans to the trace file and closes it."""
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(settings, "otel_exporter", "file")
+    monkeypatch.setattr(settings, "otel_file_path", str(path))
+    provider = TracerProvider()
+    provider.add_span_processor(BatchSpanProcessor(telemetry._build_exporter()))
+    monkeypatch.setattr(telemetry, "_tracer_provider", provider)
+    monkeypatch.setattr(telemetry, "_tracer", provider.get_tracer("test"))
+    export_file = telemetry._export_file
+
+    with telemetry.start_span("test.span"):
+        pass
+    telemetry.shutdown_tracing()
+
+    assert export_file.closed
+    assert telemetry._export_file is None
+    assert '"name": "test.span"' in path.read_text()
+
+
+def test_chat_rate_limited_per_user(client: TestClient, fake_llm, monkeypatch):
+    """Test a user exceeding their burst gets 429 with Retry-After."""
+    monkeypatch.setattr(settings, "llm_rate_limit_per_minute", 1)
+    monkeypatch.setattr(settings, "llm_rate_limit_burst", 2)
+    headers = {"X-User-Id": "1"}
+
+    for _ in range(2):
+        response = client.post(
+            "/api/v1/llm/chat", json={"message": "hi"}, headers=headers
+        )
+        assert response.status_code == 200
+
+    response = client.post("/api/v1/llm/chat", json={"message": "hi"}, headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(fake_llm.calls) == 2
+
+    # Other users have their own bucket
+    response = client.post(
+        "/api/v1/llm/chat", json={"message": "hi"}, headers={"X-User-Id": "2"}
+    )
+    assert response.status_code == 200
+
+
+def test_rate_limit_holds_when_user_id_rotates(
+    client: TestClient, fake_llm, monkeypatch
+):
+    """Test a new X-User-Id per request does not escape the per-address limit."""
+    monkeypatch.setattr(settings, "llm_rate_limit_per_ip_per_minute", 1)
+    monkeypatch.setattr(settings, "llm_rate_limit_per_ip_burst", 3)
+
+    statuses = [
+        client.post(
+            "/api/v1/llm/chat", json={"message": "hi"}, headers={"X-User-Id": str(i)}
+        ).status_code
+        for i in range(4)
+    ]
+
+    assert statuses == [200, 200, 200, 429]
+    assert len(fake_llm.calls) == 3
+
+
+def test_rate_limit_skips_session_routes(client: TestClient, monkeypatch):
+    """Test routes that make no completion call are not rate limited."""
+    monkeypatch.setattr(settings, "llm_rate_limit_per_minute", 1)
+    monkeypatch.setattr(settings, "llm_rate_limit_burst", 1)
+
+    for _ in range(3):
+        assert client.post("/api/v1/llm/chat/sessions", json={}).status_code == 201
+        assert client.get("/api/v1/llm/chat/cache-stats").status_code == 200
+
+
+def test_provider_concurrency_cap(monkeypatch):
+    """Test a call waiting too long for a provider slot is rejected with 429."""
+    monkeypatch.setattr(settings, "llm_max_concurrency", 1)
+    monkeypatch.setattr(settings, "llm_concurrency_wait_seconds", 0.01)
+
+    with provider_concurrency_slot("test-provider"):
+        with pytest.raises(HTTPException) as exc_info:
+            with provider_concurrency_slot("test-provider"):
+                pass
+
+    assert exc_info.value.status_code == 429
+    assert "Retry-After" in exc_info.value.headers
+
+
+def test_chat_retries_transient_errors(client: TestClient, fake_llm, monkeypatch):
+    """Test transient provider errors are retried before failing the request."""
+    monkeypatch.setattr(settings, "llm_retry_base_delay_seconds", 0)
+    fake_llm.errors = [TimeoutError("slow"), ConnectionError("reset")]
+
+    response = client.post("/api/v1/llm/chat", json={"message": "hi"})
+
+    assert response.status_code == 200
+    assert len(fake_llm.calls) == 3
+
+
+def test_chat_provider_error_is_502_without_details(client: TestClient, fake_llm):
+    """Test a non-transient provider error is a 502 that does not echo the provider's message."""
+
+    class BadRequestError(Exception):
+        status_code = 400
+
+    fake_llm.errors = [BadRequestError("secret provider detail")]
+
+    response = client.post("/api/v1/llm/chat", json={"message": "hi"})
+
+    assert response.status_code == 502
+    assert "secret" not in response.text
+    assert len(fake_llm.calls) == 1
+
+
+def test_chat_fails_fast_when_circuit_open(client: TestClient, fake_llm, monkeypatch):
+    """Test an open circuit returns 503 without calling the provider."""
+    monkeypatch.setattr(settings, "llm_retry_attempts", 1)
+    monkeypatch.setattr(settings, "llm_rate_limit_per_minute", 0)
+    for _ in range(settings.llm_circuit_failure_threshold):
+        fake_llm.errors.append(TimeoutError("down"))
+        response = client.post("/api/v1/llm/chat", json={"message": "hi"})
+        assert response.status_code == 503
+        assert "down" not in response.json()["detail"]
+
+    calls_before = len(fake_llm.calls)
+    response = client.post("/api/v1/llm/chat", json={"message": "hi"})
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert len(fake_llm.calls) == calls_before
+
+    health = client.get("/health").json()
+    assert health["services"]["llm"]["groq"]["state"] == "open"
+
+
+def test_circuit_breaker_half_open_probe():
+    """Test the breaker lets one probe through after the cool-down and closes on success."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.02)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.status()["state"] == "closed"
+
+
+def test_circuit_breaker_ignores_non_transient_errors():
+    """Test a non-transient error in half-open state neither closes nor re-opens the breaker."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    def bad_request():
+        raise ValueError("invalid request")
+
+    with pytest.raises(ValueError):
+        breaker.call(bad_request)
+    assert breaker.status()["state"] == "half_open"
+
+    # The probe slot was released, so the next call is let through
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.status()["state"] == "closed"
+
+
+def test_hedged_call_returns_first_result():
+    """Test a slow call is hedged and the faster copy wins."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    assert hedged_call(fn, hedge_after=0.05) == "fast"
+
+
+def test_chat_semantic_cache_hit(client: TestClient, fake_llm, monkeypatch):
+    """Test a repeated message is served from the semantic cache."""
+    monkeypatch.setattr(settings, "semantic_cache_enabled", True)
+    monkeypatch.setattr(settings, "semantic_cache_model", None)
+    monkeypatch.setattr(semantic_cache, "_chat_cache", None)
+
+    headers = {"X-User-Id": "user-a"}
+    first = client.post(
+        "/api/v1/llm/chat", json={"message": "I feel anxious today"}, headers=headers
+    )
+    second = client.post(
+        "/api/v1/llm/chat", json={"message": "I feel anxious today!"}, headers=headers
+    )
+
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["message"] == first.json()["message"]
+    assert len(fake_llm.calls) == 1
+
+    stats = client.get("/api/v1/llm/chat/cache-stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_chat_semantic_cache_not_shared_between_users(
+    client: TestClient, fake_llm, monkeypatch
+):
+    """Test one user's cached answer is never served to another user or to anonymous callers."""
+    monkeypatch.setattr(settings, "semantic_cache_enabled", True)
+    monkeypatch.setattr(settings, "semantic_cache_model", None)
+    monkeypatch.setattr(semantic_cache, "_chat_cache", None)
+    body = {"message": "I feel anxious today"}
+
+    client.post("/api/v1/llm/chat", json=body, headers={"X-User-Id": "user-a"})
+    other = client.post("/api/v1/llm/chat", json=body, headers={"X-User-Id": "user-b"})
+    anonymous = client.post("/api/v1/llm/chat", json=body)
+    again = client.post("/api/v1/llm/chat", json=body)
+
+    assert other.json()["cached"] is False
+    assert anonymous.json()["cached"] is False
+    assert again.json()["cached"] is False
+    assert len(fake_llm.calls) == 4
+    assert client.get("/api/v1/llm/chat/cache-stats").json()["entries"] == 2
+
+
+def test_semantic_cache_threshold_and_eviction():
+    """Test unrelated messages miss and the cache stays within max_entries."""
+    cache = SemanticCache(HashingEmbedder(), max_entries=2, threshold=0.9)
+
+    for i, text in enumerate(["I feel anxious", "work was great", "slept badly"]):
+        cache.store("u", cache.lookup("u", text).vector, f"answer {i}")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("u", "I feel anxious").response is None  # evicted
+    assert cache.lookup("u", "slept badly").response == "answer 2"
+    assert cache.lookup("u", "what should I cook tonight").response is None
+
+
+def test_chat_session_keeps_history(client: TestClient, fake_llm):
+    """Test a session sends earlier turns along with the new message."""
+    session_id = client.post("/api/v1/llm/chat/sessions", json={}).json()["session_id"]
+
+    client.post(
+        "/api/v1/llm/chat", json={"message": "I lost my job", "session_id": session_id}
+    )
+    response = client.post(
+        "/api/v1/llm/chat", json={"message": "What now?", "session_id": session_id}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["session_id"] == session_id
+    contents = [m["content"] for m in fake_llm.calls[-1]["messages"]]
+    assert contents[1:] == ["I lost my job", fake_llm.reply, "What now?"]
+
+
+def test_chat_session_prompt_stays_bounded(client: TestClient, fake_llm, monkeypatch):
+    """Test long conversations are summarized so prompt size stays flat."""
+    monkeypatch.setattr(settings, "llm_rate_limit_per_minute", 0)
+    monkeypatch.setattr(settings, "chat_context_token_budget", 60)
+    session_id = client.post("/api/v1/llm/chat/sessions", json={}).json()["session_id"]
+
+    chat_prompt_sizes = []
+    for i in range(8):
+        client.post(
+            "/api/v1/llm/chat",
+            json={
+                "message": f"Day {i}: work has been stressful and I am not sleeping well",
+                "session_id": session_id,
+            },
+        )
+        chat_call = next(c for c in reversed(fake_llm.calls) if c["max_tokens"] == 500)
+        chat_prompt_sizes.append(sum(len(m["content"]) for m in chat_call["messages"]))
+
+    session = client.get(f"/api/v1/llm/chat/sessions/{session_id}").json()
+    assert session["summary"] == fake_llm.reply
+    assert session["message_count"] < 16
+    assert max(chat_prompt_sizes[3:]) <= max(chat_prompt_sizes[:3]) * 1.5
+
+
+def test_context_budget_counts_new_message(monkeypatch):
+    """Test a long new message leaves less room for history in the prompt."""
+    monkeypatch.setattr(settings, "chat_context_token_budget", 30)
+    session = ChatSession(
+        messages=[
+            ChatMessage(role="user", content=f"message {i}", token_count=10)
+            for i in range(3)
+        ]
+    )
+
+    short = build_context_messages(session, "system", "hi")
+    long = build_context_messages(session, "system", " ".join(["word"] * 15))
+
+    assert len(short) == 2 + 2
+    assert len(long) == 2 + 1
+
+
+def test_chat_unknown_session(client: TestClient, fake_llm):
+    """Test chatting in a session that doesn't exist returns 404."""
+    response = client.post(
+        "/api/v1/llm/chat", json={"message": "hi", "session_id": "missing"}
+    )
+    assert response.status_code == 404
+
+
+def test_wellness_insight_served_from_store(client: TestClient, fake_llm):
+    """Test an unchanged score window returns the stored insight without an LLM call."""
+    userid = _create_user_with_scores(client, [6.0, 7.0])
+    body = {"userid": userid, "days": 7}
+
+    first = client.post("/api/v1/llm/wellness-insight", json=body).json()
+    second = client.post("/api/v1/llm/wellness-insight", json=body).json()
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["insight"] == first["insight"]
+    assert len(fake_llm.calls) == 1
+
+    # A new score changes the window, so the insight is regenerated
+    client.post(
+        "/api/v1/wellness/wellness-metrics",
+        json={"userid": userid, "wellness_score": 8.0},
+    )
+    third = client.post("/api/v1/llm/wellness-insight", json=body).json()
+
+    assert third["cached"] is False
+    assert third["total_entries"] == 3
+    assert len(fake_llm.calls) == 2
+
+
+def test_precompute_insights(client: TestClient, fake_llm):
+    """Test the batch job generates insights for active users and skips fresh ones."""
+    from app.insights import precompute_insights
+    from tests.conftest import TestingSessionLocal
+
+    userid = _create_user_with_scores(client, [5.0, 6.0])
+    _create_user_with_scores(client, [7.0])
+
+    assert precompute_insights(TestingSessionLocal, fake_llm) == {"generated": 2}
+    assert precompute_insights(TestingSessionLocal, fake_llm) == {"fresh": 2}
+
+    response = client.post(
+        "/api/v1/llm/wellness-insight", json={"userid": userid, "days": 7}
+    )
+    assert response.json()["cached"] is True
+    assert len(fake_llm.calls) == 2
+
+
+def test_precomputed_insight_served_later_the_same_day(
+    client: TestClient, fake_llm, monkeypatch
+):
+    """Test the window only moves at midnight, so an early precompute is served all day."""
+    from app import insights
+    from tests.conftest import TestingSessionLocal
+
+    clock = [datetime(2024, 3, 10, 4, 0)]
+
+    class FixedDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return clock[0]
+
+    monkeypatch.setattr(insights, "datetime", FixedDatetime)
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    for ts, score in [(datetime(2024, 3, 3, 10), 4.0), (datetime(2024, 3, 9, 20), 7.0)]:
+        client.post(
+            "/api/v1/wellness/wellness-metrics",
+            json={"userid": userid, "wellness_score": score, "time": ts.isoformat()},
+        )
+
+    assert insights.precompute_insights(TestingSessionLocal, fake_llm) == {
+        "generated": 1
+    }
+
+    clock[0] = datetime(2024, 3, 10, 23, 0)
+    response = client.post(
+        "/api/v1/llm/wellness-insight", json={"userid": userid, "days": 7}
+    )
+    assert response.json()["cached"] is True
+    assert response.json()["total_entries"] == 2
+    assert len(fake_llm.calls) == 1
+
+
+def test_analyze_message_structured(client: TestClient, fake_llm):
+    """Test analyze-message returns typed fields parsed from JSON output."""
+    fake_llm.reply = (
+        '{"score": 3.5, "sentiment": "Anxious and tired.", "concerns": ["poor sleep"]}'
+    )
+
+    response = client.post(
+        "/api/v1/llm/analyze-message", json={"message": "I can't sleep"}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["estimated_wellness_score"] == 3.5
+    assert data["sentiment"] == "Anxious and tired."
+    assert data["concerns"] == ["poor sleep"]
+    assert fake_llm.calls[0]["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.parametrize(
+    "text, score, concerns",
+    [
+        ('```json\n{"score": "7", "sentiment": "Calm.", "concerns": []}\n```', 7.0, []),
+        ("Score: 12\nSentiment: Very happy.\nConcerns: none", 10.0, []),
+        (
+            "Score: 2.5\nSentiment: Low.\nConcerns: isolation, hopelessness",
+            2.5,
+            ["isolation", "hopelessness"],
+        ),
+        ("I'm not sure how to rate this.", None, []),
+    ],
+)
+def test_parse_analysis_fallbacks(text, score, concerns):
+    """Test the parser tolerates fenced JSON, the line format and free text."""
+    analysis = parse_analysis(text)
+
+    assert analysis.score == score
+    assert analysis.concerns == concerns
+
+
+@pytest.fixture
+def local_sentiment(monkeypatch):
+    """Enable the lexicon-based local sentiment model."""
+    monkeypatch.setattr(settings, "local_sentiment_enabled", True)
+    monkeypatch.setattr(settings, "local_sentiment_model", None)
+    yield
+    sentiment.close_local_scorer()
+
+
+def test_analyze_message_local_fast_path(client: TestClient, fake_llm, local_sentiment):
+    """Test a confidently scored message is answered without calling the LLM."""
+    response = client.post(
+        "/api/v1/llm/analyze-message",
+        json={"message": "I feel really happy and grateful, today was a great day"},
+    )
+
+    data = response.json()
+    assert data["source"] == "local"
+    assert data["estimated_wellness_score"] > 6
+    assert fake_llm.calls == []
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Some days I think about ending my life, I'm fine though",
+        "The meeting was moved to Tuesday",
+    ],
+)
+def test_analyze_message_escalates_to_llm(
+    client: TestClient, fake_llm, local_sentiment, message
+):
+    """Test crisis language and low-confidence messages go to the LLM."""
+    fake_llm.reply = '{"score": 2, "sentiment": "Distressed.", "concerns": []}'
+
+    response = client.post("/api/v1/llm/analyze-message", json={"message": message})
+
+    assert response.json()["source"] == "llm"
+    assert len(fake_llm.calls) == 1
+
+
+def test_analyze_message_local_path_needs_no_groq(client: TestClient, local_sentiment):
+    """Test the local fast path works without Groq, and only escalation needs it."""
+    app.dependency_overrides[get_optional_groq_client] = lambda: None
+
+    response = client.post(
+        "/api/v1/llm/analyze-message",
+        json={"message": "I feel really happy and grateful, today was a great day"},
+    )
+    assert response.json()["source"] == "local"
+
+    response = client.post(
+        "/api/v1/llm/analyze-message", json={"message": "The meeting was moved"}
+    )
+    assert response.status_code == 503
+
+
+def test_analyze_message_falls_back_when_local_model_fails(
+    client: TestClient, fake_llm, local_sentiment
+):
+    """Test a local model error sends the message to the LLM instead of failing."""
+    fake_llm.reply = '{"score": 8, "sentiment": "Happy.", "concerns": []}'
+    scorer = sentiment.get_local_scorer()
+
+    def broken(texts):
+        raise RuntimeError("model crashed")
+
+    scorer.model.predict_batch = broken
+    response = client.post(
+        "/api/v1/llm/analyze-message", json={"message": "I feel really happy"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["source"] == "llm"
+
+
+def test_transformer_model_escalates_unknown_labels(monkeypatch):
+    """Test labels are mapped from id2label, and generic LABEL_n names are escalated."""
+
+    class FakePipeline:
+        def __init__(self, labels, outputs):
+            self.model = SimpleNamespace(
+                config=SimpleNamespace(id2label=dict(enumerate(labels)))
+            )
+            self.outputs = outputs
+
+        def __call__(self, texts, truncation):
+            return [self.outputs for _ in texts]
+
+    named = FakePipeline(
+        ["negative", "neutral", "positive"],
+        [
+            {"label": "positive", "score": 0.8},
+            {"label": "neutral", "score": 0.2},
+            {"label": "negative", "score": 0.0},
+        ],
+    )
+    generic = FakePipeline(
+        ["LABEL_0", "LABEL_1", "LABEL_2"],
+        [
+            {"label": "LABEL_2", "score": 0.9},
+            {"label": "LABEL_1", "score": 0.1},
+            {"label": "LABEL_0", "score": 0.0},
+        ],
+    )
+    for pipe, expected in [(named, (9.0, 0.8)), (generic, (5.0, 0.0))]:
+        monkeypatch.setitem(
+            sys.modules, "transformers", SimpleNamespace(pipeline=lambda *a, **kw: pipe)
+        )
+        [result] = sentiment.TransformerSentimentModel("fake").predict_batch(["hello"])
+        assert (result.score, result.confidence) == expected
+
+
+def test_lexicon_model_handles_negation():
+    """Test negated positive words lower the score."""
+    model = sentiment.LexiconSentimentModel()
+
+    [positive, negated] = model.predict_batch(["I am happy", "I am not happy at all"])
+
+    assert positive.score > 5 > negated.score
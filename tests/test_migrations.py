@@ -0,0 +1,39 @@
+"""
+Tests for schema migrations.
+"""
+
+from sqlalchemy import create_engine, inspect
+
+from app.database import Base
+from app.migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate
+
+
+def test_migrate_fresh_database(tmp_path):
+    """Test an empty database is created from the models and stamped."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert current_version(engine) == 0
+
+    assert migrate(engine) == MIGRATIONS
+    assert current_version(engine) == LATEST_VERSION
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+
+    # Already current: nothing to do
+    assert migrate(engine) == []
+
+
+def test_migrate_unversioned_database(tmp_path):
+    """Test a database created before versioning is brought up to date."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(
+        engine,
+        tables=[
+            Base.metadata.tables["user_table"],
+            Base.metadata.tables["wellness_metrics"],
+        ],
+    )
+
+    applied = migrate(engine)
+
+    assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+    assert "wellness_insights" in inspect(engine).get_table_names()
+    assert current_version(engine) == LATEST_VERSION
@@ -0,0 +1,51 @@
+"""
+Tests for LLM prompt builders.
+"""
+
+from datetime import datetime, timedelta
+
+from app.prompts import bucket_scores, build_wellness_insight_prompt
+from app.tokens import estimate_tokens
+
+
+def _points(count, per_day):
+    start = datetime(2026, 1, 1, 8)
+    return [
+        (start + timedelta(days=i // per_day, minutes=i % per_day), 5.0 + (i % 7) * 0.5)
+        for i in range(count)
+    ]
+
+
+def test_short_series_is_inlined():
+    """Test a few scores are listed verbatim."""
+    prompt = build_wellness_insight_prompt(
+        _points(4, 1), days=7, trend="stable", token_budget=700
+    )
+
+    assert "5.0, 5.5, 6.0, 6.5" in prompt
+    assert "Number of recordings: 4" in prompt
+
+
+def test_long_series_stays_within_budget():
+    """Test thousands of scores are bucketed to fit the token budget."""
+    points = _points(3000, per_day=40)
+
+    prompt = build_wellness_insight_prompt(
+        points, days=90, trend="stable", token_budget=700
+    )
+
+    assert estimate_tokens(prompt) <= 700
+    assert "Number of recordings: 3000" in prompt
+    assert "mean" in prompt
+
+
+def test_bucket_scores():
+    """Test daily buckets report mean, min, max and count."""
+    points = _points(6, per_day=3)
+
+    buckets = bucket_scores(points)
+
+    assert [b.count for b in buckets] == [3, 3]
+    assert buckets[0].min == 5.0
+    assert buckets[0].max == 6.0
+    assert buckets[0].mean == 5.5
@@ -2,8 +2,24 @@
 Tests for wellness API endpoints.
 """
 
-from datetime import datetime
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import alerts, idempotency
+from app.alerts import AlertDispatcher
+from app.analytics_export import export_wellness_metrics_parquet
+from app.bulk_import import import_wellness_metrics
+from app.config import settings
+from app.ingest import PACKED_RECORD, IngestError, decode_msgpack
+from app.models import IdempotencyKey, UserTable, UserWellnessState, WellnessMetrics
+from app.singleflight import SingleFlight
+from app.timeseries import lttb
 
 
 def test_create_user(client: TestClient):
@@ -180,3 +196,641 @@ def test_delete_user_cascade(client: TestClient):
     # Verify metrics are also deleted (cascade)
     metric_get_response = client.get(f"/api/v1/wellness/wellness-metrics/{metric_id}")
     assert metric_get_response.status_code == 404
+
+
+def test_single_flight_shares_concurrent_computation():
+    """Test concurrent calls with the same key run the computation once."""
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "trend"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do((1, 30), compute)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["trend"] * 5
+
+    # Once finished, the key is forgotten
+    flights.do((1, 30), compute)
+    assert len(calls) == 2
+
+
+def test_wellness_history_stats_cover_full_range(client: TestClient):
+    """Test history stats are computed over the whole range, not just the page."""
+    user_response = client.post("/api/v1/wellness/users")
+    userid = user_response.json()["userid"]
+
+    for score in [2.0, 4.0, 6.0, 8.0]:
+        client.post("/api/v1/wellness/wellness-metrics", json={
+            "userid": userid,
+            "wellness_score": score
+        })
+
+    response = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics?limit=1")
+    data = response.json()
+    assert len(data["metrics"]) == 1
+    assert data["total_count"] == 4
+    assert data["average_score"] == 5.0
+    assert data["min_score"] == 2.0
+    assert data["max_score"] == 8.0
+
+    # A page past the end still reports the range stats
+    response = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics?skip=10")
+    data = response.json()
+    assert data["metrics"] == []
+    assert data["total_count"] == 4
+    assert data["average_score"] == 5.0
+
+
+def test_export_wellness_metrics(client: TestClient):
+    """Test streaming export as NDJSON and CSV for several users."""
+    userids = []
+    for scores in ([6.0, 7.0], [3.0]):
+        userid = client.post("/api/v1/wellness/users").json()["userid"]
+        userids.append(userid)
+        for score in scores:
+            client.post("/api/v1/wellness/wellness-metrics", json={
+                "userid": userid,
+                "wellness_score": score
+            })
+
+    params = [("userids", u) for u in userids]
+    response = client.get("/api/v1/wellness/export/wellness-metrics", params=params)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["wellness_score"] for r in rows] == [6.0, 7.0, 3.0]
+
+    response = client.get(
+        "/api/v1/wellness/export/wellness-metrics", params=params + [("format", "csv")]
+    )
+    lines = response.text.splitlines()
+    assert lines[0] == "id,userid,time,wellness_score"
+    assert len(lines) == 4
+
+
+def test_export_wellness_metrics_unknown_user(client: TestClient):
+    """Test exporting a user that doesn't exist returns 404."""
+    response = client.get("/api/v1/wellness/export/wellness-metrics?userids=99999")
+    assert response.status_code == 404
+
+
+def test_bulk_import_csv(client: TestClient):
+    """Test CSV import validates rows and commits in chunks."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    csv_data = (
+        "userid,time,wellness_score\n"
+        f"{userid},2024-01-01T09:00:00,6.5\n"
+        f"{userid},2024-01-02T09:00:00,12\n"
+        "99999,2024-01-03T09:00:00,5\n"
+        f"{userid},2024-01-04T09:00:00,7\n"
+    )
+
+    response = client.post(
+        "/api/v1/wellness/wellness-metrics/import",
+        files={"file": ("scores.csv", csv_data, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["rows_imported"] == 2
+    assert data["rows_rejected"] == 2
+    assert data["completed"] is True
+    assert data["next_row"] == 4
+    assert any("out of range" in e for e in data["errors"])
+    assert any("user 99999 not found" in e for e in data["errors"])
+
+    history = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics").json()
+    assert history["total_count"] == 2
+
+
+def test_bulk_import_ndjson_resume(client: TestClient):
+    """Test NDJSON import skips rows already imported."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    lines = "\n".join(
+        json.dumps({"userid": userid, "time": f"2024-01-0{day}T09:00:00", "wellness_score": day})
+        for day in range(1, 6)
+    )
+
+    response = client.post(
+        "/api/v1/wellness/wellness-metrics/import?skip_rows=3",
+        files={"file": ("scores.ndjson", lines, "application/x-ndjson")},
+    )
+
+    data = response.json()
+    assert data["rows_imported"] == 2
+    assert data["next_row"] == 5
+
+    history = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics").json()
+    assert sorted(m["wellness_score"] for m in history["metrics"]) == [4.0, 5.0]
+
+
+@pytest.mark.parametrize("bad_line, error", [
+    (None, "codec can't decode"),
+    ("1,2024-01-05T09:00:00," + "9" * 200_000 + "\n", "field larger than field limit"),
+])
+def test_bulk_import_unreadable_input_aborts_with_resume_point(db_session, bad_line, error):
+    """Test undecodable or malformed CSV input stops the import with next_row, not a 500."""
+    user = UserTable()
+    db_session.add(user)
+    db_session.commit()
+
+    def lines():
+        yield "userid,time,wellness_score\n"
+        for day in range(1, 4):
+            yield f"{user.userid},2024-01-0{day}T09:00:00,5\n"
+        if bad_line is None:
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+        yield bad_line
+
+    result = import_wellness_metrics(db_session, lines(), "csv", chunk_size=2)
+
+    assert (result.rows_imported, result.next_row, result.completed) == (2, 2, False)
+    assert result.errors[-1].startswith("aborted at row 2: unreadable input")
+    assert error in result.errors[-1]
+
+
+def test_bulk_import_offset_time_on_existing_state(client: TestClient, db_session):
+    """Test imported times with a UTC offset are stored as naive UTC."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    _post_scores(client, userid, [6.0])  # creates the user's running state
+    line = json.dumps({"userid": userid, "time": "2024-05-01T12:00:00+02:00", "wellness_score": 5})
+
+    response = client.post(
+        "/api/v1/wellness/wellness-metrics/import",
+        files={"file": ("scores.ndjson", line, "application/x-ndjson")},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["rows_imported"] == 1
+    state = db_session.get(UserWellnessState, userid)
+    assert (state.count, state.last_time) == (2, datetime(2024, 5, 1, 10))
+
+    response = client.post("/api/v1/wellness/wellness-metrics", json={
+        "userid": userid, "wellness_score": 4, "time": "2024-05-02T10:00:00Z"
+    })
+    assert response.status_code == 201
+    assert response.json()["time"] == "2024-05-02T10:00:00"
+
+
+def test_parquet_export_is_incremental(db_session, tmp_path):
+    """Test the Parquet export partitions by day and only exports new rows."""
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    user = UserTable()
+    db_session.add(user)
+    db_session.commit()
+    for day, score in [(1, 4.0), (1, 6.0), (2, 8.0)]:
+        db_session.add(WellnessMetrics(
+            userid=user.userid, time=datetime(2024, 1, day, 9), wellness_score=score
+        ))
+    db_session.commit()
+
+    result = export_wellness_metrics_parquet(db_session, tmp_path, include_rollups=True)
+
+    assert result.rows_exported == 3
+    assert sorted(p.name for p in (tmp_path / "wellness_metrics").iterdir()) == [
+        "dt=2024-01-01", "dt=2024-01-02"
+    ]
+    rollups = pq.read_table(tmp_path / "daily_rollups").to_pylist()
+    assert {r["average_score"] for r in rollups} == {5.0, 8.0}
+
+    assert export_wellness_metrics_parquet(db_session, tmp_path).rows_exported == 0
+
+    db_session.add(WellnessMetrics(
+        userid=user.userid, time=datetime(2024, 1, 2, 18), wellness_score=2.0
+    ))
+    db_session.commit()
+    assert export_wellness_metrics_parquet(db_session, tmp_path).rows_exported == 1
+    assert pq.read_table(tmp_path / "wellness_metrics").num_rows == 4
+
+    total = db_session.query(WellnessMetrics).count()
+    assert export_wellness_metrics_parquet(db_session, tmp_path, full=True).rows_exported == total
+    assert pq.read_table(tmp_path / "wellness_metrics").num_rows == total
+
+
+def test_parquet_export_picks_up_late_commits(db_session, tmp_path):
+    """Test an id that commits after the export passed it is exported by the next run."""
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    user = UserTable()
+    db_session.add(user)
+    db_session.commit()
+    metrics = [
+        WellnessMetrics(userid=user.userid, time=datetime(2024, 2, 1, hour), wellness_score=5.0)
+        for hour in range(3)
+    ]
+    db_session.add_all(metrics)
+    db_session.commit()
+    late_id = metrics[1].id
+    db_session.delete(metrics[1])  # as if its transaction had not committed yet
+    db_session.commit()
+    export_wellness_metrics_parquet(db_session, tmp_path)
+
+    db_session.add(WellnessMetrics(
+        id=late_id, userid=user.userid, time=datetime(2024, 2, 1, 1), wellness_score=5.0
+    ))
+    db_session.commit()
+    assert export_wellness_metrics_parquet(db_session, tmp_path).rows_exported == 1
+    exported = pq.read_table(tmp_path / "wellness_metrics").column("id").to_pylist()
+    assert exported.count(late_id) == 1
+    assert export_wellness_metrics_parquet(db_session, tmp_path).rows_exported == 0
+
+
+def _post_scores(client: TestClient, userid: int, scores: list[float]):
+    for hour, score in enumerate(scores):
+        client.post("/api/v1/wellness/wellness-metrics", json={
+            "userid": userid,
+            "wellness_score": score,
+            "time": datetime(2024, 1, 1, hour).isoformat()
+        })
+
+
+def test_idempotent_metric_create_replays(client: TestClient, db_session):
+    """Test a retried create with the same Idempotency-Key stores one metric."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    payload = {"userid": userid, "wellness_score": 6.5}
+    headers = {"Idempotency-Key": f"create-{userid}"}
+
+    first = client.post("/api/v1/wellness/wellness-metrics", json=payload, headers=headers)
+    retry = client.post("/api/v1/wellness/wellness-metrics", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db_session.query(WellnessMetrics).filter(WellnessMetrics.userid == userid).count() == 1
+
+    # Served from the database when the in-process cache is cold (another worker)
+    idempotency._cache.clear()
+    retry = client.post("/api/v1/wellness/wellness-metrics", json=payload, headers=headers)
+    assert retry.json() == first.json()
+
+    reused = client.post(
+        "/api/v1/wellness/wellness-metrics", json={**payload, "wellness_score": 2.0}, headers=headers
+    )
+    assert reused.status_code == 422
+
+
+def test_idempotent_concurrent_duplicate_conflicts(client: TestClient, db_session, monkeypatch):
+    """Test a duplicate that commits between replay check and insert is a 409, not a second write."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    other_session = sessionmaker(bind=db_session.get_bind())
+    real_replay = idempotency.IdempotentRequest.replay
+
+    def replay_then_race(self):
+        response = real_replay(self)
+        with other_session() as other:
+            other.add(IdempotencyKey(
+                key=self.key, request_hash=self.request_hash, status_code=201, response_body="{}"
+            ))
+            other.commit()
+        return response
+
+    monkeypatch.setattr(idempotency.IdempotentRequest, "replay", replay_then_race)
+    response = client.post(
+        "/api/v1/wellness/wellness-metrics",
+        json={"userid": userid, "wellness_score": 5.0},
+        headers={"Idempotency-Key": f"race-{userid}"},
+    )
+
+    assert response.status_code == 409
+    assert db_session.query(WellnessMetrics).filter(WellnessMetrics.userid == userid).count() == 0
+
+
+def test_idempotent_batch_create(client: TestClient, db_session):
+    """Test a batch is stored atomically and replayed under its key."""
+    users = [client.post("/api/v1/wellness/users").json()["userid"] for _ in range(2)]
+    batch = {"metrics": [
+        {"userid": users[0], "wellness_score": 5.0, "time": "2024-01-01T08:00:00"},
+        {"userid": users[1], "wellness_score": 7.0, "time": "2024-01-01T09:00:00"},
+        {"userid": users[0], "wellness_score": 6.0, "time": "2024-01-01T10:00:00"},
+    ]}
+    headers = {"Idempotency-Key": f"batch-{users[0]}"}
+
+    first = client.post("/api/v1/wellness/wellness-metrics/batch", json=batch, headers=headers)
+    assert first.status_code == 201
+    assert first.json()["created"] == 3
+    ids = first.json()["ids"]
+    assert [db_session.get(WellnessMetrics, i).wellness_score for i in ids] == [5.0, 7.0, 6.0]
+
+    retry = client.post("/api/v1/wellness/wellness-metrics/batch", json=batch, headers=headers)
+    assert retry.json() == first.json()
+    assert db_session.query(WellnessMetrics).filter(WellnessMetrics.userid.in_(users)).count() == 3
+    assert db_session.get(UserWellnessState, users[0]).count == 2
+
+    bad = {"metrics": batch["metrics"] + [{"userid": 99999, "wellness_score": 1.0}]}
+    response = client.post("/api/v1/wellness/wellness-metrics/batch", json=bad)
+    assert response.status_code == 404
+    assert db_session.query(WellnessMetrics).filter(WellnessMetrics.userid.in_(users)).count() == 3
+
+
+def test_packed_batch_ingest(client: TestClient, db_session):
+    """Test the packed binary format is decoded, validated and inserted."""
+    users = [client.post("/api/v1/wellness/users").json()["userid"] for _ in range(2)]
+    epoch = int(datetime(2024, 1, 1).timestamp() - datetime(1970, 1, 1).timestamp())
+    body = b"".join(
+        PACKED_RECORD.pack(userid, epoch + hour * 3600, score)
+        for hour, (userid, score) in enumerate([(users[0], 7.3), (users[1], 4.0), (users[0], 6.5)])
+    )
+    url = "/api/v1/wellness/wellness-metrics/batch"
+    headers = {"Content-Type": "application/x-wellness-packed"}
+
+    with client.websocket_connect(f"/api/v1/wellness/users/{users[0]}/live") as websocket:
+        websocket.receive_json()
+        response = client.post(url, content=body, headers=headers)
+        event = websocket.receive_json()
+        # Read before disconnecting: the socket's teardown closes the shared test session
+        stored = [db_session.get(WellnessMetrics, i) for i in response.json()["ids"]]
+        state_count = db_session.get(UserWellnessState, users[0]).count
+
+    assert response.status_code == 201
+    assert response.json()["created"] == 3
+    assert [(m.userid, m.wellness_score, m.time) for m in stored] == [
+        (users[0], 7.3, datetime(2024, 1, 1, 0)),
+        (users[1], 4.0, datetime(2024, 1, 1, 1)),
+        (users[0], 6.5, datetime(2024, 1, 1, 2)),
+    ]
+    assert state_count == 2
+    # One event per user, not per metric
+    assert event["type"] == "metrics_created"
+    assert (event["count"], event["latest"]["wellness_score"], event["summary"]["count"]) == (2, 6.5, 2)
+
+    bad = body + PACKED_RECORD.pack(users[1], epoch, 12.0)
+    response = client.post(url, content=bad, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"] == ["record 3: score 12.0 must be between 0 and 10"]
+    assert client.post(url, content=body[:-1], headers=headers).status_code == 422
+    assert client.post(url, content=body, headers={"Content-Type": "text/plain"}).status_code == 415
+    assert db_session.query(WellnessMetrics).filter(WellnessMetrics.userid.in_(users)).count() == 3
+
+
+def test_batch_body_size_rejected_before_decoding(client: TestClient, monkeypatch):
+    """Test a body larger than BATCH_MAX_RECORDS records allow is a 413, by header or by stream size."""
+    monkeypatch.setattr(settings, "batch_max_records", 2)
+    url = "/api/v1/wellness/wellness-metrics/batch"
+    headers = {"Content-Type": "application/x-wellness-packed"}
+    body = PACKED_RECORD.pack(1, 0, 5.0) * 3
+
+    assert client.post(url, content=body, headers=headers).status_code == 413
+    # No Content-Length: the size is checked while the body streams in
+    assert client.post(url, content=iter([body[:16], body[16:]]), headers=headers).status_code == 413
+
+
+def test_msgpack_rejects_booleans():
+    """Test true/false are not accepted as integer or score values."""
+    msgpack = pytest.importorskip("msgpack")
+
+    with pytest.raises(IngestError):
+        decode_msgpack(msgpack.packb([[True, 1704067200, 5.5]]))
+    with pytest.raises(IngestError):
+        decode_msgpack(msgpack.packb([[1, 1704067200, False]]))
+
+
+def test_msgpack_batch_ingest(client: TestClient):
+    """Test MessagePack batches are accepted."""
+    msgpack = pytest.importorskip("msgpack")
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+
+    response = client.post(
+        "/api/v1/wellness/wellness-metrics/batch",
+        content=msgpack.packb([[userid, 1704067200, 5.5], [userid, 1704070800, 6]]),
+        headers={"Content-Type": "application/msgpack"},
+    )
+
+    assert response.status_code == 201
+    assert response.json()["created"] == 2
+
+
+def test_wellness_series_buckets(client: TestClient):
+    """Test scores are aggregated per bucket in SQL."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    # 2024-01-01 is a Monday
+    for ts, score in [
+        (datetime(2024, 1, 1, 9, 15), 4.0),
+        (datetime(2024, 1, 1, 9, 45), 6.0),
+        (datetime(2024, 1, 2, 20, 0), 8.0),
+        (datetime(2024, 1, 7, 23, 59), 2.0),
+        (datetime(2024, 1, 8, 0, 0), 5.0),
+    ]:
+        client.post("/api/v1/wellness/wellness-metrics", json={
+            "userid": userid, "wellness_score": score, "time": ts.isoformat()
+        })
+    url = f"/api/v1/wellness/users/{userid}/wellness-series?end_date=2024-01-10T00:00:00"
+
+    daily = client.get(url).json()
+    assert daily["total_buckets"] == 4
+    assert daily["buckets"][0] == {"start": "2024-01-01T00:00:00", "count": 2, "mean": 5.0, "min": 4.0, "max": 6.0}
+    assert [b["start"][:10] for b in daily["buckets"]] == ["2024-01-01", "2024-01-02", "2024-01-07", "2024-01-08"]
+
+    hourly = client.get(url + "&bucket=hour").json()
+    assert hourly["buckets"][0]["start"] == "2024-01-01T09:00:00"
+    assert hourly["buckets"][0]["count"] == 2
+
+    weekly = client.get(url + "&bucket=week").json()
+    assert [(b["start"], b["count"]) for b in weekly["buckets"]] == [
+        ("2024-01-01T00:00:00", 4), ("2024-01-08T00:00:00", 1)
+    ]
+
+    downsampled = client.get(url + "&points=3").json()
+    assert downsampled["total_buckets"] == 4
+    assert len(downsampled["buckets"]) == 3
+
+    assert client.get(url + "&bucket=month").status_code == 422
+
+
+def test_lttb_keeps_shape():
+    """Test LTTB keeps the endpoints and the extremes of a series."""
+    points = [(float(x), 5.0) for x in range(100)]
+    points[30] = (30.0, 9.5)
+    points[70] = (70.0, 0.5)
+
+    kept = lttb(points, 10)
+
+    assert len(kept) == 10
+    assert kept[0] == 0 and kept[-1] == 99
+    assert 30 in kept and 70 in kept
+    assert kept == sorted(kept)
+    assert lttb(points[:5], 10) == [0, 1, 2, 3, 4]
+
+
+def test_user_summaries_match_trend_endpoint(client: TestClient):
+    """Test batch summaries agree with the per-user trend endpoint."""
+    series = {"improving": [3.0, 4.0, 7.0, 8.0, 8.5], "declining": [8.0, 8.0, 5.0, 4.0], "short": [2.0, 9.0]}
+    userids = {}
+    start = datetime.utcnow() - timedelta(days=2)
+    for name, scores in series.items():
+        userids[name] = client.post("/api/v1/wellness/users").json()["userid"]
+        for hour, score in enumerate(scores):
+            client.post("/api/v1/wellness/wellness-metrics", json={
+                "userid": userids[name],
+                "wellness_score": score,
+                "time": (start + timedelta(hours=hour)).isoformat()
+            })
+    empty = client.post("/api/v1/wellness/users").json()["userid"]
+
+    requested = [userids["declining"], empty, userids["improving"], userids["short"]]
+    response = client.post("/api/v1/wellness/users/summaries", json={"userids": requested, "days": 7})
+
+    assert response.status_code == 200
+    summaries = response.json()
+    assert [s["userid"] for s in summaries] == requested
+    assert summaries[1] == {
+        "userid": empty, "data_points": 0, "average_score": None,
+        "latest_score": None, "latest_time": None, "trend": "stable"
+    }
+    for summary in summaries[:1] + summaries[2:]:
+        trend = client.get(f"/api/v1/wellness/users/{summary['userid']}/wellness-trend?days=7").json()
+        assert summary["trend"] == trend["trend"]
+        assert summary["average_score"] == trend["average_score"]
+        assert summary["data_points"] == len(trend["data_points"])
+        assert summary["latest_score"] == trend["data_points"][-1]["wellness_score"]
+    assert [s["trend"] for s in summaries] == ["declining", "stable", "improving", "stable"]
+
+
+def test_user_summaries_unknown_user(client: TestClient):
+    """Test batch summaries reject unknown users."""
+    response = client.post("/api/v1/wellness/users/summaries", json={"userids": [99999]})
+    assert response.status_code == 404
+
+
+def test_consecutive_low_and_sharp_decline_alerts(client: TestClient):
+    """Test alerts are raised incrementally as scores are recorded."""
+    gradual = client.post("/api/v1/wellness/users").json()["userid"]
+    _post_scores(client, gradual, [4.0, 2.5, 2.5, 2.5, 2.0])
+
+    response = client.get(f"/api/v1/wellness/users/{gradual}/alerts")
+
+    assert response.status_code == 200
+    # A streak alerts once, when it reaches three low scores
+    assert [alert["kind"] for alert in response.json()] == ["consecutive_low"]
+
+    sudden = client.post("/api/v1/wellness/users").json()["userid"]
+    _post_scores(client, sudden, [8.0, 8.0, 4.5])
+
+    alerts = client.get(f"/api/v1/wellness/users/{sudden}/alerts").json()
+    assert [alert["kind"] for alert in alerts] == ["sharp_decline"]
+    assert alerts[0]["score"] == 4.5
+
+
+def test_wellness_state_rebuilt_on_delete(client: TestClient, db_session):
+    """Test deleting a score recomputes the user's running state."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    _post_scores(client, userid, [4.0, 6.0, 2.0])
+    state = db_session.get(UserWellnessState, userid)
+    assert (state.count, state.mean, state.consecutive_low) == (3, 4.0, 1)
+
+    history = client.get(f"/api/v1/wellness/users/{userid}/wellness-metrics").json()
+    client.delete(f"/api/v1/wellness/wellness-metrics/{history['metrics'][0]['id']}")
+
+    db_session.expire_all()
+    state = db_session.get(UserWellnessState, userid)
+    assert (state.count, state.mean, state.consecutive_low, state.last_score) == (2, 5.0, 0, 6.0)
+
+
+def test_lock_state_recovers_from_concurrent_create(client: TestClient, db_session, monkeypatch):
+    """Test losing the race to create a user's state reuses the winner's row."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    _post_scores(client, userid, [6.0])  # the "concurrent" first write
+    db_session.expunge_all()
+
+    # This session's lookup ran before the other write committed
+    real_get = db_session.get
+    calls = []
+
+    def stale_get(*args, **kwargs):
+        calls.append(args)
+        return None if len(calls) == 1 else real_get(*args, **kwargs)
+
+    monkeypatch.setattr(db_session, "get", stale_get)
+
+    state, created = alerts.lock_state(db_session, userid)
+
+    assert created is False
+    assert state.count == 1
+    assert len(calls) == 2  # the insert failed and the existing row was locked instead
+    db_session.rollback()
+
+
+def test_alert_webhook_dispatch(client: TestClient, monkeypatch):
+    """Test committed alerts are delivered by the background dispatcher."""
+    delivered = []
+    done = threading.Event()
+
+    def send(url, payload):
+        delivered.append((url, payload))
+        done.set()
+
+    dispatcher = AlertDispatcher("http://hooks.example/alerts", send=send)
+    monkeypatch.setattr(alerts, "_dispatcher", dispatcher)
+    monkeypatch.setattr(alerts.settings, "alert_webhook_url", "http://hooks.example/alerts")
+
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+    _post_scores(client, userid, [9.0, 1.0])
+
+    assert done.wait(timeout=2)
+    url, payload = delivered[0]
+    assert url == "http://hooks.example/alerts"
+    assert payload["kind"] == "sharp_decline"
+    assert payload["userid"] == userid
+    dispatcher.close()
+
+
+def test_live_websocket_receives_metric_events(client: TestClient):
+    """Test a user's WebSocket receives new metrics with the running summary."""
+    userid = client.post("/api/v1/wellness/users").json()["userid"]
+
+    with client.websocket_connect(f"/api/v1/wellness/users/{userid}/live") as websocket:
+        assert websocket.receive_json() == {"type": "subscribed", "userids": [userid]}
+        _post_scores(client, userid, [6.0])
+
+        event = websocket.receive_json()
+        assert event["type"] == "metric_created"
+        assert event["metric"]["wellness_score"] == 6.0
+        assert event["summary"]["count"] == 1
+
+        client.delete(f"/api/v1/wellness/wellness-metrics/{event['metric']['id']}")
+        event = websocket.receive_json()
+        assert event["type"] == "metric_deleted"
+        assert event["summary"]["count"] == 0
+
+
+def test_live_websocket_cohort(client: TestClient):
+    """Test a cohort subscription gets events for its users only, alerts included."""
+    watched = [client.post("/api/v1/wellness/users").json()["userid"] for _ in range(2)]
+    other = client.post("/api/v1/wellness/users").json()["userid"]
+    query = "&".join(f"userids={userid}" for userid in watched)
+
+    with client.websocket_connect(f"/api/v1/wellness/live?{query}") as websocket:
+        assert websocket.receive_json()["userids"] == watched
+        _post_scores(client, other, [5.0])
+        _post_scores(client, watched[1], [9.0, 1.0])
+
+        events = [websocket.receive_json() for _ in range(3)]
+        assert [e["type"] for e in events] == ["metric_created", "metric_created", "alert"]
+        assert {e["userid"] for e in events} == {watched[1]}
+        assert events[2]["kind"] == "sharp_decline"
+
+
+def test_live_unknown_user_rejected(client: TestClient):
+    """Test watching a missing user is refused."""
+    from starlette.websockets import WebSocketDisconnect
+
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/api/v1/wellness/users/99999/live"):
+            pass
+    assert exc_info.value.code == 1008
+
+    response = client.get("/api/v1/wellness/events?userids=99999")
+    assert response.status_code == 404